@@ -5,16 +5,24 @@ from .config import Config
 from .db import db
 
 from flask_jwt_extended import JWTManager
-from flasgger import Swagger
 
-def create_app():
+def create_app(config=None):
 
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+
+    # Moteur SQLAlchemy : pool, pragmas SQLite, fork (cf. app/engine.py)
+    from .engine import configure_engine, init_engine
+    configure_engine(app)
     db.init_app(app)
+    init_engine(app)
 
-    # Swagger
-    swagger = Swagger(app)
+    # Swagger : flasgger n'est importé que si la documentation est servie
+    if app.config["SWAGGER_ENABLED"]:
+        from .apidocs import init_apidocs
+        init_apidocs(app)
 
     # Gestion centralisée des erreurs (JSON)
     @app.errorhandler(Exception)
@@ -28,25 +36,74 @@ def create_app():
         }), code
 
 
-    # JWT
+    # JWT (+ liste de révocation)
     jwt = JWTManager(app)
+    from .auth import init_auth
+    init_auth(app, jwt)
 
     # Import et enregistrement des blueprints
     from .routes.status import status_bp
     from .routes.login import login_bp
     from .routes.projects import projects_bp
     from .routes.builds import builds_bp
+    from .routes.exports import exports_bp
+    from .routes.analytics import analytics_bp
+    from .routes.events import events_bp
+    from .routes.artifacts import artifacts_bp
     app.register_blueprint(status_bp)
     app.register_blueprint(login_bp)
     app.register_blueprint(projects_bp)
     app.register_blueprint(builds_bp)
+    app.register_blueprint(exports_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(events_bp)
+    app.register_blueprint(artifacts_bp)
+
+    # Schéma et admin : hors du démarrage en production (flask --app app init-db)
+    if app.config["DB_AUTO_INIT"]:
+        with app.app_context():
+            from .utils import init_db
+            init_db()
+
+    # Monitoring : health check DB en arrière-plan et métriques
+    from .health import init_health
+    from .metrics import init_metrics
+    init_health(app)
+    init_metrics(app)
+
+    # Quotas par identité et délestage avant les vues coûteuses
+    from .admission import init_admission
+    init_admission(app)
+
+    # Lectures GET sur les réplicas (DB_REPLICA_URLS)
+    from .replicas import init_replicas
+    init_replicas(app)
+
+    # Instrumentation SQL par requête (SQL_INSTRUMENTATION=1)
+    from .instrumentation import init_instrumentation
+    init_instrumentation(app)
 
+    # Cache de réponses des lectures de projets
+    from .cache import init_cache
+    init_cache(app)
 
+    # Logs, artefacts et exécuteur de builds (pool de workers)
+    from .logstore import init_logstore
+    init_logstore(app)
+    from .artifacts import init_artifacts
+    init_artifacts(app)
+    from .writebehind import init_writebehind
+    init_writebehind(app)
+    from .executor import init_executor
+    init_executor(app)
+    from .purge import init_purge
+    init_purge(app)
 
+    # Diffusion SSE des transitions de builds
+    from .events import init_events
+    init_events(app)
 
-    # Seed admin si besoin
-    with app.app_context():
-        from .utils import seed_admin
-        db.create_all()
-        seed_admin()
+    # Commandes CLI de maintenance
+    from .cli import init_cli
+    init_cli(app)
     return app
@@ -0,0 +1,201 @@
+# Contrôle d'admission des requêtes HTTP
+"""admission.py : quotas par identité, limites de concurrence par classe de route et délestage.
+
+Chaque vue appartient à une classe d'admission (décorateur `route_class`,
+"default" sinon). Avant la vue, deux contrôles, dans cet ordre :
+
+- Quota : un seau de jetons par identité (identité du JWT, vérifié, sinon
+  adresse IP) se remplit de ADMISSION_RATE_PER_S jetons/s jusqu'à
+  ADMISSION_BURST ; une requête coûte ADMISSION_COSTS[classe] jetons. Seau
+  vide : 429 avec Retry-After (temps avant d'avoir assez de jetons).
+- Concurrence : au plus ADMISSION_CONCURRENCY[classe] requêtes de la classe
+  en cours. Au-delà, la requête attend un slot au plus ADMISSION_MAX_WAIT_S,
+  dans une file d'au plus ADMISSION_MAX_QUEUE requêtes. L'attente prévisible
+  (requêtes devant elle x durée moyenne récente / slots) est estimée à
+  l'arrivée : si elle dépasse ADMISSION_MAX_WAIT_S ou si la file est pleine,
+  la requête est refusée tout de suite (503 avec Retry-After) au lieu
+  d'occuper un thread jusqu'au timeout de gunicorn.
+
+Le slot est rendu au teardown de la requête, donc à la fin du flux pour les
+réponses stream_with_context : les exports ont leur propre classe ("export"),
+pour que des téléchargements lents n'occupent pas les slots des listes. Les
+vues "exempt" (/status, /metrics) ne passent par aucun contrôle et répondent
+même quand les autres classes sont saturées. Les limites et les seaux sont propres à chaque
+processus : avec N workers gunicorn, le débit admis par identité est au plus
+N fois ADMISSION_RATE_PER_S. Refus et attentes sont comptés dans /metrics.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+DEFAULT = "default"
+EXEMPT = "exempt"
+
+
+def route_class(name):
+	"""Classe d'admission d'une vue : "exempt", "expensive"... (cf. ADMISSION_CONCURRENCY)."""
+	def mark(view):
+		view._admission_class = name
+		return view
+	return mark
+
+
+def parse_classes(value, cast=float):
+	"""{classe: valeur} depuis "expensive=2,default=16" (ou un dict, tel quel)."""
+	if isinstance(value, dict):
+		return value
+	pairs = (item.split("=", 1) for item in value.split(",") if item.strip())
+	return {name.strip(): cast(v) for name, v in pairs}
+
+
+class Gate:
+	"""Au plus `limit` requêtes en cours ; les suivantes attendent, ou sont délestées."""
+
+	def __init__(self, limit, max_queue=8, max_wait=1.0):
+		self.limit = limit
+		self.max_queue = max_queue
+		self.max_wait = max_wait
+		self.in_flight = 0
+		self.waiting = 0
+		self.service_s = 0.0  # moyenne mobile exponentielle de la durée des requêtes
+		self._cond = threading.Condition()
+
+	def acquire(self):
+		"""Prend un slot ; retourne None si admis, sinon (raison, attente estimée en secondes)."""
+		with self._cond:
+			if self.in_flight < self.limit and not self.waiting:
+				self.in_flight += 1
+				return None
+			expected = (self.waiting + 1) * self.service_s / self.limit
+			if self.waiting >= self.max_queue:
+				return "queue_full", max(expected, self.max_wait)
+			if expected > self.max_wait:
+				return "latency", expected
+			self.waiting += 1
+			deadline = time.monotonic() + self.max_wait
+			try:
+				while self.in_flight >= self.limit:
+					remaining = deadline - time.monotonic()
+					if remaining <= 0:
+						return "timeout", max(expected, self.max_wait)
+					self._cond.wait(remaining)
+				self.in_flight += 1
+				return None
+			finally:
+				self.waiting -= 1
+
+	def release(self, seconds):
+		with self._cond:
+			self.in_flight -= 1
+			self.service_s = seconds if not self.service_s else 0.8 * self.service_s + 0.2 * seconds
+			self._cond.notify()
+
+
+class TokenBuckets:
+	"""Un seau de jetons par clé ; les `max_keys` clés les plus récentes sont gardées (LRU)."""
+
+	def __init__(self, rate, burst, max_keys=10000):
+		self.rate = rate
+		self.burst = burst
+		self.max_keys = max_keys
+		self._buckets = OrderedDict()  # clé -> (jetons, instant du dernier calcul)
+		self._lock = threading.Lock()
+
+	def take(self, key, cost):
+		"""Retire `cost` jetons ; retourne 0 si accepté, sinon les secondes avant d'en avoir assez."""
+		cost = min(cost, self.burst)
+		now = time.monotonic()
+		with self._lock:
+			tokens, last = self._buckets.pop(key, (self.burst, now))
+			tokens = min(self.burst, tokens + (now - last) * self.rate)
+			wait = 0.0 if tokens >= cost else (cost - tokens) / self.rate
+			self._buckets[key] = (tokens - cost if not wait else tokens, now)
+			# Une clé oubliée repart d'un seau plein : seules les plus anciennes sont évincées
+			while len(self._buckets) > self.max_keys:
+				self._buckets.popitem(last=False)
+		return wait
+
+
+class Admission:
+	def __init__(self, concurrency, costs, rate, burst, max_queue=8, max_wait=1.0):
+		self.gates = {name: Gate(int(limit), max_queue, max_wait) for name, limit in concurrency.items() if limit > 0}
+		self.costs = costs
+		self.buckets = TokenBuckets(rate, burst) if rate > 0 else None
+
+	def in_flight(self):
+		return sum(gate.in_flight for gate in self.gates.values())
+
+	def waiting(self):
+		return sum(gate.waiting for gate in self.gates.values())
+
+
+def _identity():
+	"""Clé de quota : identité du JWT s'il est valide (jamais lue sans vérification), sinon l'adresse IP."""
+	try:
+		verify_jwt_in_request(optional=True, verify_type=False, locations=["headers", "query_string"])
+		identity = get_jwt_identity()
+	except Exception:
+		identity = None
+	return f"user:{identity}" if identity is not None else f"ip:{request.remote_addr}"
+
+
+def _reject(status, error, message, wait):
+	resp = jsonify({"error": error, "message": message})
+	resp.status_code = status
+	resp.headers["Retry-After"] = str(max(1, math.ceil(wait)))
+	return resp
+
+
+def init_admission(app):
+	if not app.config["ADMISSION_ENABLED"]:
+		return None
+	admission = Admission(
+		parse_classes(app.config["ADMISSION_CONCURRENCY"], int),
+		parse_classes(app.config["ADMISSION_COSTS"]),
+		app.config["ADMISSION_RATE_PER_S"],
+		app.config["ADMISSION_BURST"],
+		max_queue=app.config["ADMISSION_MAX_QUEUE"],
+		max_wait=app.config["ADMISSION_MAX_WAIT_S"],
+	)
+	app.extensions["admission"] = admission
+
+	@app.before_request
+	def _admit():
+		view = current_app.view_functions.get(request.endpoint)
+		name = getattr(view, "_admission_class", DEFAULT)
+		if name == EXEMPT:
+			return None
+		metrics = current_app.extensions["metrics"]
+		cost = admission.costs.get(name, admission.costs.get(DEFAULT, 1))
+		if admission.buckets is not None and cost:
+			wait = admission.buckets.take(_identity(), cost)
+			if wait:
+				metrics.inc("admission_rejected_total", route_class=name, reason="rate_limited")
+				return _reject(429, "too_many_requests", "rate limit exceeded", wait)
+		gate = admission.gates.get(name)
+		if gate is None:
+			return None
+		start = time.perf_counter()
+		refused = gate.acquire()
+		if refused:
+			reason, wait = refused
+			metrics.inc("admission_rejected_total", route_class=name, reason=reason)
+			return _reject(503, "overloaded", f"server busy ({reason}), retry later", wait)
+		admitted_at = time.perf_counter()
+		if admitted_at - start > 0.001:
+			metrics.inc("admission_queue_wait_seconds_total", admitted_at - start, route_class=name)
+		g._admission = (gate, admitted_at)
+		return None
+
+	@app.teardown_request
+	def _release(exc):
+		slot = g.pop("_admission", None)
+		if slot is not None:
+			gate, admitted_at = slot
+			gate.release(time.perf_counter() - admitted_at)
+
+	return admission
@@ -0,0 +1,184 @@
+# Analytique des builds : rollups par heure et par jour
+"""analytics.py : agrégats de builds matérialisés par (projet, granularité, tranche).
+
+Chaque tranche horaire ou journalière garde le nombre de builds terminés, le
+nombre d'échecs, la somme des durées et un sketch de quantiles des durées à
+erreur relative bornée (histogramme à buckets logarithmiques, type DDSketch).
+Les sketches se fusionnent par simple addition : une plage de dates se calcule
+à partir des rollups sans toucher à la table Build.
+
+Les rollups sont mis à jour dans la transaction qui termine un build, et
+reconstructibles en bloc par rebuild_rollups() (agrégation GROUP BY en SQL).
+"""
+import json
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, func, insert, select
+
+from .db import db, upsert
+from .models import Build, BuildRollup
+
+GRANULARITIES = ("hour", "day")
+# Précision relative des quantiles : 1 %
+ALPHA = 0.01
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+LOG_GAMMA = math.log(GAMMA)
+# Durées plus courtes regroupées dans le bucket 0
+MIN_DURATION = 1e-3
+
+
+def sketch_key(duration):
+	if duration <= MIN_DURATION:
+		return 0
+	return math.ceil(math.log(duration) / LOG_GAMMA)
+
+
+def sketch_quantile(sketch, q):
+	"""Quantile q (0..1) d'un sketch {clé: effectif}, à ALPHA près en relatif."""
+	total = sum(sketch.values())
+	if not total:
+		return None
+	rank = q * (total - 1)
+	seen = 0
+	for key in sorted(sketch):
+		seen += sketch[key]
+		if seen > rank:
+			return 0.0 if key == 0 else 2 * GAMMA ** key / (GAMMA + 1)
+	return None
+
+
+def bucket_start(at, granularity):
+	if granularity == "hour":
+		return at.replace(minute=0, second=0, microsecond=0)
+	return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def record_builds(builds):
+	"""Ajoute des builds terminés, (project_id, created_at, statut, durée), aux rollups.
+
+	À appeler dans la transaction qui fixe leur statut final. Les builds d'une
+	même tranche sont d'abord agrégés : une lecture-écriture par rollup touché.
+	"""
+	deltas = {}
+	for project_id, created_at, status, duration_s in builds:
+		key = str(sketch_key(duration_s))
+		for granularity in GRANULARITIES:
+			pk = (project_id, granularity, bucket_start(created_at, granularity))
+			delta = deltas.setdefault(pk, [0, 0, 0.0, {}])
+			delta[0] += 1
+			delta[1] += status != "success"
+			delta[2] += duration_s
+			delta[3][key] = delta[3].get(key, 0) + 1
+	for pk, (count, failures, duration_sum, keys) in deltas.items():
+		db.session.execute(
+			upsert()(BuildRollup).values(
+				project_id=pk[0], granularity=pk[1], bucket_start=pk[2],
+				count=0, failure_count=0, duration_sum=0.0, sketch="{}"
+			).on_conflict_do_nothing()
+		)
+		# Verrou de ligne (PostgreSQL) : le sketch est mis à jour en lecture-modification-écriture
+		rollup = db.session.get(BuildRollup, pk, with_for_update=True, populate_existing=True)
+		sketch = json.loads(rollup.sketch)
+		for key, n in keys.items():
+			sketch[key] = sketch.get(key, 0) + n
+		rollup.count += count
+		rollup.failure_count += failures
+		rollup.duration_sum += duration_sum
+		rollup.sketch = json.dumps(sketch, separators=(",", ":"))
+
+
+def _bucket_expr(granularity):
+	if db.session.get_bind().dialect.name == "postgresql":
+		return func.date_trunc(granularity, Build.created_at)
+	fmt = "%Y-%m-%d %H:00:00" if granularity == "hour" else "%Y-%m-%d 00:00:00"
+	return func.strftime(fmt, Build.created_at)
+
+
+def _as_datetime(value):
+	return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def rebuild_rollups(batch=5000):
+	"""Recalcule tous les rollups en deux agrégations SQL par granularité.
+
+	Compteurs et sommes viennent d'un GROUP BY (projet, tranche) ; les sketches
+	d'un GROUP BY (projet, tranche, clé de bucket), la clé étant calculée en SQL
+	(ceil(ln(durée) / ln(gamma))), ce qui évite de relire chaque build en Python.
+	"""
+	db.session.execute(delete(BuildRollup))
+	finished = Build.status.in_(("success", "fail")) & Build.duration_s.isnot(None)
+	key = case(
+		(Build.duration_s <= MIN_DURATION, 0),
+		else_=func.ceil(func.ln(Build.duration_s) / LOG_GAMMA)
+	)
+	for granularity in GRANULARITIES:
+		bucket = _bucket_expr(granularity).label("bucket")
+		rows = {}
+		for project_id, start, count, failures, total in db.session.execute(
+			select(Build.project_id, bucket, func.count(), func.sum(case((Build.status != "success", 1), else_=0)), func.sum(Build.duration_s))
+			.where(finished).group_by(Build.project_id, bucket)
+		):
+			rows[(project_id, str(start))] = {
+				"project_id": project_id, "granularity": granularity, "bucket_start": _as_datetime(start),
+				"count": count, "failure_count": failures, "duration_sum": total, "sketch": {}
+			}
+		for project_id, start, k, n in db.session.execute(
+			select(Build.project_id, bucket, key.label("k"), func.count())
+			.where(finished).group_by(Build.project_id, bucket, "k")
+		):
+			rows[(project_id, str(start))]["sketch"][str(int(k))] = n
+		values = list(rows.values())
+		for row in values:
+			row["sketch"] = json.dumps(row["sketch"], separators=(",", ":"))
+		for i in range(0, len(values), batch):
+			db.session.execute(insert(BuildRollup), values[i:i + batch])
+	db.session.commit()
+
+
+def query_rollups(granularity, start, end, project_id=None):
+	"""Tranches [start, end) agrégées (tous projets si project_id est None), plus le total."""
+	stmt = select(BuildRollup).where(
+		BuildRollup.granularity == granularity,
+		BuildRollup.bucket_start >= start,
+		BuildRollup.bucket_start < end
+	).order_by(BuildRollup.bucket_start)
+	if project_id is not None:
+		stmt = stmt.where(BuildRollup.project_id == project_id)
+	buckets = {}
+	total = _empty()
+	for rollup in db.session.execute(stmt).scalars():
+		agg = buckets.setdefault(rollup.bucket_start, _empty())
+		sketch = json.loads(rollup.sketch)
+		for acc in (agg, total):
+			acc["count"] += rollup.count
+			acc["failure_count"] += rollup.failure_count
+			acc["duration_sum"] += rollup.duration_sum
+			for k, n in sketch.items():
+				acc["sketch"][int(k)] = acc["sketch"].get(int(k), 0) + n
+	items = [dict(_summary(agg), bucket_start=start.isoformat() + "Z") for start, agg in sorted(buckets.items())]
+	return items, _summary(total)
+
+
+def _empty():
+	return {"count": 0, "failure_count": 0, "duration_sum": 0.0, "sketch": {}}
+
+
+def _summary(agg):
+	count = agg["count"]
+	return {
+		"count": count,
+		"failure_count": agg["failure_count"],
+		"failure_rate": round(agg["failure_count"] / count, 4) if count else None,
+		"duration_mean_s": agg["duration_sum"] / count if count else None,
+		"duration_p50_s": sketch_quantile(agg["sketch"], 0.50),
+		"duration_p95_s": sketch_quantile(agg["sketch"], 0.95),
+		"duration_p99_s": sketch_quantile(agg["sketch"], 0.99),
+	}
+
+
+def default_range(granularity, now=None):
+	"""Plage par défaut : 48 dernières heures ou 30 derniers jours."""
+	now = now or datetime.utcnow()
+	span = timedelta(hours=48) if granularity == "hour" else timedelta(days=30)
+	return bucket_start(now - span, granularity), now + timedelta(seconds=1)
@@ -0,0 +1,105 @@
+# Documentation Swagger (flasgger), chargée à la demande
+"""apidocs.py : Swagger UI sur /apidocs et spec OpenAPI sur /apispec_1.json.
+
+flasgger (et jsonschema, yaml) coûte plusieurs dizaines de ms à l'import et
+parse le YAML de toutes les docstrings de routes pour construire la spec,
+dans chaque worker. Ici rien de cela n'a lieu au démarrage : les routes de
+documentation sont déclarées sans importer flasgger, qui n'est chargé qu'à la
+première requête sur /apidocs (dans une petite application Flask dédiée).
+
+La spec construite est écrite sur disque sous une clé dérivée des routes et de
+leurs docstrings : les autres workers et les redémarrages la relisent telle
+quelle, sans flasgger. `flask --app app build-apispec` la génère à l'avance,
+par exemple au build de l'image.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from flask import Blueprint, Flask, current_app, jsonify, request
+
+SPEC_ENDPOINT = "apispec_1"
+
+apidocs_bp = Blueprint("apidocs", __name__)
+
+_lock = threading.Lock()
+
+
+def spec_key(app):
+	"""Empreinte des routes documentées : change dès qu'une route ou une docstring change."""
+	digest = hashlib.sha256()
+	for rule in sorted(app.url_map.iter_rules(), key=lambda r: (r.rule, r.endpoint)):
+		view = app.view_functions.get(rule.endpoint)
+		digest.update(f"{rule.rule} {rule.endpoint} {sorted(rule.methods)}\n".encode())
+		digest.update((getattr(view, "__doc__", None) or "").encode())
+	return digest.hexdigest()[:16]
+
+
+def spec_path(app):
+	return os.path.join(app.config["SWAGGER_SPEC_CACHE_DIR"], f"{SPEC_ENDPOINT}-{spec_key(app)}.json")
+
+
+def _docs_app(app):
+	"""Application flasgger dédiée (UI, fichiers statiques), créée à la première requête."""
+	docs = app.extensions.get("apidocs")
+	if docs is None:
+		with _lock:
+			docs = app.extensions.get("apidocs")
+			if docs is None:
+				from flasgger import Swagger
+				docs = Flask(__name__)
+				Swagger(docs)
+				app.extensions["apidocs"] = docs
+	return docs
+
+
+def load_spec(app):
+	"""Spec OpenAPI de `app` : mémoire, puis cache disque, sinon construite par flasgger et écrite."""
+	spec = app.extensions.get("apispec")
+	if spec is not None:
+		return spec
+	path = spec_path(app)
+	try:
+		with open(path) as f:
+			spec = json.load(f)
+	except (OSError, ValueError):
+		# Construite sur les routes de `app` (current_app) avec la configuration de flasgger,
+		# et sérialisée comme par jsonify (les exemples YAML contiennent des dates)
+		data = app.json.dumps(_docs_app(app).swag.get_apispecs(SPEC_ENDPOINT))
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		# Écriture atomique : un worker concurrent lit l'ancienne version ou la nouvelle, jamais un fichier partiel
+		fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+		try:
+			with os.fdopen(fd, "w") as f:
+				f.write(data)
+			os.chmod(tmp, 0o644)
+			os.replace(tmp, path)
+		except BaseException:
+			os.unlink(tmp)
+			raise
+		spec = json.loads(data)
+	app.extensions["apispec"] = spec
+	return spec
+
+
+@apidocs_bp.route("/apispec_1.json", endpoint=SPEC_ENDPOINT)
+def apispec():
+	return jsonify(load_spec(current_app._get_current_object()))
+
+
+@apidocs_bp.route("/apidocs/")
+@apidocs_bp.route("/apidocs/index.html")
+@apidocs_bp.route("/oauth2-redirect.html")
+@apidocs_bp.route("/flasgger_static/<path:filename>")
+def swagger_ui(filename=None):
+	docs = _docs_app(current_app._get_current_object())
+	with docs.request_context(request.environ):
+		return docs.full_dispatch_request()
+
+
+def init_apidocs(app):
+	if not app.config["SWAGGER_SPEC_CACHE_DIR"]:
+		app.config["SWAGGER_SPEC_CACHE_DIR"] = os.path.join(app.instance_path, "apispec")
+	app.register_blueprint(apidocs_bp)
@@ -0,0 +1,155 @@
+# Stockage des artefacts de build
+"""artifacts.py : artefacts de builds en blobs adressés par contenu, dédupliqués sur disque.
+
+Un upload est lu par blocs depuis le corps de la requête et haché (sha256) au
+fil de l'eau dans un fichier temporaire : la mémoire utilisée ne dépend pas de
+la taille de l'artefact. Le fichier est ensuite renommé en
+<ARTIFACT_DIR>/<aa>/<bb>/<sha256> ; deux artefacts de même contenu partagent
+donc un seul fichier (ligne Blob), et une ligne Artifact relie chaque
+(build, nom) à son blob. Le téléchargement sert ce fichier tel quel
+(send_file : Range, ETag et If-None-Match, wsgi.file_wrapper).
+
+Un blob qui n'est plus référencé n'est pas supprimé tout de suite : le
+ramasse-miettes (`flask --app app gc-artifacts`) efface les blobs sans
+artefact inchangés depuis ARTIFACT_GC_GRACE_S, puis les fichiers sans ligne
+Blob et les fichiers temporaires abandonnés. Le délai de grâce protège un upload concurrent qui
+réutilise un blob en cours de collecte.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, select
+
+from .db import db, upsert
+from .models import Artifact, Blob
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ArtifactTooLarge(Exception):
+	"""Le corps de l'upload dépasse ARTIFACT_MAX_BYTES."""
+
+
+class BlobStore:
+	"""Fichiers de blobs adressés par leur sha256."""
+
+	def __init__(self, root, chunk_size=CHUNK_SIZE, max_bytes=0):
+		self.root = root
+		self.chunk_size = chunk_size
+		self.max_bytes = max_bytes
+		self.tmp = os.path.join(root, "tmp")
+		os.makedirs(self.tmp, exist_ok=True)
+
+	def path(self, digest):
+		return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+	def ingest(self, stream):
+		"""Copie `stream` par blocs en le hachant ; retourne (sha256, taille, chemin temporaire)."""
+		sha = hashlib.sha256()
+		size = 0
+		fd, tmp_path = tempfile.mkstemp(dir=self.tmp)
+		try:
+			with os.fdopen(fd, "wb") as f:
+				while True:
+					chunk = stream.read(self.chunk_size)
+					if not chunk:
+						break
+					size += len(chunk)
+					if self.max_bytes and size > self.max_bytes:
+						raise ArtifactTooLarge()
+					sha.update(chunk)
+					f.write(chunk)
+		except BaseException:
+			os.unlink(tmp_path)
+			raise
+		return sha.hexdigest(), size, tmp_path
+
+	def commit(self, digest, tmp_path):
+		"""Met le fichier temporaire en place ; retourne False si le contenu était déjà stocké."""
+		final = self.path(digest)
+		if os.path.exists(final):
+			os.unlink(tmp_path)
+			return False
+		os.makedirs(os.path.dirname(final), exist_ok=True)
+		os.chmod(tmp_path, 0o644)
+		os.replace(tmp_path, final)
+		return True
+
+	def remove(self, digest):
+		try:
+			os.unlink(self.path(digest))
+		except FileNotFoundError:
+			pass
+
+	def files(self):
+		"""(sha256, mtime) de chaque fichier de blob présent sur disque."""
+		for dirpath, dirnames, filenames in os.walk(self.root):
+			if dirpath == self.root:
+				dirnames[:] = [d for d in dirnames if d != "tmp"]
+			for name in filenames:
+				yield name, os.path.getmtime(os.path.join(dirpath, name))
+
+
+def store_artifact(store, build_id, name, stream, content_type):
+	"""Enregistre l'artefact `name` du build depuis `stream` (remplace un artefact de même nom)."""
+	digest, size, tmp_path = store.ingest(stream)
+	now = datetime.utcnow()
+	try:
+		# La ligne Blob est (re)touchée avant la mise en place du fichier : le GC la laisse en paix
+		db.session.execute(
+			upsert()(Blob).values(digest=digest, size=size, created_at=now, touched_at=now)
+			.on_conflict_do_update(index_elements=["digest"], set_={"touched_at": now})
+		)
+		db.session.commit()
+	except BaseException:
+		os.unlink(tmp_path)
+		raise
+	created = store.commit(digest, tmp_path)
+	artifact = db.session.execute(
+		select(Artifact).where(Artifact.build_id == build_id, Artifact.name == name)
+	).scalar()
+	if artifact is None:
+		artifact = Artifact(build_id=build_id, name=name)
+		db.session.add(artifact)
+	artifact.digest = digest
+	artifact.size = size
+	artifact.content_type = content_type
+	artifact.created_at = now
+	db.session.commit()
+	return artifact, not created
+
+
+def collect_garbage(store, grace_s):
+	"""Supprime les blobs non référencés et les fichiers orphelins ; retourne le nombre de blobs supprimés."""
+	cutoff = datetime.utcnow() - timedelta(seconds=grace_s)
+	digests = db.session.execute(
+		delete(Blob)
+		.where(Blob.touched_at < cutoff, ~exists().where(Artifact.digest == Blob.digest))
+		.returning(Blob.digest)
+	).scalars().all()
+	db.session.commit()
+	for digest in digests:
+		store.remove(digest)
+	# Fichiers sans ligne Blob (upload interrompu entre le renommage et le commit)
+	known = set(db.session.execute(select(Blob.digest)).scalars())
+	deadline = time.time() - grace_s
+	orphans = 0
+	for digest, mtime in store.files():
+		if digest not in known and mtime < deadline:
+			store.remove(digest)
+			orphans += 1
+	for name in os.listdir(store.tmp):
+		path = os.path.join(store.tmp, name)
+		if os.path.getmtime(path) < deadline:
+			os.unlink(path)
+	return len(digests) + orphans
+
+
+def init_artifacts(app):
+	root = app.config["ARTIFACT_DIR"] or os.path.join(app.instance_path, "artifacts")
+	store = BlobStore(root, chunk_size=app.config["ARTIFACT_CHUNK_SIZE"], max_bytes=app.config["ARTIFACT_MAX_BYTES"])
+	app.extensions["artifacts"] = store
+	return store
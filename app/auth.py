@@ -1 +1,79 @@
-# Authentification JWT (à compléter)
+# Authentification JWT : jetons de rafraîchissement et révocation
+"""auth.py : liste de révocation des JWT (access et refresh).
+
+Les jti révoqués sont persistés dans la table RevokedToken. Chaque processus en
+garde une copie en mémoire (recherche O(1) à chaque requête authentifiée),
+resynchronisée au plus toutes les JWT_BLOCKLIST_SYNC_S secondes. Les refresh
+tokens, rares, sont en plus vérifiés directement en base (clé primaire).
+"""
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from .db import db
+from .models import RevokedToken
+
+
+class TokenBlocklist:
+	def __init__(self, sync_interval=5.0):
+		self.sync_interval = sync_interval
+		self._revoked = {}  # jti -> expiration
+		self._synced_at = 0.0
+		self._last_id = 0
+		self._lock = threading.Lock()
+
+	def _sync(self):
+		"""Charge les révocations faites (par ce processus ou un autre) depuis la dernière synchro."""
+		now = time.monotonic()
+		if now - self._synced_at < self.sync_interval:
+			return
+		with self._lock:
+			if now - self._synced_at < self.sync_interval:
+				return
+			rows = db.session.execute(
+				select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.id > self._last_id)
+			).all()
+			for id_, jti, expires_at in rows:
+				self._revoked[jti] = expires_at
+				self._last_id = max(self._last_id, id_)
+			utcnow = datetime.utcnow()
+			self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp >= utcnow}
+			self._synced_at = now
+
+	def is_revoked(self, jwt_payload):
+		jti = jwt_payload["jti"]
+		if jwt_payload.get("type") == "refresh":
+			return db.session.execute(select(RevokedToken.id).where(RevokedToken.jti == jti)).first() is not None
+		self._sync()
+		return jti in self._revoked
+
+	def revoke(self, jwt_payload):
+		"""Révoque le jeton ; retourne False s'il l'était déjà (ex. deux rafraîchissements simultanés)."""
+		expires_at = datetime.fromtimestamp(jwt_payload["exp"], timezone.utc).replace(tzinfo=None)
+		try:
+			db.session.add(RevokedToken(jti=jwt_payload["jti"], token_type=jwt_payload.get("type", "access"), expires_at=expires_at))
+			# Les jetons expirés n'ont plus besoin d'être révoqués
+			db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at < datetime.utcnow()))
+			db.session.commit()
+		except IntegrityError:
+			db.session.rollback()
+			return False
+		finally:
+			# Sous le verrou : _sync remplace le dictionnaire
+			with self._lock:
+				self._revoked[jwt_payload["jti"]] = expires_at
+		return True
+
+
+def init_auth(app, jwt):
+	blocklist = TokenBlocklist(app.config["JWT_BLOCKLIST_SYNC_S"])
+	app.extensions["token_blocklist"] = blocklist
+
+	@jwt.token_in_blocklist_loader
+	def check_if_token_revoked(jwt_header, jwt_payload):
+		return blocklist.is_revoked(jwt_payload)
+
+	return blocklist
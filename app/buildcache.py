@@ -0,0 +1,125 @@
+# Cache des résultats de builds
+"""buildcache.py : réutilisation du résultat d'un build réussi (cache de build distant).
+
+La clé est (projet, branche, commit, empreinte de configuration) : le commit
+(ou une empreinte du contenu) est fourni au déclenchement, l'empreinte de
+configuration est le sha256 du JSON canonique de `config`. Quand un build
+réussi existe déjà pour la même clé, le déclenchement crée un build au statut
+"cached" qui référence ce résultat (cached_from_id) au lieu de mettre du
+travail en file.
+
+Rétention : une entrée inutilisée depuis BUILD_CACHE_TTL_S expire, et un
+projet garde au plus BUILD_CACHE_MAX_ENTRIES entrées (les moins récemment
+utilisées sont évincées). Les succès, échecs et évictions sont comptés dans
+/metrics (build_cache_requests_total, build_cache_evictions_total).
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+
+from .db import db, upsert
+from .models import Build, BuildCacheEntry
+
+
+def config_hash(config):
+	"""Empreinte stable d'une configuration de build (dict JSON, ordre des clés indifférent)."""
+	canonical = json.dumps(config or {}, sort_keys=True, separators=(",", ":"))
+	return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _count(app, name, value=1, **labels):
+	metrics = app.extensions.get("metrics")
+	if metrics is not None and value:
+		metrics.inc(name, value, **labels)
+
+
+def _key(project_id, branch, commit_sha, chash):
+	return (
+		BuildCacheEntry.project_id == project_id,
+		BuildCacheEntry.branch == branch,
+		BuildCacheEntry.commit_sha == commit_sha,
+		BuildCacheEntry.config_hash == chash,
+	)
+
+
+def lookup(project_id, branch, commit_sha, chash, app=None):
+	"""Build réussi pour cette clé, ou None ; compte le hit ou le miss (dans la transaction courante)."""
+	app = app or current_app
+	now = datetime.utcnow()
+	key = _key(project_id, branch, commit_sha, chash)
+	entry = db.session.execute(select(BuildCacheEntry).where(*key)).scalar()
+	build = None
+	if entry is not None:
+		if entry.last_used_at < now - timedelta(seconds=app.config["BUILD_CACHE_TTL_S"]):
+			db.session.execute(delete(BuildCacheEntry).where(*key))
+			_count(app, "build_cache_evictions_total", reason="ttl")
+		else:
+			build = db.session.get(Build, entry.build_id)
+			if build is None or build.status != "success":
+				db.session.execute(delete(BuildCacheEntry).where(*key))
+				build = None
+	if build is None:
+		_count(app, "build_cache_requests_total", result="miss")
+		return None
+	db.session.execute(
+		update(BuildCacheEntry).where(*key).values(hits=BuildCacheEntry.hits + 1, last_used_at=now)
+	)
+	_count(app, "build_cache_requests_total", result="hit")
+	return build
+
+
+def store(build, app=None):
+	"""Enregistre un build réussi (à appeler dans la transaction qui fixe son statut final)."""
+	app = app or current_app
+	if not app.config["BUILD_CACHE_ENABLED"] or not build.commit_sha or build.config_hash is None:
+		return
+	now = datetime.utcnow()
+	db.session.execute(
+		upsert()(BuildCacheEntry)
+		.values(
+			project_id=build.project_id, branch=build.branch, commit_sha=build.commit_sha,
+			config_hash=build.config_hash, build_id=build.id, created_at=now, last_used_at=now, hits=0,
+		)
+		.on_conflict_do_update(
+			index_elements=["project_id", "branch", "commit_sha", "config_hash"],
+			set_={"build_id": build.id, "created_at": now, "last_used_at": now},
+		)
+	)
+	_evict_over_capacity(build.project_id, app)
+
+
+def _evict_over_capacity(project_id, app):
+	limit = app.config["BUILD_CACHE_MAX_ENTRIES"]
+	if limit <= 0:
+		return
+	# Les entrées au-delà des `limit` plus récemment utilisées du projet
+	cutoff = db.session.execute(
+		select(BuildCacheEntry.last_used_at)
+		.where(BuildCacheEntry.project_id == project_id)
+		.order_by(BuildCacheEntry.last_used_at.desc())
+		.offset(limit - 1)
+		.limit(1)
+	).scalar()
+	if cutoff is None:
+		return
+	evicted = db.session.execute(
+		delete(BuildCacheEntry).where(BuildCacheEntry.project_id == project_id, BuildCacheEntry.last_used_at < cutoff)
+	).rowcount
+	_count(app, "build_cache_evictions_total", evicted, reason="capacity")
+
+
+def purge_expired(app=None):
+	"""Supprime les entrées expirées de tous les projets ; retourne leur nombre."""
+	app = app or current_app
+	cutoff = datetime.utcnow() - timedelta(seconds=app.config["BUILD_CACHE_TTL_S"])
+	purged = db.session.execute(delete(BuildCacheEntry).where(BuildCacheEntry.last_used_at < cutoff)).rowcount
+	db.session.commit()
+	_count(app, "build_cache_evictions_total", purged, reason="ttl")
+	return purged
+
+
+def entry_count():
+	return db.session.execute(select(func.count()).select_from(BuildCacheEntry)).scalar()
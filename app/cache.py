@@ -0,0 +1,93 @@
+# Cache de réponses pour les lectures fréquentes
+"""cache.py : cache LRU en mémoire (avec TTL) des réponses GET, ETag et 304.
+
+Les entrées sont indexées par (chemin, arguments de requête). Toute écriture
+invalide le cache en O(1) en incrémentant un numéro de génération : les entrées
+des générations précédentes sont ignorées puis remplacées au fil de l'eau.
+Le cache est propre à chaque processus ; le TTL borne la fraîcheur vis-à-vis des
+écritures faites par les autres workers.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, request
+
+
+class ResponseCache:
+	"""LRU borné à `maxsize` entrées, chacune valable `ttl` secondes."""
+
+	def __init__(self, maxsize=1024, ttl=5.0):
+		self.maxsize = maxsize
+		self.ttl = ttl
+		self.generation = 0
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, key):
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is None:
+				return None
+			expires, generation, _, _, _ = entry
+			if generation != self.generation or expires < time.monotonic():
+				del self._entries[key]
+				return None
+			self._entries.move_to_end(key)
+			return entry
+
+	def set(self, key, generation, body, etag, mimetype):
+		entry = (time.monotonic() + self.ttl, generation, body, etag, mimetype)
+		with self._lock:
+			if generation != self.generation:
+				# Une écriture a eu lieu pendant le calcul : ne pas mettre en cache
+				return entry
+			self._entries[key] = entry
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.maxsize:
+				self._entries.popitem(last=False)
+		return entry
+
+	def invalidate(self):
+		self.generation += 1
+
+
+def invalidate_cache(app=None):
+	"""À appeler après chaque écriture (commit) qui modifie des projets ou leurs builds."""
+	cache = (app or current_app).extensions.get("response_cache")
+	if cache is not None:
+		cache.invalidate()
+
+
+def cached_response(view):
+	"""Décorateur de vue GET : sert la réponse depuis le cache, avec ETag fort et 304."""
+	@wraps(view)
+	def wrapper(*args, **kwargs):
+		cache = current_app.extensions["response_cache"]
+		key = (request.path, tuple(sorted(request.args.items(multi=True))))
+		entry = cache.get(key)
+		if entry is None:
+			generation = cache.generation
+			resp = current_app.make_response(view(*args, **kwargs))
+			if resp.status_code != 200 or resp.is_streamed:
+				return resp
+			body = resp.get_data()
+			etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+			entry = cache.set(key, generation, body, etag, resp.mimetype)
+		_, _, body, etag, mimetype = entry
+		if request.if_none_match.contains(etag):
+			resp = Response(status=304)
+		else:
+			resp = Response(body, mimetype=mimetype)
+		resp.set_etag(etag)
+		resp.headers["Cache-Control"] = "no-cache"
+		return resp
+	return wrapper
+
+
+def init_cache(app):
+	cache = ResponseCache(app.config["RESPONSE_CACHE_SIZE"], app.config["RESPONSE_CACHE_TTL_S"])
+	app.extensions["response_cache"] = cache
+	return cache
@@ -0,0 +1,54 @@
+# Commandes CLI (flask --app app <commande>)
+import click
+
+def init_cli(app):
+
+	@app.cli.command("rebuild-stats")
+	def rebuild_stats_command():
+		"""Recalcule les statistiques de builds de tous les projets."""
+		from .stats import rebuild_stats
+		rebuild_stats()
+		click.echo("Statistiques recalculées")
+
+	@app.cli.command("rebuild-rollups")
+	def rebuild_rollups_command():
+		"""Recalcule les rollups horaires et journaliers des builds."""
+		from .analytics import rebuild_rollups
+		rebuild_rollups()
+		click.echo("Rollups recalculés")
+
+	@app.cli.command("purge-build-cache")
+	def purge_build_cache_command():
+		"""Supprime les entrées expirées du cache de résultats de builds (ex. cron quotidien)."""
+		from .buildcache import purge_expired
+		click.echo(f"{purge_expired()} entrées supprimées")
+
+	@app.cli.command("gc-artifacts")
+	def gc_artifacts_command():
+		"""Supprime les blobs d'artefacts qui ne sont plus référencés."""
+		from .artifacts import collect_garbage
+		removed = collect_garbage(app.extensions["artifacts"], app.config["ARTIFACT_GC_GRACE_S"])
+		click.echo(f"{removed} blobs supprimés")
+
+	@app.cli.command("purge-projects")
+	def purge_projects_command():
+		"""Purge maintenant les projets supprimés (reprise d'une purge interrompue)."""
+		purged = app.extensions["project_purge"].run()
+		click.echo(f"{len(purged)} projets purgés")
+
+	@app.cli.command("init-db")
+	def init_db_command():
+		"""Crée les tables manquantes et le compte admin (une fois par déploiement)."""
+		from .utils import init_db
+		init_db()
+		click.echo("Base initialisée")
+
+	@app.cli.command("build-apispec")
+	def build_apispec_command():
+		"""Génère la spec OpenAPI dans le cache disque (ex. au build de l'image)."""
+		if not app.config["SWAGGER_ENABLED"]:
+			raise click.ClickException("SWAGGER_ENABLED=0 : pas de spec à générer")
+		from .apidocs import load_spec, spec_path
+		with app.test_request_context():
+			load_spec(app)
+		click.echo(spec_path(app))
@@ -1,8 +1,107 @@
 # Configuration de base Flask
 import os
+from datetime import timedelta
 
 class Config:
     SECRET_KEY = os.environ.get("JWT_SECRET", "dev-secret")
     SQLALCHEMY_DATABASE_URI = os.environ.get("DB_URL", "sqlite:///app.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     ENV = os.environ.get("ENV", "development")
+    # Pool de connexions et SQLite multi-workers (cf. app/engine.py)
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT_S = float(os.environ.get("DB_POOL_TIMEOUT_S", 30))
+    DB_POOL_RECYCLE_S = int(os.environ.get("DB_POOL_RECYCLE_S", 1800))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+    SQLITE_WAL = os.environ.get("SQLITE_WAL", "1") == "1"
+    SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    # Réplicas en lecture pour les requêtes GET (cf. app/replicas.py), URLs séparées par des virgules
+    DB_REPLICA_URLS = os.environ.get("DB_REPLICA_URLS", "")
+    DB_REPLICA_MAX_LAG_S = float(os.environ.get("DB_REPLICA_MAX_LAG_S", 5.0))
+    DB_REPLICA_CHECK_INTERVAL_S = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL_S", 1.0))
+    # Schéma et compte admin créés par `flask --app app init-db` ; DB_AUTO_INIT=1 les crée au démarrage (dev)
+    DB_AUTO_INIT = os.environ.get("DB_AUTO_INIT", "0") == "1"
+
+    # Swagger UI (cf. app/apidocs.py) ; spec mise en cache par défaut dans <instance>/apispec
+    SWAGGER_ENABLED = os.environ.get("SWAGGER_ENABLED", "1") == "1"
+    SWAGGER_SPEC_CACHE_DIR = os.environ.get("SWAGGER_SPEC_CACHE_DIR")
+
+    # JWT : access tokens courts, refresh tokens longs (cf. app/auth.py)
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.environ.get("JWT_ACCESS_MINUTES", 30)))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.environ.get("JWT_REFRESH_DAYS", 30)))
+    JWT_BLOCKLIST_SYNC_S = float(os.environ.get("JWT_BLOCKLIST_SYNC_S", 5.0))
+    # Hash des mots de passe (cf. app/security.py), au format werkzeug complet
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_SALT_LENGTH = int(os.environ.get("PASSWORD_SALT_LENGTH", 16))
+
+    # Exécution des builds (cf. app/executor.py)
+    BUILD_WORKERS = int(os.environ.get("BUILD_WORKERS", 2))
+    BUILD_QUEUE_MAX = int(os.environ.get("BUILD_QUEUE_MAX", 100))
+    BUILD_POLL_INTERVAL_S = float(os.environ.get("BUILD_POLL_INTERVAL_S", 1.0))
+    BUILD_LEASE_S = float(os.environ.get("BUILD_LEASE_S", 3600))
+    BUILD_SIMULATED_MAX_S = float(os.environ.get("BUILD_SIMULATED_MAX_S", 10.0))
+    # Workers de builds et reprise de la purge des projets lancés à la première requête
+    BUILD_EXECUTOR_AUTOSTART = os.environ.get("BUILD_EXECUTOR_AUTOSTART", "1") == "1"
+    # Fins de builds écrites par lots (cf. app/writebehind.py) ; 0 = une transaction par fin de build
+    BUILD_WRITE_BEHIND = os.environ.get("BUILD_WRITE_BEHIND", "1") == "1"
+    BUILD_FLUSH_INTERVAL_S = float(os.environ.get("BUILD_FLUSH_INTERVAL_S", 0.05))
+    BUILD_FLUSH_MAX_BATCH = int(os.environ.get("BUILD_FLUSH_MAX_BATCH", 200))
+    # Ordonnancement (cf. app/scheduler.py) ; 0 = pas de limite de builds running par projet
+    BUILD_COALESCE = os.environ.get("BUILD_COALESCE", "1") == "1"
+    BUILD_PRIORITY_BRANCHES = tuple(b.strip() for b in os.environ.get("BUILD_PRIORITY_BRANCHES", "main,master").split(",") if b.strip())
+    BUILD_MAX_RUNNING_PER_PROJECT = int(os.environ.get("BUILD_MAX_RUNNING_PER_PROJECT", 0))
+    # Cache des résultats de builds (cf. app/buildcache.py) ; 0 entrée max = pas de limite par projet
+    BUILD_CACHE_ENABLED = os.environ.get("BUILD_CACHE_ENABLED", "1") == "1"
+    BUILD_CACHE_TTL_S = float(os.environ.get("BUILD_CACHE_TTL_S", 7 * 24 * 3600))
+    BUILD_CACHE_MAX_ENTRIES = int(os.environ.get("BUILD_CACHE_MAX_ENTRIES", 500))
+
+    # Purge des projets supprimés (cf. app/purge.py)
+    PROJECT_PURGE_BATCH_SIZE = int(os.environ.get("PROJECT_PURGE_BATCH_SIZE", 1000))
+    PROJECT_PURGE_INTERVAL_S = float(os.environ.get("PROJECT_PURGE_INTERVAL_S", 30))
+
+    # Import en masse de projets (cf. app/imports.py)
+    IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+
+    # Exports streamés (cf. app/routes/exports.py)
+    EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+
+    # Logs de build (cf. app/logstore.py) ; par défaut <instance>/logs
+    BUILD_LOG_DIR = os.environ.get("BUILD_LOG_DIR")
+    BUILD_LOG_CHUNK_SIZE = int(os.environ.get("BUILD_LOG_CHUNK_SIZE", 64 * 1024))
+
+    # Artefacts de builds (cf. app/artifacts.py) ; par défaut <instance>/artifacts, 0 octet max = pas de limite
+    ARTIFACT_DIR = os.environ.get("ARTIFACT_DIR")
+    ARTIFACT_CHUNK_SIZE = int(os.environ.get("ARTIFACT_CHUNK_SIZE", 1024 * 1024))
+    ARTIFACT_MAX_BYTES = int(os.environ.get("ARTIFACT_MAX_BYTES", 0))
+    ARTIFACT_GC_GRACE_S = float(os.environ.get("ARTIFACT_GC_GRACE_S", 3600))
+
+    # Flux SSE des builds (cf. app/events.py)
+    SSE_HEARTBEAT_S = float(os.environ.get("SSE_HEARTBEAT_S", 15.0))
+    SSE_RETRY_MS = int(os.environ.get("SSE_RETRY_MS", 3000))
+    SSE_POLL_INTERVAL_S = float(os.environ.get("SSE_POLL_INTERVAL_S", 0.5))
+    SSE_REPLAY_SIZE = int(os.environ.get("SSE_REPLAY_SIZE", 1000))
+    SSE_BUFFER_SIZE = int(os.environ.get("SSE_BUFFER_SIZE", 256))
+    SSE_EVENT_RETENTION_S = float(os.environ.get("SSE_EVENT_RETENTION_S", 3600))
+
+    # Cache de réponses GET /projects (cf. app/cache.py)
+    RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))
+    RESPONSE_CACHE_TTL_S = float(os.environ.get("RESPONSE_CACHE_TTL_S", 5.0))
+
+    # Contrôle d'admission (cf. app/admission.py), par processus : slots par classe de route,
+    # quotas par identité en jetons/s (0 = pas de quota) et coût d'une requête par classe
+    ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") == "1"
+    ADMISSION_CONCURRENCY = os.environ.get("ADMISSION_CONCURRENCY", "expensive=2,export=2,default=16")
+    ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", 8))
+    ADMISSION_MAX_WAIT_S = float(os.environ.get("ADMISSION_MAX_WAIT_S", 1.0))
+    ADMISSION_RATE_PER_S = float(os.environ.get("ADMISSION_RATE_PER_S", 20))
+    ADMISSION_BURST = float(os.environ.get("ADMISSION_BURST", 100))
+    ADMISSION_COSTS = os.environ.get("ADMISSION_COSTS", "expensive=5,export=5,default=1")
+
+    # Monitoring (cf. app/health.py, app/metrics.py)
+    HEALTH_CHECK_INTERVAL_S = float(os.environ.get("HEALTH_CHECK_INTERVAL_S", 5.0))
+
+    # Instrumentation SQL par requête, désactivée par défaut (cf. app/instrumentation.py)
+    SQL_INSTRUMENTATION = os.environ.get("SQL_INSTRUMENTATION", "0") == "1"
+    SQL_REPORT_SIZE = int(os.environ.get("SQL_REPORT_SIZE", 200))
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get("SQL_N_PLUS_ONE_THRESHOLD", 5))
@@ -1,5 +1,36 @@
 # Initialisation de la base SQLAlchemy
 """db.py : SQLAlchemy instance et health check DB."""
+import importlib
+
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+
+
+class RoutingSession(Session):
+	"""Session qui envoie les SELECT d'une requête en lecture seule vers un réplica.
+
+	Le réplica est choisi par app/replicas.py (g._db_replica). Tout le reste va
+	au primaire : écritures, flush, SELECT ... FOR UPDATE, SQL textuel ; dès la
+	première de ces instructions, la requête HTTP reste sur le primaire (elle
+	relit ainsi ses propres écritures).
+	"""
+
+	def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+		replica = g.get("_db_replica") if bind is None and has_app_context() else None
+		if replica is not None:
+			if not self._flushing and isinstance(clause, Select) and clause._for_update_arg is None:
+				return self._db.engines[replica]
+			if self._flushing or clause is not None:
+				g._db_replica = None
+		return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
 
-db = SQLAlchemy()
+def upsert():
+	"""insert() du dialecte courant (PostgreSQL ou SQLite, avec ON CONFLICT), importé à la demande."""
+	name = db.session.get_bind().dialect.name
+	return importlib.import_module(f"sqlalchemy.dialects.{'postgresql' if name == 'postgresql' else 'sqlite'}").insert
@@ -0,0 +1,96 @@
+# Configuration des moteurs SQLAlchemy pour plusieurs workers
+"""engine.py : options de pool, pragmas SQLite et sûreté au fork.
+
+- SQLite : chaque connexion passe en WAL (lecteurs et écrivain ne se bloquent
+  plus), `synchronous` configurable (NORMAL par défaut, sûr en WAL) et un
+  busy timeout : un écrivain concurrent attend le verrou au lieu d'échouer
+  avec « database is locked ».
+- Pool : taille, débordement, timeout et recyclage lus dans la configuration
+  (DB_POOL_*). Avec gunicorn, prévoir au moins `--threads` connexions par
+  worker, plus les threads d'arrière-plan (exécuteur de builds, health check).
+- Fork : après un fork (gunicorn --preload, multiprocessing), le processus
+  enfant abandonne les connexions héritées du parent sans les fermer
+  (engine.dispose(close=False)) et ouvre les siennes.
+"""
+import os
+import weakref
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from .db import db
+
+_engines = weakref.WeakSet()
+
+
+def _is_memory(url):
+	return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(config):
+	"""SQLALCHEMY_ENGINE_OPTIONS dérivées de la configuration (les options explicites priment)."""
+	url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+	options = {"pool_pre_ping": config["DB_POOL_PRE_PING"]}
+	if url.get_backend_name() == "sqlite":
+		# Le timeout du driver est le busy timeout de SQLite (en secondes)
+		options["connect_args"] = {"timeout": config["SQLITE_BUSY_TIMEOUT_MS"] / 1000}
+	if not _is_memory(url):
+		options.update(
+			pool_size=config["DB_POOL_SIZE"],
+			max_overflow=config["DB_MAX_OVERFLOW"],
+			pool_timeout=config["DB_POOL_TIMEOUT_S"],
+			pool_recycle=config["DB_POOL_RECYCLE_S"],
+		)
+	options.update(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+	return options
+
+
+def replica_binds(urls):
+	"""SQLALCHEMY_BINDS des réplicas (replica_0, replica_1...) à partir de DB_REPLICA_URLS."""
+	return {f"replica_{i}": url for i, url in enumerate(u.strip() for u in (urls or "").split(",") if u.strip())}
+
+
+def _sqlite_pragmas(config):
+	def on_connect(dbapi_conn, _record):
+		cursor = dbapi_conn.cursor()
+		try:
+			if config["SQLITE_WAL"]:
+				cursor.execute("PRAGMA journal_mode=WAL")
+			cursor.execute(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+			cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+		finally:
+			cursor.close()
+	return on_connect
+
+
+def _after_fork_in_child():
+	for engine in list(_engines):
+		engine.dispose(close=False)
+
+
+def dispose_engines():
+	"""Ferme les connexions du processus courant (ex. hook gunicorn worker_exit)."""
+	for engine in list(_engines):
+		engine.dispose()
+
+
+def configure_engine(app):
+	"""À appeler avant db.init_app(app) : options de pool et de driver, binds des réplicas."""
+	if app.config["SQLITE_SYNCHRONOUS"].upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+		raise ValueError(f"SQLITE_SYNCHRONOUS invalide : {app.config['SQLITE_SYNCHRONOUS']}")
+	app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+	# Réplicas en lecture (cf. app/replicas.py)
+	app.config["SQLALCHEMY_BINDS"] = {**replica_binds(app.config["DB_REPLICA_URLS"]), **(app.config.get("SQLALCHEMY_BINDS") or {})}
+
+
+def init_engine(app):
+	"""À appeler après db.init_app(app) : pragmas SQLite et suivi des moteurs pour le fork."""
+	with app.app_context():
+		for engine in db.engines.values():
+			if engine.dialect.name == "sqlite" and not _is_memory(engine.url):
+				event.listen(engine, "connect", _sqlite_pragmas(app.config))
+			_engines.add(engine)
+
+
+if hasattr(os, "register_at_fork"):
+	os.register_at_fork(after_in_child=_after_fork_in_child)
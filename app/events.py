@@ -0,0 +1,218 @@
+# Événements de builds (Server-Sent Events)
+"""events.py : journal des transitions de builds et diffusion en mémoire.
+
+Chaque transition (pending, running, success/fail, remise en file) insère une
+ligne BuildEvent dans la transaction qui la réalise : l'identifiant de la
+ligne est l'identifiant SSE, commun à tous les processus, ce qui permet de
+reprendre un flux (Last-Event-ID) sur n'importe quel worker.
+
+Dans chaque processus, un seul thread lit les nouveaux événements (une requête
+par intervalle, réveillée immédiatement par les écritures locales), formate
+chaque trame une fois et la distribue aux abonnés : le coût d'un événement ne
+dépend pas de la base pour 1 ou 10 000 abonnés. Chaque abonné a un tampon
+borné ; un abonné trop lent est déconnecté (il se reconnecte et rejoue depuis
+son dernier identifiant). Les derniers événements sont gardés en mémoire
+pour les reprises ; au-delà, la reprise relit la table.
+"""
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select
+
+from .db import db
+from .models import BuildEvent
+
+LOOKBACK_IDS = 100
+
+
+def record_event(build_id, project_id, status, at=None):
+	"""Journalise une transition (à appeler avant le commit de la transition)."""
+	db.session.execute(insert(BuildEvent).values(
+		build_id=build_id, project_id=project_id, status=status, created_at=at or datetime.utcnow()
+	))
+
+
+def wake_event_bus(app=None):
+	"""À appeler après le commit d'une transition : diffusion sans attendre l'intervalle."""
+	bus = (app or current_app).extensions.get("event_bus")
+	if bus is not None:
+		bus.wake()
+
+
+def frame(event_id, data, event="build"):
+	return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+
+def _event_json(row):
+	return json.dumps({
+		"build_id": row.build_id,
+		"project_id": row.project_id,
+		"status": row.status,
+		"at": row.created_at.isoformat() + "Z",
+	}, separators=(",", ":"))
+
+
+class Subscriber:
+	"""Abonné à un flux (un projet ou tous) avec un tampon borné de trames (id, texte)."""
+
+	def __init__(self, project_id=None, buffer_size=256):
+		self.project_id = project_id
+		self.frames = deque()
+		self.buffer_size = buffer_size
+		self.dropped = False
+		self.ready = threading.Event()
+
+	def push(self, event_id, data):
+		if len(self.frames) >= self.buffer_size:
+			self.dropped = True
+		else:
+			self.frames.append((event_id, data))
+		self.ready.set()
+
+	def drain(self, timeout):
+		"""Trames en attente, après au plus `timeout` secondes d'attente ([] : rien de neuf)."""
+		if not self.frames:
+			self.ready.wait(timeout)
+		self.ready.clear()
+		out = []
+		while self.frames:
+			out.append(self.frames.popleft())
+		return out
+
+
+class EventBus:
+	"""Lecture des BuildEvent par un thread unique et diffusion aux abonnés du processus."""
+
+	def __init__(self, app, poll_interval=0.5, replay_size=1000, buffer_size=256, retention_s=3600):
+		self.app = app
+		self.poll_interval = poll_interval
+		self.buffer_size = buffer_size
+		self.retention_s = retention_s
+		self.last_id = None
+		self._recent = deque(maxlen=replay_size)  # (id, project_id, trame)
+		self._by_project = {}
+		self._global = set()
+		self._lock = threading.Lock()
+		self._start_lock = threading.Lock()
+		self._wakeup = threading.Event()
+		self._thread = None
+		self._purged_at = 0.0
+
+	@property
+	def subscribers(self):
+		with self._lock:
+			return len(self._global) + sum(len(s) for s in self._by_project.values())
+
+	def wake(self):
+		self._wakeup.set()
+
+	def subscribe(self, project_id=None):
+		self._ensure_started()
+		sub = Subscriber(project_id, self.buffer_size)
+		with self._lock:
+			if project_id is None:
+				self._global.add(sub)
+			else:
+				self._by_project.setdefault(project_id, set()).add(sub)
+		return sub
+
+	def unsubscribe(self, sub):
+		with self._lock:
+			if sub.project_id is None:
+				self._global.discard(sub)
+			else:
+				subs = self._by_project.get(sub.project_id)
+				if subs is not None:
+					subs.discard(sub)
+					if not subs:
+						del self._by_project[sub.project_id]
+
+	def replay(self, after_id, project_id=None):
+		"""Trames d'identifiant > after_id ; None si l'historique ne remonte pas jusque-là."""
+		with self._lock:
+			recent = list(self._recent)
+		if recent and recent[0][0] <= after_id + 1:
+			return [(i, f) for i, p, f in recent if i > after_id and (project_id is None or p == project_id)]
+		# Hors de la mémoire : relecture de la table (une requête, pour cette reprise seulement)
+		limit = self._recent.maxlen
+		with self.app.app_context():
+			stmt = select(BuildEvent).where(BuildEvent.id > after_id).order_by(BuildEvent.id).limit(limit + 1)
+			if project_id is not None:
+				stmt = stmt.where(BuildEvent.project_id == project_id)
+			rows = db.session.execute(stmt).scalars().all()
+			oldest = db.session.execute(select(BuildEvent.id).order_by(BuildEvent.id).limit(1)).scalar()
+			db.session.remove()
+		if len(rows) > limit or oldest is None or oldest > after_id + 1:
+			return None
+		return [(r.id, frame(r.id, _event_json(r))) for r in rows]
+
+	def publish(self, rows):
+		"""Diffuse des BuildEvent (ordonnés par id) : une trame formatée par événement."""
+		with self._lock:
+			for row in rows:
+				data = frame(row.id, _event_json(row))
+				self._recent.append((row.id, row.project_id, data))
+				targets = list(self._global) + list(self._by_project.get(row.project_id, ()))
+				for sub in targets:
+					sub.push(row.id, data)
+					if sub.dropped:
+						# Abonné trop lent : retiré, son flux se termine
+						(self._global if sub.project_id is None else self._by_project[sub.project_id]).discard(sub)
+
+	def poll(self):
+		with self.app.app_context():
+			try:
+				if self.last_id is None:
+					self.last_id = db.session.execute(select(func.max(BuildEvent.id))).scalar() or 0
+				# Fenêtre de relecture : sous PostgreSQL, un id plus petit peut être commité après un plus grand
+				with self._lock:
+					seen = {i for i, _, _ in self._recent}
+				rows = [
+					row for row in db.session.execute(
+						select(BuildEvent).where(BuildEvent.id > self.last_id - LOOKBACK_IDS).order_by(BuildEvent.id).limit(1000)
+					).scalars()
+					if row.id not in seen
+				]
+				if rows:
+					self.last_id = max(self.last_id, rows[-1].id)
+					self.publish(rows)
+				if time.monotonic() - self._purged_at > 60:
+					self._purged_at = time.monotonic()
+					cutoff = datetime.utcnow() - timedelta(seconds=self.retention_s)
+					db.session.execute(delete(BuildEvent).where(BuildEvent.created_at < cutoff))
+					db.session.commit()
+			finally:
+				db.session.remove()
+
+	def _loop(self):
+		while True:
+			self._wakeup.wait(self.poll_interval)
+			self._wakeup.clear()
+			try:
+				self.poll()
+			except Exception:
+				self.app.logger.exception("event bus poll error")
+
+	def _ensure_started(self):
+		if self._thread is None:
+			with self._start_lock:
+				if self._thread is None:
+					self.poll()
+					self._thread = threading.Thread(target=self._loop, name="build-events", daemon=True)
+					self._thread.start()
+
+
+def init_events(app):
+	bus = EventBus(
+		app,
+		poll_interval=app.config["SSE_POLL_INTERVAL_S"],
+		replay_size=app.config["SSE_REPLAY_SIZE"],
+		buffer_size=app.config["SSE_BUFFER_SIZE"],
+		retention_s=app.config["SSE_EVENT_RETENTION_S"],
+	)
+	app.extensions["event_bus"] = bus
+	return bus
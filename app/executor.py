@@ -0,0 +1,216 @@
+# Exécution asynchrone des builds
+"""executor.py : file de builds persistante (table Build) et pool de workers.
+
+La file est la table Build elle-même : un build "pending" est un job en attente.
+Les workers réclament les builds de façon atomique (UPDATE conditionnel sur le
+statut), ce qui permet à plusieurs processus gunicorn de partager la même file.
+Les fins de builds sont écrites par lots (cf. app/writebehind.py).
+"""
+import atexit
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from .cache import invalidate_cache
+from .db import db
+from .models import Build, Project
+from .events import record_event, wake_event_bus
+from .scheduler import next_build_id
+from .writebehind import Transition
+
+
+class QueueFull(Exception):
+	"""File de builds saturée : le déclenchement doit être retenté plus tard."""
+
+
+def simulate_build(build, log, max_duration):
+	"""Runner par défaut : simule un build (durée et statut aléatoires).
+
+	`log` reçoit la sortie du build (LogWriter) ; le runner retourne (statut, résumé).
+	"""
+	log.write(f"Checking out {build.branch}\n")
+	time.sleep(random.uniform(0, max_duration))
+	status = random.choice(["success", "fail"])
+	log.write(f"Build finished: {status}\n")
+	return status, f"Build simulated on branch {build.branch}. Status: {status}"
+
+
+class BuildExecutor:
+	"""Pool de threads qui fait avancer les builds pending -> running -> success/fail."""
+
+	def __init__(self, app, workers=2, max_queue=100, poll_interval=1.0, lease_s=3600.0, runner=None):
+		self.app = app
+		self.workers = workers
+		self.max_queue = max_queue
+		self.poll_interval = poll_interval
+		self.lease_s = lease_s
+		self.runner = runner or (lambda build, log: simulate_build(build, log, app.config["BUILD_SIMULATED_MAX_S"]))
+		self._threads = []
+		self._lock = threading.Lock()
+		self._running = 0  # builds réclamés par ce processus, fin pas encore écrite
+		self._wakeup = threading.Semaphore(0)
+		self._stop = threading.Event()
+
+	@property
+	def depth(self):
+		"""Nombre de builds réclamés par ce processus et pas encore terminés."""
+		return self._running
+
+	def start(self):
+		with self._lock:
+			if self._threads or self.workers <= 0:
+				return
+			self._stop.clear()
+			self.recover()
+			for i in range(self.workers):
+				t = threading.Thread(target=self._work, name=f"build-worker-{i}", daemon=True)
+				t.start()
+				self._threads.append(t)
+		atexit.register(self.stop)
+
+	def stop(self, timeout=5.0):
+		self._stop.set()
+		for _ in self._threads:
+			self._wakeup.release()
+		for t in self._threads:
+			t.join(timeout)
+		self._threads = []
+		# Fins de builds encore en tampon
+		self.app.extensions["build_transitions"].stop(timeout)
+
+	def recover(self):
+		"""Remet en file les builds running dont le worker a disparu (bail expiré)."""
+		with self.app.app_context():
+			expired = datetime.utcnow() - timedelta(seconds=self.lease_s)
+			requeued = db.session.execute(
+				update(Build)
+				.where(Build.status == "running", Build.started_at < expired)
+				.values(status="pending", started_at=None)
+				.returning(Build.id, Build.project_id)
+			).all()
+			for build_id, project_id in requeued:
+				record_event(build_id, project_id, "pending")
+			db.session.commit()
+			if requeued:
+				wake_event_bus(self.app)
+
+	def admit(self):
+		"""Lève QueueFull si la file compte déjà max_queue builds pending.
+
+		La file est partagée par tous les processus : la borne porte sur les
+		builds pending en base (au plus max_queue lignes lues, index sur le
+		statut), pas sur un compteur local. Des déclenchements simultanés
+		peuvent la dépasser d'autant de builds.
+		"""
+		pending = db.session.execute(
+			select(func.count()).select_from(
+				select(Build.id).where(Build.status == "pending").limit(self.max_queue).subquery()
+			)
+		).scalar()
+		if pending >= self.max_queue:
+			raise QueueFull()
+
+	def _finished(self):
+		with self._lock:
+			self._running -= 1
+
+	def submit(self, build_id):
+		"""Signale un build déjà inséré en base (enqueue O(1), aucun travail ici)."""
+		if self.app.config["BUILD_EXECUTOR_AUTOSTART"]:
+			self.start()
+		self._wakeup.release()
+
+	def wait_idle(self, timeout=10.0):
+		"""Attend que les builds réclamés par ce processus soient terminés et écrits."""
+		deadline = time.monotonic() + timeout
+		while self._running and time.monotonic() < deadline:
+			time.sleep(0.01)
+		return self._running == 0
+
+	def _work(self):
+		with self.app.app_context():
+			while not self._stop.is_set():
+				self._wakeup.acquire(timeout=self.poll_interval)
+				if self._stop.is_set():
+					break
+				try:
+					while not self._stop.is_set():
+						claimed = self._claim()
+						if claimed is None:
+							break
+						self._run(claimed)
+				except Exception:
+					self.app.logger.exception("build worker error")
+					db.session.rollback()
+				finally:
+					db.session.remove()
+
+	def _claim(self):
+		"""Passe le prochain build pending (cf. app/scheduler.py) à running ; None si rien n'est éligible."""
+		while True:
+			build_id = next_build_id(self.app)
+			if build_id is None:
+				db.session.rollback()
+				return None
+			started_at = datetime.utcnow()
+			claimed = db.session.execute(
+				update(Build)
+				.where(Build.id == build_id, Build.status == "pending")
+				.values(status="running", started_at=started_at)
+			).rowcount
+			if not claimed:
+				# Un autre worker (ou processus) a pris ce build entre-temps
+				db.session.rollback()
+				continue
+			build = db.session.get(Build, build_id)
+			db.session.execute(
+				update(Project).where(Project.id == build.project_id).values(last_build_status="running")
+			)
+			record_event(build_id, build.project_id, "running", started_at)
+			db.session.commit()
+			with self._lock:
+				self._running += 1
+			invalidate_cache(self.app)
+			wake_event_bus(self.app)
+			db.session.refresh(build)
+			db.session.expunge(build)
+			return build
+
+	def _run(self, build):
+		log = self.app.extensions["build_logs"].writer(build.id)
+		try:
+			status, logs = self.runner(build, log)
+		except Exception as e:
+			log.write(f"Build runner error: {e}\n")
+			status, logs = "fail", f"Build runner error: {e}"
+		finally:
+			log.close()
+		finished_at = datetime.utcnow()
+		duration = (finished_at - build.started_at).total_seconds()
+		# Écriture différée, regroupée avec les autres fins de builds (cf. app/writebehind.py)
+		self.app.extensions["build_transitions"].add(
+			Transition(build, status, finished_at, duration, logs), on_flushed=self._finished
+		)
+
+
+def init_executor(app):
+	"""Crée l'exécuteur de builds de l'application (app.extensions["build_executor"])."""
+	executor = BuildExecutor(
+		app,
+		workers=app.config["BUILD_WORKERS"],
+		max_queue=app.config["BUILD_QUEUE_MAX"],
+		poll_interval=app.config["BUILD_POLL_INTERVAL_S"],
+		lease_s=app.config["BUILD_LEASE_S"],
+	)
+	app.extensions["build_executor"] = executor
+	if app.config["BUILD_EXECUTOR_AUTOSTART"]:
+		# Démarrage à la première requête, pas dans create_app() : les commandes CLI
+		# (init-db, build-apispec) ne lancent ni workers ni reprise, le schéma peut manquer
+		@app.before_request
+		def _start_executor():
+			if executor.workers > 0 and not executor._threads:
+				executor.start()
+	return executor
@@ -0,0 +1,62 @@
+# Health check de la base en arrière-plan
+"""health.py : vérification périodique de la DB, servie depuis la mémoire par /status."""
+import threading
+import time
+from datetime import datetime, UTC
+
+from sqlalchemy import text
+
+from .db import db
+
+
+class HealthChecker:
+	"""Exécute SELECT 1 toutes les `interval` secondes dans un thread dédié."""
+
+	def __init__(self, app, interval=5.0):
+		self.app = app
+		self.interval = interval
+		self.db_ok = None
+		self.checked_at = None  # datetime UTC du dernier contrôle
+		self._checked_mono = 0.0
+		self._thread = None
+		self._lock = threading.Lock()
+
+	def check(self):
+		with self.app.app_context():
+			try:
+				db.session.execute(text("SELECT 1"))
+				ok = True
+			except Exception:
+				ok = False
+			finally:
+				db.session.remove()
+		self.db_ok, self.checked_at = ok, datetime.now(UTC)
+		self._checked_mono = time.monotonic()
+		return ok
+
+	def _loop(self):
+		while True:
+			time.sleep(self.interval)
+			self.check()
+
+	def age(self):
+		return time.monotonic() - self._checked_mono
+
+	def snapshot(self):
+		"""(db_ok, checked_at, âge en secondes), sans requête si le dernier contrôle est frais."""
+		if self._thread is None:
+			with self._lock:
+				if self._thread is None:
+					self.check()
+					self._thread = threading.Thread(target=self._loop, name="db-health", daemon=True)
+					self._thread.start()
+		elif self.age() > 3 * self.interval:
+			# Le thread de contrôle est bloqué ou mort : contrôle synchrone
+			self.check()
+		return self.db_ok, self.checked_at, self.age()
+
+
+def init_health(app):
+	checker = HealthChecker(app, app.config["HEALTH_CHECK_INTERVAL_S"])
+	app.extensions["health"] = checker
+	return checker
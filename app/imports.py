@@ -0,0 +1,117 @@
+# Import en masse de projets
+"""imports.py : import par lots (tableau JSON ou NDJSON streamé) de projets.
+
+Chaque lot est validé, confronté à la base par une seule requête
+`name IN (...)`, puis inséré en executemany et commité.
+"""
+import json
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from .db import db
+from .models import Project
+from .schemas import validate_project
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def iter_records(req):
+	"""Itère sur les (record, erreur) d'une requête, sans charger un corps NDJSON en mémoire."""
+	if req.mimetype in NDJSON_TYPES:
+		for line in req.stream:
+			line = line.strip()
+			if not line:
+				continue
+			try:
+				yield json.loads(line), None
+			except ValueError as e:
+				yield None, f"invalid JSON: {e}"
+		return
+	data = req.get_json(silent=True)
+	if not isinstance(data, list):
+		raise ValueError("body must be a JSON array or NDJSON")
+	for record in data:
+		yield record, None
+
+
+def _chunks(iterable, size):
+	it = iter(iterable)
+	while chunk := list(islice(it, size)):
+		yield chunk
+
+
+def import_projects(records, batch_size=1000):
+	"""Importe les records par lots ; retourne le résumé et le résultat de chaque record."""
+	results = []
+	seen = set()
+	for chunk in _chunks(enumerate(records), batch_size):
+		pending = {}
+		for index, (record, error) in chunk:
+			errors = [error] if error else validate_project(record)
+			if errors:
+				results.append({"index": index, "status": "invalid", "message": ", ".join(errors)})
+			elif record["name"] in seen:
+				results.append({"index": index, "status": "conflict", "name": record["name"]})
+			else:
+				seen.add(record["name"])
+				pending[record["name"]] = (index, record["repo"])
+		results.extend(_insert_chunk(pending))
+	results.sort(key=lambda r: r["index"])
+	summary = {"created": 0, "conflict": 0, "invalid": 0}
+	for r in results:
+		summary[r["status"]] += 1
+	return {**summary, "results": results}
+
+
+def _insert_chunk(pending, retries=3):
+	"""Insère un lot {name: (index, repo)} ; les noms déjà en base sont des conflits."""
+	results = []
+	for attempt in range(retries):
+		existing = db.session.execute(
+			select(Project.name).where(Project.name.in_(list(pending)))
+		).scalars().all() if pending else []
+		for name in existing:
+			results.append({"index": pending.pop(name)[0], "status": "conflict", "name": name})
+		if not pending:
+			return results
+		now = datetime.utcnow()
+		rows = [
+			{"name": name, "repo": repo, "last_build_status": "none", "created_at": now}
+			for name, (_, repo) in pending.items()
+		]
+		try:
+			inserted = db.session.execute(
+				insert(Project).returning(Project.id, Project.name, sort_by_parameter_order=True),
+				rows
+			).all()
+			db.session.commit()
+		except IntegrityError:
+			# Un projet homonyme a été créé entre la vérification et l'insertion
+			db.session.rollback()
+			if attempt == retries - 1:
+				# Conflits répétés : un record par transaction, pour ne refuser que les homonymes
+				return results + _insert_one_by_one(pending)
+			continue
+		for id_, name in inserted:
+			results.append({"index": pending[name][0], "status": "created", "id": id_, "name": name})
+		return results
+
+
+def _insert_one_by_one(pending):
+	results = []
+	for name, (index, repo) in pending.items():
+		try:
+			id_ = db.session.execute(
+				insert(Project).returning(Project.id),
+				{"name": name, "repo": repo, "last_build_status": "none", "created_at": datetime.utcnow()}
+			).scalar()
+			db.session.commit()
+		except IntegrityError:
+			db.session.rollback()
+			results.append({"index": index, "status": "conflict", "name": name})
+			continue
+		results.append({"index": index, "status": "created", "id": id_, "name": name})
+	return results
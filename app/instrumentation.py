@@ -0,0 +1,131 @@
+# Instrumentation SQL par requête (optionnelle)
+"""instrumentation.py : nombre de requêtes SQL, temps DB et détection de N+1 par requête HTTP.
+
+Activée par SQL_INSTRUMENTATION=1. Désactivée, aucun listener ni hook n'est
+installé : le coût est nul. Activée, chaque réponse porte un en-tête
+Server-Timing (db;dur=...;desc="N queries") et un rapport glissant des
+dernières requêtes est servi par GET /debug/sql.
+"""
+import re
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, has_request_context, jsonify, request
+from flask_jwt_extended import jwt_required
+from sqlalchemy import event
+
+from .db import db
+
+_WS = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\([^)]*\)s|:\w+)\s*,)+\s*(?:\?|%\([^)]*\)s|:\w+)\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+
+
+def fingerprint(statement):
+	"""Forme normalisée d'une requête : les listes IN (...) et les littéraux numériques sont repliés."""
+	statement = _WS.sub(" ", statement).strip()
+	statement = _IN_LIST.sub("(?)", statement)
+	return _NUMBER.sub("?", statement)
+
+
+class SQLReport:
+	"""Rapport glissant des `size` dernières requêtes HTTP instrumentées."""
+
+	def __init__(self, size=200, n_plus_one_threshold=5):
+		self.n_plus_one_threshold = n_plus_one_threshold
+		self._recent = deque(maxlen=size)
+		self._lock = threading.Lock()
+
+	def add(self, entry):
+		with self._lock:
+			self._recent.append(entry)
+
+	def summary(self):
+		with self._lock:
+			recent = list(self._recent)
+		endpoints = {}
+		for e in recent:
+			agg = endpoints.setdefault(e["endpoint"], {"requests": 0, "queries": 0, "db_ms": 0.0, "n_plus_one": 0})
+			agg["requests"] += 1
+			agg["queries"] += e["queries"]
+			agg["db_ms"] += e["db_ms"]
+			agg["n_plus_one"] += bool(e["n_plus_one"])
+		for agg in endpoints.values():
+			agg["avg_queries"] = round(agg["queries"] / agg["requests"], 2)
+			agg["avg_db_ms"] = round(agg["db_ms"] / agg["requests"], 3)
+			agg["db_ms"] = round(agg["db_ms"], 3)
+		return {"endpoints": endpoints, "recent": recent[-50:]}
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+	if has_request_context() and "_sql" in g:
+		conn.info.setdefault("_sql_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+	if not (has_request_context() and "_sql" in g):
+		return
+	starts = conn.info.get("_sql_start")
+	if not starts:
+		return
+	elapsed = time.perf_counter() - starts.pop()
+	stats = g._sql
+	stats["queries"] += 1
+	stats["time"] += elapsed
+	fp = fingerprint(statement)
+	stats["fingerprints"][fp] = stats["fingerprints"].get(fp, 0) + 1
+
+
+def init_instrumentation(app):
+	if not app.config["SQL_INSTRUMENTATION"]:
+		return None
+	report = SQLReport(app.config["SQL_REPORT_SIZE"], app.config["SQL_N_PLUS_ONE_THRESHOLD"])
+	app.extensions["sql_report"] = report
+
+	with app.app_context():
+		for engine in db.engines.values():
+			event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+			event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+	@app.before_request
+	def _sql_start():
+		g._sql = {"queries": 0, "time": 0.0, "fingerprints": {}}
+
+	@app.after_request
+	def _sql_report(response):
+		stats = g.pop("_sql", None)
+		if stats is None:
+			return response
+		db_ms = stats["time"] * 1000
+		repeated = {fp: n for fp, n in stats["fingerprints"].items() if n >= report.n_plus_one_threshold}
+		response.headers.add("Server-Timing", f'db;dur={db_ms:.2f};desc="{stats["queries"]} queries"')
+		if repeated:
+			current_app.logger.warning("N+1 suspect sur %s %s : %s", request.method, request.path, repeated)
+		report.add({
+			"endpoint": request.endpoint or "<unmatched>",
+			"method": request.method,
+			"path": request.path,
+			"status": response.status_code,
+			"queries": stats["queries"],
+			"db_ms": round(db_ms, 3),
+			"repeated": {fp: n for fp, n in stats["fingerprints"].items() if n > 1},
+			"n_plus_one": sorted(repeated),
+		})
+		return response
+
+	@jwt_required()
+	def sql_report():
+		"""
+		Rapport d'instrumentation SQL (requêtes, temps DB, N+1 suspects)
+		---
+		tags:
+		  - Monitoring
+		responses:
+		  200:
+		    description: Agrégats par endpoint et dernières requêtes instrumentées
+		"""
+		return jsonify(report.summary())
+
+	app.add_url_rule("/debug/sql", "sql_report", sql_report, methods=["GET"])
+	return report
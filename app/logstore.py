@@ -0,0 +1,160 @@
+# Stockage des logs de build
+"""logstore.py : logs de build en segments gzip append-only, indexés en base.
+
+Chaque build a un fichier <BUILD_LOG_DIR>/<build_id>.log.gz constitué de membres
+gzip indépendants (un par segment). Leur concaténation reste un flux gzip valide :
+un log terminé peut donc être servi tel quel (Content-Encoding: gzip, sans copie).
+La table BuildLogChunk indexe la position de chaque segment, dans le log décompressé
+et dans le fichier, pour lire une plage d'octets ou la fin du log sans tout relire.
+"""
+import gzip
+import os
+import threading
+
+from sqlalchemy import delete, func, select
+
+from .db import db
+from .models import BuildLogChunk
+
+CHUNK_SIZE = 64 * 1024
+
+
+class LogStore:
+	"""Lecture / écriture des segments de log d'un build."""
+
+	def __init__(self, root, chunk_size=CHUNK_SIZE):
+		self.root = root
+		self.chunk_size = chunk_size
+		self._lock = threading.Lock()
+		os.makedirs(root, exist_ok=True)
+
+	def path(self, build_id):
+		return os.path.join(self.root, f"{build_id}.log.gz")
+
+	def append(self, build_id, data):
+		"""Ajoute un segment compressé au log du build (et son entrée d'index)."""
+		if not data:
+			return
+		member = gzip.compress(data, compresslevel=6, mtime=0)
+		with self._lock:
+			last = db.session.execute(
+				select(BuildLogChunk).where(BuildLogChunk.build_id == build_id)
+				.order_by(BuildLogChunk.seq.desc()).limit(1)
+			).scalar()
+			seq, offset, file_offset = 0, 0, 0
+			if last:
+				seq = last.seq + 1
+				offset = last.offset + last.length
+				file_offset = last.file_offset + last.file_length
+			with open(self.path(build_id), "ab") as f:
+				f.truncate(file_offset)  # écarte un segment orphelin (écriture interrompue)
+				f.write(member)
+			db.session.add(BuildLogChunk(
+				build_id=build_id, seq=seq, offset=offset, length=len(data),
+				file_offset=file_offset, file_length=len(member)
+			))
+			db.session.commit()
+
+	def writer(self, build_id):
+		return LogWriter(self, build_id)
+
+	def size(self, build_id):
+		"""Taille du log décompressé, en octets."""
+		return db.session.execute(
+			select(func.coalesce(func.sum(BuildLogChunk.length), 0)).where(BuildLogChunk.build_id == build_id)
+		).scalar()
+
+	def compressed_size(self, build_id):
+		return db.session.execute(
+			select(func.coalesce(func.sum(BuildLogChunk.file_length), 0)).where(BuildLogChunk.build_id == build_id)
+		).scalar()
+
+	def _chunks(self, build_id, start=0, end=None, reverse=False):
+		stmt = select(
+			BuildLogChunk.offset, BuildLogChunk.length, BuildLogChunk.file_offset, BuildLogChunk.file_length
+		).where(BuildLogChunk.build_id == build_id, BuildLogChunk.offset + BuildLogChunk.length > start)
+		if end is not None:
+			stmt = stmt.where(BuildLogChunk.offset < end)
+		stmt = stmt.order_by(BuildLogChunk.seq.desc() if reverse else BuildLogChunk.seq)
+		return db.session.execute(stmt).all()
+
+	def _read(self, fd, file_offset, file_length):
+		return gzip.decompress(os.pread(fd, file_length, file_offset))
+
+	def iter_range(self, build_id, start=0, end=None):
+		"""Itère sur les octets [start, end) du log décompressé, segment par segment."""
+		chunks = self._chunks(build_id, start, end)
+		if not chunks:
+			return
+		fd = os.open(self.path(build_id), os.O_RDONLY)
+		try:
+			for offset, length, file_offset, file_length in chunks:
+				data = self._read(fd, file_offset, file_length)
+				lo = max(start - offset, 0)
+				hi = length if end is None else min(end - offset, length)
+				yield data[lo:hi]
+		finally:
+			os.close(fd)
+
+	def read_range(self, build_id, start=0, end=None):
+		return b"".join(self.iter_range(build_id, start, end))
+
+	def tail(self, build_id, lines):
+		"""Les `lines` dernières lignes du log, en ne décompressant que les derniers segments."""
+		if lines <= 0:
+			return b""
+		chunks = self._chunks(build_id, reverse=True)
+		if not chunks:
+			return b""
+		parts, newlines = [], 0
+		fd = os.open(self.path(build_id), os.O_RDONLY)
+		try:
+			for i, (_, _, file_offset, file_length) in enumerate(chunks):
+				data = self._read(fd, file_offset, file_length)
+				parts.append(data)
+				# Le saut de ligne final du log ne compte pas comme une ligne
+				newlines += data.count(b"\n") - (i == 0 and data.endswith(b"\n"))
+				if newlines >= lines:
+					break
+		finally:
+			os.close(fd)
+		text = b"".join(reversed(parts))
+		trailing = text.endswith(b"\n")
+		kept = text.rstrip(b"\n").split(b"\n")[-lines:]
+		return b"\n".join(kept) + (b"\n" if trailing else b"")
+
+	def delete(self, build_id):
+		db.session.execute(delete(BuildLogChunk).where(BuildLogChunk.build_id == build_id))
+		try:
+			os.remove(self.path(build_id))
+		except FileNotFoundError:
+			pass
+
+
+class LogWriter:
+	"""Tampon d'écriture : regroupe la sortie d'un build en segments de chunk_size octets."""
+
+	def __init__(self, store, build_id):
+		self.store = store
+		self.build_id = build_id
+		self._buf = bytearray()
+
+	def write(self, text):
+		self._buf += text.encode() if isinstance(text, str) else text
+		if len(self._buf) >= self.store.chunk_size:
+			self.flush()
+
+	def flush(self):
+		if self._buf:
+			self.store.append(self.build_id, bytes(self._buf))
+			self._buf.clear()
+
+	def close(self):
+		self.flush()
+
+
+def init_logstore(app):
+	root = app.config["BUILD_LOG_DIR"] or os.path.join(app.instance_path, "logs")
+	store = LogStore(root, chunk_size=app.config["BUILD_LOG_CHUNK_SIZE"])
+	app.extensions["build_logs"] = store
+	return store
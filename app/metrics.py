@@ -0,0 +1,113 @@
+# Métriques au format Prometheus
+"""metrics.py : compteurs et histogrammes de latence par route, exposés sur /metrics.
+
+Chaque thread écrit dans sa propre partition (threading.local) : l'enregistrement
+d'une requête ne prend aucun verrou. Les partitions ne sont fusionnées qu'au
+moment de la collecte.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics:
+	def __init__(self, buckets=BUCKETS):
+		self.buckets = buckets
+		self._local = threading.local()
+		self._shards = []
+		self._lock = threading.Lock()  # uniquement pour enregistrer une nouvelle partition
+
+	def _shard(self):
+		shard = getattr(self._local, "shard", None)
+		if shard is None:
+			shard = self._local.shard = {"requests": {}, "latency": {}, "counters": {}}
+			with self._lock:
+				self._shards.append(shard)
+		return shard
+
+	def observe(self, route, method, status, seconds):
+		shard = self._shard()
+		key = (route, method, str(status))
+		shard["requests"][key] = shard["requests"].get(key, 0) + 1
+		hist = shard["latency"].get((route, method))
+		if hist is None:
+			# [compteur par bucket..., +Inf, somme]
+			hist = shard["latency"][(route, method)] = [0] * (len(self.buckets) + 2)
+		hist[bisect_left(self.buckets, seconds)] += 1
+		hist[-1] += seconds
+
+	def inc(self, name, value=1, **labels):
+		"""Compteur libre (ex. inc("build_cache_hits_total"))."""
+		counters = self._shard()["counters"]
+		key = (name, tuple(sorted(labels.items())))
+		counters[key] = counters.get(key, 0) + value
+
+	def collect(self):
+		requests, latency, counters = {}, {}, {}
+		for shard in list(self._shards):
+			for key, n in list(shard["requests"].items()):
+				requests[key] = requests.get(key, 0) + n
+			for key, hist in list(shard["latency"].items()):
+				total = latency.setdefault(key, [0] * len(hist))
+				for i, v in enumerate(list(hist)):
+					total[i] += v
+			for key, n in list(shard["counters"].items()):
+				counters[key] = counters.get(key, 0) + n
+		return requests, latency, counters
+
+	def render(self, gauges=()):
+		"""Texte d'exposition Prometheus ; `gauges` : itérable de (nom, aide, valeur)."""
+		requests, latency, counters = self.collect()
+		lines = [
+			"# HELP http_requests_total Requêtes HTTP traitées",
+			"# TYPE http_requests_total counter",
+		]
+		for (route, method, status), n in sorted(requests.items()):
+			lines.append(f'http_requests_total{{route="{route}",method="{method}",status="{status}"}} {n}')
+		lines += [
+			"# HELP http_request_duration_seconds Latence des requêtes HTTP",
+			"# TYPE http_request_duration_seconds histogram",
+		]
+		for (route, method), hist in sorted(latency.items()):
+			labels = f'route="{route}",method="{method}"'
+			cumulative = 0
+			for le, n in zip(self.buckets + ("+Inf",), hist[:-1]):
+				cumulative += n
+				lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+			lines.append(f"http_request_duration_seconds_sum{{{labels}}} {hist[-1]:.6f}")
+			lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+		seen = set()
+		for (name, labels), n in sorted(counters.items()):
+			if name not in seen:
+				seen.add(name)
+				lines.append(f"# TYPE {name} counter")
+			label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+			lines.append(f"{name}{{{label_str}}} {n}" if label_str else f"{name} {n}")
+		for name, help_, value in gauges:
+			if value is None:
+				continue
+			lines += [f"# HELP {name} {help_}", f"# TYPE {name} gauge", f"{name} {value}"]
+		return "\n".join(lines) + "\n"
+
+
+def init_metrics(app):
+	metrics = Metrics()
+	app.extensions["metrics"] = metrics
+
+	@app.before_request
+	def _metrics_start():
+		g._metrics_start = time.perf_counter()
+
+	@app.after_request
+	def _metrics_observe(response):
+		start = g.pop("_metrics_start", None)
+		if start is not None:
+			route = request.url_rule.rule if request.url_rule else "<unmatched>"
+			metrics.observe(route, request.method, response.status_code, time.perf_counter() - start)
+		return response
+
+	return metrics
@@ -14,18 +14,149 @@ class User(db.Model):
 		return f"<User {self.username}>"
 
 
+class RevokedToken(db.Model):
+	"""JWT révoqué (cf. app/auth.py) ; supprimé une fois expiré."""
+	id = db.Column(db.Integer, primary_key=True)
+	jti = db.Column(db.String(36), unique=True, nullable=False)
+	token_type = db.Column(db.String(10), nullable=False)
+	expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class ReplicationHeartbeat(db.Model):
+	"""Battement écrit sur le primaire et relu sur les réplicas pour mesurer leur retard (cf. app/replicas.py)."""
+	id = db.Column(db.Integer, primary_key=True)
+	beat_at = db.Column(db.DateTime, nullable=False)
+
+
 class Project(db.Model):
 	id = db.Column(db.Integer, primary_key=True)
 	name = db.Column(db.String(100), unique=True, nullable=False)
 	repo = db.Column(db.String(255), nullable=False)
 	last_build_status = db.Column(db.String(20))
 	created_at = db.Column(db.DateTime, default=datetime.utcnow)
-	builds = db.relationship('Build', backref='project', lazy=True)
+	# Suppression logique : le projet est ensuite purgé en arrière-plan (cf. app/purge.py)
+	deleted_at = db.Column(db.DateTime, index=True)
+	# passive_deletes : l'ORM ne charge jamais les builds pour supprimer un projet
+	builds = db.relationship('Build', backref='project', lazy=True, passive_deletes=True)
+
+	__table_args__ = (
+		# Pagination par curseur (cf. app/pagination.py)
+		db.Index("ix_project_created_at_id", "created_at", "id"),
+	)
+
+class ProjectStats(db.Model):
+	"""Statistiques de builds d'un projet, tenues à jour incrémentalement (cf. app/stats.py)."""
+	project_id = db.Column(db.Integer, db.ForeignKey('project.id', ondelete="CASCADE"), primary_key=True)
+	total_builds = db.Column(db.Integer, nullable=False, default=0)
+	success_count = db.Column(db.Integer, nullable=False, default=0)
+	failure_count = db.Column(db.Integer, nullable=False, default=0)
+	# Welford : moyenne et somme des carrés des écarts des durées des builds terminés
+	duration_mean = db.Column(db.Float, nullable=False, default=0.0)
+	duration_m2 = db.Column(db.Float, nullable=False, default=0.0)
+	last_build_at = db.Column(db.DateTime)
+	# > 0 : succès consécutifs, < 0 : échecs consécutifs
+	current_streak = db.Column(db.Integer, nullable=False, default=0)
+	best_success_streak = db.Column(db.Integer, nullable=False, default=0)
 
 class Build(db.Model):
 	id = db.Column(db.Integer, primary_key=True)
-	project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
-	status = db.Column(db.String(20), nullable=False)
-	duration_s = db.Column(db.Float, nullable=False)
+	project_id = db.Column(db.Integer, db.ForeignKey('project.id', ondelete="CASCADE"), nullable=False)
+	# pending -> running -> success / fail (cf. app/executor.py), pending -> superseded (cf. app/scheduler.py)
+	# cached dès le déclenchement (cf. app/buildcache.py), ou canceled à la suppression du projet (cf. app/purge.py)
+	status = db.Column(db.String(20), nullable=False, index=True)
+	branch = db.Column(db.String(100), nullable=False, default="main")
+	# Classe de priorité : 0 pour les branches principales, 1 sinon
+	priority = db.Column(db.SmallInteger, nullable=False, default=1, server_default="1")
+	# Révision construite et empreinte de configuration : clé du cache de résultats (cf. app/buildcache.py)
+	commit_sha = db.Column(db.String(64))
+	config_hash = db.Column(db.String(64))
+	# Statut "cached" : build réussi dont le résultat est réutilisé
+	cached_from_id = db.Column(db.Integer, db.ForeignKey('build.id', ondelete="SET NULL"))
+	duration_s = db.Column(db.Float)
+	# Résumé court ; la sortie complète est dans BuildLogChunk (cf. app/logstore.py)
 	logs = db.Column(db.String(255))
 	created_at = db.Column(db.DateTime, default=datetime.utcnow)
+	started_at = db.Column(db.DateTime)
+	finished_at = db.Column(db.DateTime)
+
+	__table_args__ = (
+		# Pagination par curseur des builds d'un projet (cf. app/pagination.py)
+		db.Index("ix_build_project_created_at_id", "project_id", "created_at", "id"),
+		# Ordre de réclamation des builds pending (cf. app/scheduler.py)
+		db.Index("ix_build_status_priority_id", "status", "priority", "id"),
+		# Export incrémental des builds (cf. app/routes/exports.py)
+		db.Index("ix_build_finished_at", "finished_at"),
+	)
+
+class BuildEvent(db.Model):
+	"""Transition d'un build, diffusée en Server-Sent Events (cf. app/events.py) ; purgée après rétention."""
+	id = db.Column(db.Integer, primary_key=True)
+	build_id = db.Column(db.Integer, nullable=False)
+	project_id = db.Column(db.Integer, nullable=False, index=True)
+	status = db.Column(db.String(20), nullable=False)
+	created_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class BuildCacheEntry(db.Model):
+	"""Résultat réutilisable : dernier build réussi d'une clé (projet, branche, commit, configuration)."""
+	project_id = db.Column(db.Integer, db.ForeignKey('project.id', ondelete="CASCADE"), primary_key=True)
+	branch = db.Column(db.String(100), primary_key=True)
+	commit_sha = db.Column(db.String(64), primary_key=True)
+	config_hash = db.Column(db.String(64), primary_key=True)
+	build_id = db.Column(db.Integer, db.ForeignKey('build.id', ondelete="CASCADE"), nullable=False)
+	created_at = db.Column(db.DateTime, nullable=False)
+	# Rétention : expiration et éviction LRU sur la date de dernière utilisation
+	last_used_at = db.Column(db.DateTime, nullable=False, index=True)
+	hits = db.Column(db.Integer, nullable=False, default=0)
+
+
+class Blob(db.Model):
+	"""Contenu d'artefact stocké une seule fois, adressé par son sha256 (cf. app/artifacts.py)."""
+	digest = db.Column(db.String(64), primary_key=True)
+	size = db.Column(db.BigInteger, nullable=False)
+	created_at = db.Column(db.DateTime, nullable=False)
+	# Dernier upload de ce contenu : le GC ne supprime que les blobs non référencés et plus anciens que le délai de grâce
+	touched_at = db.Column(db.DateTime, nullable=False)
+
+
+class Artifact(db.Model):
+	"""Artefact nommé d'un build, pointant vers son blob."""
+	id = db.Column(db.Integer, primary_key=True)
+	build_id = db.Column(db.Integer, db.ForeignKey('build.id', ondelete="CASCADE"), nullable=False)
+	name = db.Column(db.String(255), nullable=False)
+	digest = db.Column(db.String(64), db.ForeignKey('blob.digest'), nullable=False, index=True)
+	size = db.Column(db.BigInteger, nullable=False)
+	content_type = db.Column(db.String(100), nullable=False)
+	created_at = db.Column(db.DateTime, nullable=False)
+
+	__table_args__ = (
+		db.UniqueConstraint("build_id", "name", name="uq_artifact_build_name"),
+	)
+
+
+class BuildLogChunk(db.Model):
+	"""Index d'un segment gzip du log d'un build (cf. app/logstore.py)."""
+	build_id = db.Column(db.Integer, db.ForeignKey('build.id', ondelete="CASCADE"), primary_key=True)
+	seq = db.Column(db.Integer, primary_key=True, autoincrement=False)
+	# Position et taille dans le log décompressé
+	offset = db.Column(db.BigInteger, nullable=False)
+	length = db.Column(db.Integer, nullable=False)
+	# Position et taille du membre gzip dans le fichier
+	file_offset = db.Column(db.BigInteger, nullable=False)
+	file_length = db.Column(db.Integer, nullable=False)
+
+class BuildRollup(db.Model):
+	"""Agrégat des builds terminés d'un projet sur une heure ou un jour (cf. app/analytics.py)."""
+	project_id = db.Column(db.Integer, db.ForeignKey('project.id', ondelete="CASCADE"), primary_key=True)
+	granularity = db.Column(db.String(4), primary_key=True)  # hour / day
+	bucket_start = db.Column(db.DateTime, primary_key=True)
+	count = db.Column(db.Integer, nullable=False, default=0)
+	failure_count = db.Column(db.Integer, nullable=False, default=0)
+	duration_sum = db.Column(db.Float, nullable=False, default=0.0)
+	# Sketch de quantiles des durées, JSON {clé de bucket logarithmique: effectif}
+	sketch = db.Column(db.Text, nullable=False, default="{}")
+
+	__table_args__ = (
+		# Requêtes tous projets confondus sur une plage de dates
+		db.Index("ix_build_rollup_granularity_bucket", "granularity", "bucket_start"),
+	)
@@ -0,0 +1,94 @@
+# Pagination par curseur (keyset)
+"""pagination.py : curseurs opaques sur (created_at, id), sans COUNT ni OFFSET.
+
+Chaque page reprend là où la précédente s'est arrêtée grâce à un prédicat
+(created_at, id) < (dernier created_at, dernier id) servi par un index composite :
+la page N coûte autant que la page 1.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import func, select, tuple_
+
+from .db import db
+
+MAX_PER_PAGE = 500
+
+
+class InvalidCursor(ValueError):
+	"""Curseur illisible ou falsifié."""
+
+
+def encode_values(values):
+	"""Curseur opaque pour une liste de valeurs JSON (clé de tri de la dernière ligne)."""
+	raw = json.dumps(values, separators=(",", ":")).encode()
+	return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_values(cursor):
+	try:
+		values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+	except ValueError as e:
+		raise InvalidCursor(str(e)) from e
+	if not isinstance(values, list):
+		raise InvalidCursor("cursor must encode a list")
+	return values
+
+
+def encode_cursor(created_at, id_):
+	return encode_values([created_at.isoformat(), id_])
+
+
+def decode_cursor(cursor):
+	try:
+		created_at, id_ = decode_values(cursor)
+		return datetime.fromisoformat(created_at), int(id_)
+	except (ValueError, TypeError) as e:
+		raise InvalidCursor(str(e)) from e
+
+
+class InvalidPageArg(ValueError):
+	"""Paramètre de pagination (?per_page=, ?page=) non entier."""
+
+
+def _int_arg(args, name, default):
+	value = args.get(name, type=int)
+	if value is None:
+		if name in args:
+			raise InvalidPageArg(f"{name} must be an integer")
+		return default
+	return value
+
+
+def per_page_arg(args, default=10):
+	"""Taille de page bornée à [1, MAX_PER_PAGE] ; lève InvalidPageArg."""
+	return max(1, min(_int_arg(args, "per_page", default), MAX_PER_PAGE))
+
+
+def page_arg(args):
+	"""Numéro de page de la pagination historique ; lève InvalidPageArg."""
+	return max(1, _int_arg(args, "page", 1))
+
+
+def keyset_page(stmt, created_col, id_col, per_page, cursor=None, with_total=False):
+	"""Exécute une page de `stmt` triée par (created_at, id) décroissants.
+
+	`stmt` est un select() de colonnes qui inclut created_col et id_col.
+	Retourne (lignes, next_cursor, total) ; total vaut None sauf si with_total.
+	"""
+	page_stmt = stmt
+	if cursor:
+		created_at, id_ = decode_cursor(cursor)
+		page_stmt = page_stmt.where(tuple_(created_col, id_col) < tuple_(created_at, id_))
+	page_stmt = page_stmt.order_by(created_col.desc(), id_col.desc()).limit(per_page + 1)
+	rows = db.session.execute(page_stmt).all()
+	next_cursor = None
+	if len(rows) > per_page:
+		rows = rows[:per_page]
+		last = rows[-1]
+		next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+	total = None
+	if with_total:
+		total = db.session.execute(select(func.count()).select_from(stmt.subquery())).scalar()
+	return rows, next_cursor, total
@@ -0,0 +1,159 @@
+# Suppression des projets en arrière-plan
+"""purge.py : suppression logique des projets puis purge ensembliste par lots.
+
+DELETE /projects/<id> ne fait qu'un UPDATE (deleted_at) et annule les builds
+pending du projet : la réponse est immédiate quel que soit le nombre de builds,
+et le projet disparaît aussitôt de l'API. Un thread de purge supprime ensuite
+ses builds par lots de PROJECT_PURGE_BATCH_SIZE, une transaction courte par
+lot : index des logs et artefacts (les blobs sont libérés par le ramasse-miettes
+des artefacts), fichiers de logs, puis les builds eux-mêmes par DELETE ... WHERE id IN (...). Aucun objet ORM n'est
+chargé. Les lots vont du build le plus récent au plus ancien : un build
+"cached" est toujours plus récent que celui qu'il référence.
+
+Le projet, ses statistiques, rollups, événements et entrées de cache ne sont
+supprimés qu'une fois tous ses builds purgés ; les builds encore running sont attendus (leur
+transition finale écrit dans les statistiques du projet). Les clés étrangères
+sont déclarées ON DELETE CASCADE pour les bases qui les appliquent
+(PostgreSQL) ; la purge par lots reste le chemin normal, pour ne jamais
+verrouiller la table build le temps d'une cascade de plusieurs millions de
+lignes. Une purge interrompue reprend au premier passage du thread après un
+redémarrage (lancé à la première requête), ou via `flask --app app purge-projects`.
+"""
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import delete, select, update
+
+from .db import db
+from .events import record_event
+from .replicas import get_fresh
+from .models import (
+	Artifact, Build, BuildCacheEntry, BuildEvent, BuildLogChunk, BuildRollup, Project, ProjectStats,
+)
+
+
+def live_project(project_id):
+	"""Projet non supprimé (relu sur le primaire au besoin, cf. get_fresh), ou None."""
+	project = get_fresh(Project, project_id)
+	return project if project is not None and project.deleted_at is None else None
+
+
+def soft_delete_project(project_id):
+	"""Marque le projet supprimé et annule ses builds pending ; retourne leurs ids, ou None si le projet n'existe pas."""
+	now = datetime.utcnow()
+	deleted = db.session.execute(
+		update(Project).where(Project.id == project_id, Project.deleted_at.is_(None)).values(deleted_at=now)
+	).rowcount
+	if not deleted:
+		db.session.rollback()
+		return None
+	canceled = db.session.execute(
+		update(Build)
+		.where(Build.project_id == project_id, Build.status == "pending")
+		.values(status="canceled", finished_at=now, logs="Project deleted")
+		.returning(Build.id)
+	).scalars().all()
+	for build_id in canceled:
+		record_event(build_id, project_id, "canceled", now)
+	# Plus aucun build ne peut réutiliser ces résultats (bornées par BUILD_CACHE_MAX_ENTRIES)
+	db.session.execute(delete(BuildCacheEntry).where(BuildCacheEntry.project_id == project_id))
+	db.session.commit()
+	return canceled
+
+
+class ProjectPurger:
+	"""Thread unique qui purge les projets supprimés, par lots de `batch_size` builds."""
+
+	def __init__(self, app, batch_size=1000, interval=30.0):
+		self.app = app
+		self.batch_size = batch_size
+		self.interval = interval
+		self._thread = None
+		self._lock = threading.Lock()
+		self._wakeup = threading.Event()
+
+	def wake(self):
+		"""Démarre le thread au besoin et lance un passage sans attendre l'intervalle."""
+		if self._thread is None:
+			with self._lock:
+				if self._thread is None:
+					self._thread = threading.Thread(target=self._loop, name="project-purge", daemon=True)
+					self._thread.start()
+		self._wakeup.set()
+
+	def _loop(self):
+		while True:
+			self._wakeup.wait(self.interval)
+			self._wakeup.clear()
+			try:
+				self.run()
+			except Exception:
+				self.app.logger.exception("project purge error")
+
+	def run(self):
+		"""Un passage : purge tous les projets supprimés ; retourne les ids des projets effacés."""
+		with self.app.app_context():
+			try:
+				ids = db.session.execute(select(Project.id).where(Project.deleted_at.is_not(None))).scalars().all()
+				return [project_id for project_id in ids if self.purge(project_id)]
+			finally:
+				db.session.remove()
+
+	def purge(self, project_id):
+		"""Purge un projet supprimé ; retourne False s'il a encore des builds running."""
+		while self.purge_batch(project_id):
+			pass
+		# Il ne reste que des builds running : le projet sera effacé à un passage suivant
+		remaining = db.session.execute(
+			select(Build.id).where(Build.project_id == project_id).limit(1)
+		).first()
+		if remaining:
+			db.session.rollback()
+			return False
+		# Entrées de cache : déjà effacées par soft_delete_project, sauf course avec une fin de build
+		for model in (ProjectStats, BuildRollup, BuildEvent, BuildCacheEntry):
+			db.session.execute(delete(model).where(model.project_id == project_id))
+		db.session.execute(delete(Project).where(Project.id == project_id))
+		db.session.commit()
+		return True
+
+	def purge_batch(self, project_id):
+		"""Supprime un lot de builds terminés du projet (une transaction) ; retourne leur nombre."""
+		ids = db.session.execute(
+			select(Build.id)
+			.where(Build.project_id == project_id, Build.status != "running")
+			.order_by(Build.id.desc())
+			.limit(self.batch_size)
+		).scalars().all()
+		if not ids:
+			db.session.rollback()
+			return 0
+		for model in (BuildLogChunk, Artifact):
+			db.session.execute(delete(model).where(model.build_id.in_(ids)))
+		db.session.execute(delete(Build).where(Build.id.in_(ids)))
+		db.session.commit()
+		logs = self.app.extensions["build_logs"]
+		for build_id in ids:
+			try:
+				os.unlink(logs.path(build_id))
+			except FileNotFoundError:
+				pass
+		return len(ids)
+
+
+def init_purge(app):
+	purger = ProjectPurger(
+		app,
+		batch_size=app.config["PROJECT_PURGE_BATCH_SIZE"],
+		interval=app.config["PROJECT_PURGE_INTERVAL_S"],
+	)
+	app.extensions["project_purge"] = purger
+	if app.config["BUILD_EXECUTOR_AUTOSTART"]:
+		# Reprise d'une purge interrompue par un redémarrage : un passage dès la première
+		# requête, comme la reprise des builds running au démarrage de l'exécuteur
+		@app.before_request
+		def _resume_purge():
+			if purger._thread is None:
+				purger.wake()
+	return purger
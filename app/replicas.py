@@ -0,0 +1,146 @@
+# Routage lecture / écriture vers des réplicas
+"""replicas.py : envoie les lectures des requêtes GET vers un réplica à jour.
+
+DB_REPLICA_URLS (URLs séparées par des virgules) déclare des binds
+SQLAlchemy `replica_0`, `replica_1`... Pour chaque requête GET/HEAD, un réplica
+est tiré au sort parmi ceux dont le retard est sous DB_REPLICA_MAX_LAG_S ; la
+session (app/db.py, RoutingSession) lui envoie les SELECT, et revient au
+primaire pour le reste de la requête dès la première écriture.
+
+Le retard est mesuré par battement de cœur : un thread écrit l'heure dans la
+table replication_heartbeat du primaire, puis relit cette ligne sur chaque
+réplica ; l'écart entre les deux valeurs est le retard de réplication. Un
+réplica injoignable ou en retard est écarté jusqu'au contrôle suivant, et tant
+qu'aucun contrôle n'a réussi tout va au primaire. La réplication elle-même est
+externe (streaming PostgreSQL, litestream ou copie de fichier pour SQLite).
+"""
+import random
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, g, request
+from sqlalchemy import select, update
+
+from .db import db, upsert
+from .models import ReplicationHeartbeat
+
+READ_METHODS = ("GET", "HEAD")
+
+
+class ReplicaRouter:
+	"""Retard de chaque réplica, contrôlé toutes les `interval` secondes dans un thread dédié."""
+
+	def __init__(self, app, keys, max_lag=5.0, interval=1.0):
+		self.app = app
+		self.keys = list(keys)
+		self.max_lag = max_lag
+		self.interval = interval
+		self.lags = {key: None for key in self.keys}  # secondes ; None = inconnu ou injoignable
+		self._thread = None
+		self._lock = threading.Lock()
+
+	def check(self):
+		with self.app.app_context():
+			try:
+				now = datetime.utcnow()
+				db.session.execute(upsert()(ReplicationHeartbeat).values(id=1, beat_at=now).on_conflict_do_nothing())
+				db.session.execute(update(ReplicationHeartbeat).where(ReplicationHeartbeat.id == 1).values(beat_at=now))
+				db.session.commit()
+			except Exception:
+				db.session.rollback()
+				now = None
+			finally:
+				db.session.remove()
+			for key in self.keys:
+				self.lags[key] = self._lag(key, now)
+		return dict(self.lags)
+
+	def _lag(self, key, primary_beat):
+		if primary_beat is None:
+			return None
+		try:
+			with db.engines[key].connect() as conn:
+				beat = conn.execute(select(ReplicationHeartbeat.beat_at).where(ReplicationHeartbeat.id == 1)).scalar()
+		except Exception:
+			return None
+		return None if beat is None else max(0.0, (primary_beat - beat).total_seconds())
+
+	def _loop(self):
+		while True:
+			time.sleep(self.interval)
+			self.check()
+
+	def healthy(self):
+		"""Réplicas dont le retard connu est sous max_lag."""
+		if self._thread is None:
+			with self._lock:
+				if self._thread is None:
+					self.check()
+					self._thread = threading.Thread(target=self._loop, name="db-replica-lag", daemon=True)
+					self._thread.start()
+		return [key for key, lag in self.lags.items() if lag is not None and lag <= self.max_lag]
+
+	def choose(self):
+		healthy = self.healthy()
+		return random.choice(healthy) if healthy else None
+
+	def max_known_lag(self):
+		known = [lag for lag in self.lags.values() if lag is not None]
+		return max(known) if known else None
+
+
+def read_engine():
+	"""Moteur des lectures hors session (exports streamés) : le réplica de la requête, sinon le primaire."""
+	replica = g.get("_db_replica")
+	return db.engines[replica] if replica else db.engine
+
+
+def get_fresh(model, ident):
+	"""session.get() relu sur le primaire si le réplica ne connaît pas (encore) la ligne.
+
+	Couvre la lecture juste après création (POST puis GET) sans attendre la réplication.
+	"""
+	obj = db.session.get(model, ident)
+	if obj is None and g.get("_db_replica"):
+		g._db_replica = None
+		obj = db.session.get(model, ident)
+	return obj
+
+
+def first_fresh(stmt):
+	"""Première ligne de `stmt` (select Core), relue sur le primaire si le réplica n'en a aucune."""
+	row = db.session.execute(stmt).first()
+	if row is None and g.get("_db_replica"):
+		g._db_replica = None
+		row = db.session.execute(stmt).first()
+	return row
+
+
+def primary(view):
+	"""Vue GET qui doit lire le primaire (donnée tout juste écrite, verrou...)."""
+	view._db_primary = True
+	return view
+
+
+def init_replicas(app):
+	"""À appeler après db.init_app(app) ; sans DB_REPLICA_URLS, rien n'est installé."""
+	keys = sorted(k for k in app.config.get("SQLALCHEMY_BINDS") or {} if k.startswith("replica_"))
+	if not keys:
+		return None
+	router = ReplicaRouter(app, keys, app.config["DB_REPLICA_MAX_LAG_S"], app.config["DB_REPLICA_CHECK_INTERVAL_S"])
+	app.extensions["replicas"] = router
+
+	@app.before_request
+	def _route_reads():
+		if request.method not in READ_METHODS:
+			return
+		view = current_app.view_functions.get(request.endpoint)
+		if getattr(view, "_db_primary", False):
+			return
+		g._db_replica = router.choose()
+		metrics = current_app.extensions.get("metrics")
+		if metrics is not None:
+			metrics.inc("db_read_routing_total", target="replica" if g._db_replica else "primary")
+
+	return router
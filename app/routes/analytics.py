@@ -0,0 +1,84 @@
+# Endpoints /analytics (rollups de builds)
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from ..analytics import GRANULARITIES, default_range, query_rollups
+from ..cache import cached_response
+from ..admission import route_class
+from ..utils import parse_utc
+
+analytics_bp = Blueprint("analytics", __name__)
+
+def _datetime_arg(name):
+	value = request.args.get(name)
+	return parse_utc(value) if value else None
+
+@analytics_bp.route("/analytics/builds", methods=["GET"])
+@route_class("expensive")
+@jwt_required()
+@cached_response
+def build_analytics():
+	"""
+	Séries temporelles des builds terminés (lues dans les rollups, sans parcourir les builds)
+	---
+	tags:
+	  - Analytique
+	parameters:
+	  - name: granularity
+	    in: query
+	    type: string
+	    enum: [hour, day]
+	    default: day
+	  - name: from
+	    in: query
+	    type: string
+	    description: Début ISO 8601 inclus (défaut 48 h / 30 jours en arrière)
+	  - name: to
+	    in: query
+	    type: string
+	    description: Fin ISO 8601 exclue (défaut maintenant)
+	  - name: project_id
+	    in: query
+	    type: integer
+	    description: Restreindre à un projet (tous les projets sinon)
+	responses:
+	  200:
+	    description: Une entrée par tranche, plus le total de la plage. Quantiles à 1 % près.
+	    examples:
+	      application/json:
+	        granularity: day
+	        from: 2025-08-01T00:00:00Z
+	        to: 2025-08-31T12:00:00Z
+	        items:
+	          - bucket_start: 2025-08-30T00:00:00Z
+	            count: 42
+	            failure_count: 3
+	            failure_rate: 0.0714
+	            duration_mean_s: 5.2
+	            duration_p50_s: 4.9
+	            duration_p95_s: 9.1
+	            duration_p99_s: 9.8
+	        total:
+	          count: 42
+	  400:
+	    description: Paramètres invalides
+	"""
+	granularity = request.args.get("granularity", "day")
+	if granularity not in GRANULARITIES:
+		return jsonify({"error": "invalid_request", "message": "granularity must be hour or day"}), 400
+	try:
+		start, end = _datetime_arg("from"), _datetime_arg("to")
+	except ValueError:
+		return jsonify({"error": "invalid_request", "message": "from and to must be ISO 8601 datetimes"}), 400
+	project_id = request.args.get("project_id", type=int)
+	default_start, default_end = default_range(granularity)
+	start, end = start or default_start, end or default_end
+	if start >= end:
+		return jsonify({"error": "invalid_request", "message": "from must be before to"}), 400
+	items, total = query_rollups(granularity, start, end, project_id)
+	return jsonify({
+		"granularity": granularity,
+		"from": start.isoformat() + "Z",
+		"to": end.isoformat() + "Z",
+		"items": items,
+		"total": total
+	})
@@ -0,0 +1,207 @@
+# Endpoints des artefacts de builds
+import os
+
+from flask import Blueprint, request, jsonify, abort, current_app, send_file, g
+from flask_jwt_extended import jwt_required
+from sqlalchemy import delete, select
+from ..models import Artifact, Build
+from ..db import db
+from ..replicas import get_fresh
+from ..purge import live_project
+from ..artifacts import ArtifactTooLarge, store_artifact
+from ..serializers import ARTIFACT
+
+artifacts_bp = Blueprint("artifacts", __name__)
+
+def _get_build(project_id, build_id):
+	if not live_project(project_id):
+		abort(404)
+	build = get_fresh(Build, build_id)
+	if not build or build.project_id != project_id:
+		abort(404)
+	return build
+
+def _get_artifact(build_id, name):
+	stmt = select(Artifact).where(Artifact.build_id == build_id, Artifact.name == name)
+	artifact = db.session.execute(stmt).scalar()
+	if artifact is None and g.get("_db_replica"):
+		# Artefact tout juste déposé, pas encore sur le réplica
+		g._db_replica = None
+		artifact = db.session.execute(stmt).scalar()
+	if artifact is None:
+		abort(404)
+	return artifact
+
+def _valid_name(name):
+	parts = name.split("/")
+	return len(name) <= 255 and all(p and p not in (".", "..") for p in parts)
+
+@artifacts_bp.route("/projects/<int:project_id>/builds/<int:build_id>/artifacts/<path:name>", methods=["PUT"])
+@jwt_required()
+def upload_artifact(project_id, build_id, name):
+	"""
+	Déposer un artefact (corps brut, lu en flux ; Transfer-Encoding chunked accepté)
+	---
+	tags:
+	  - Artifacts
+	consumes:
+	  - application/octet-stream
+	parameters:
+	  - name: project_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: build_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: name
+	    in: path
+	    type: string
+	    required: true
+	    description: Nom de l'artefact, chemins relatifs acceptés (ex. dist/app.tar.gz)
+	responses:
+	  201:
+	    description: >
+	      Artefact enregistré (remplace un artefact de même nom) ; `deduplicated`
+	      vaut true si ce contenu était déjà stocké
+	  400:
+	    description: Nom d'artefact invalide
+	  404:
+	    description: Build non trouvé
+	  413:
+	    description: Artefact plus grand que ARTIFACT_MAX_BYTES
+	"""
+	_get_build(project_id, build_id)
+	if not _valid_name(name):
+		return jsonify({"error": "invalid_request", "message": "invalid artifact name"}), 400
+	store = current_app.extensions["artifacts"]
+	if store.max_bytes and (request.content_length or 0) > store.max_bytes:
+		return jsonify({"error": "too_large", "message": f"artifact exceeds {store.max_bytes} bytes"}), 413
+	try:
+		artifact, deduplicated = store_artifact(
+			store, build_id, name, request.stream, request.mimetype or "application/octet-stream"
+		)
+	except ArtifactTooLarge:
+		return jsonify({"error": "too_large", "message": f"artifact exceeds {store.max_bytes} bytes"}), 413
+	return jsonify({**ARTIFACT.dump(artifact), "deduplicated": deduplicated}), 201
+
+@artifacts_bp.route("/projects/<int:project_id>/builds/<int:build_id>/artifacts", methods=["GET"])
+def list_artifacts(project_id, build_id):
+	"""
+	Artefacts d'un build
+	---
+	tags:
+	  - Artifacts
+	parameters:
+	  - name: project_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: build_id
+	    in: path
+	    type: integer
+	    required: true
+	responses:
+	  200:
+	    description: Liste des artefacts (nom, sha256, taille, type)
+	  404:
+	    description: Build non trouvé
+	"""
+	_get_build(project_id, build_id)
+	rows = db.session.execute(
+		ARTIFACT.select(ARTIFACT.names).where(Artifact.build_id == build_id).order_by(Artifact.name)
+	)
+	to_dict = ARTIFACT.row_serializer(ARTIFACT.names)
+	return jsonify([to_dict(row) for row in rows])
+
+@artifacts_bp.route("/projects/<int:project_id>/builds/<int:build_id>/artifacts/<path:name>", methods=["GET"])
+def download_artifact(project_id, build_id, name):
+	"""
+	Télécharger un artefact (Range, ETag sha256, requêtes conditionnelles)
+	---
+	tags:
+	  - Artifacts
+	produces:
+	  - application/octet-stream
+	parameters:
+	  - name: project_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: build_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: name
+	    in: path
+	    type: string
+	    required: true
+	  - name: Range
+	    in: header
+	    type: string
+	    required: false
+	    description: "Plage d'octets, ex. bytes=0-1023"
+	responses:
+	  200:
+	    description: Contenu de l'artefact
+	  206:
+	    description: Plage d'octets demandée
+	  304:
+	    description: Non modifié (If-None-Match / If-Modified-Since)
+	  404:
+	    description: Artefact non trouvé
+	  416:
+	    description: Plage invalide
+	"""
+	_get_build(project_id, build_id)
+	artifact = _get_artifact(build_id, name)
+	path = current_app.extensions["artifacts"].path(artifact.digest)
+	if not os.path.exists(path):
+		abort(404)
+	# Contenu immuable pour un sha256 donné : l'ETag est le digest
+	return send_file(
+		path,
+		mimetype=artifact.content_type,
+		as_attachment=True,
+		download_name=os.path.basename(artifact.name),
+		conditional=True,
+		etag=artifact.digest,
+		last_modified=artifact.created_at,
+	)
+
+@artifacts_bp.route("/projects/<int:project_id>/builds/<int:build_id>/artifacts/<path:name>", methods=["DELETE"])
+@jwt_required()
+def delete_artifact(project_id, build_id, name):
+	"""
+	Supprimer un artefact (le blob est libéré par le ramasse-miettes)
+	---
+	tags:
+	  - Artifacts
+	parameters:
+	  - name: project_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: build_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: name
+	    in: path
+	    type: string
+	    required: true
+	responses:
+	  204:
+	    description: Artefact supprimé
+	  404:
+	    description: Artefact non trouvé
+	"""
+	_get_build(project_id, build_id)
+	deleted = db.session.execute(
+		delete(Artifact).where(Artifact.build_id == build_id, Artifact.name == name)
+	).rowcount
+	if not deleted:
+		abort(404)
+	db.session.commit()
+	return "", 204
@@ -1,9 +1,20 @@
 # Endpoints /builds
-from flask import Blueprint, request, jsonify, abort
+from flask import Blueprint, request, jsonify, abort, current_app, Response, send_file, stream_with_context
 from flask_jwt_extended import jwt_required
 from datetime import datetime
-from ..models import Build, Project
+from ..models import Build
 from ..db import db
+from ..replicas import get_fresh
+from ..cache import invalidate_cache
+from ..executor import QueueFull
+from ..stats import record_triggered
+from ..events import record_event, wake_event_bus
+from ..purge import live_project
+from ..scheduler import coalesce, priority_for, queue_state
+from ..buildcache import config_hash, lookup
+from ..serializers import BUILD, InvalidFields
+from ..pagination import InvalidCursor, InvalidPageArg, keyset_page, page_arg, per_page_arg
+from ..admission import route_class
 
 builds_bp = Blueprint("builds", __name__)
 
@@ -32,38 +43,183 @@ def trigger_build(project_id):
 	        branch: main
 	responses:
 	  201:
-	    description: Build déclenché
+	    description: >
+	      Build mis en file (statut pending, exécuté en arrière-plan) ; les builds
+	      encore pending de la même branche passent à superseded (ids dans `superseded`)
+	  400:
+	    description: branch, commit ou config invalide
 	  404:
 	    description: Projet non trouvé
+	  503:
+	    description: File de builds saturée (voir l'en-tête Retry-After)
 	"""
-	project = Project.query.get(project_id)
+	project = live_project(project_id)
 	if not project:
 		abort(404)
 	
-	data = request.get_json()
-	branch = data.get("branch", "main") if data else "main"
+	data = request.get_json(silent=True) or {}
+	branch = data.get("branch", "main")
+	commit = data.get("commit")
+	config = data.get("config") or {}
+	if not isinstance(branch, str) or not branch.strip() or len(branch) > 100:
+		return jsonify({"error": "invalid_request", "message": "branch must be a non-empty string of at most 100 characters"}), 400
+	if commit is not None and (not isinstance(commit, str) or not commit.strip() or len(commit) > 64):
+		return jsonify({"error": "invalid_request", "message": "commit must be a non-empty string of at most 64 characters"}), 400
+	if not isinstance(config, dict):
+		return jsonify({"error": "invalid_request", "message": "config must be an object"}), 400
+	chash = config_hash(config) if commit else None
 	
-	build = Build(
-		project_id=project_id,
-		status="pending",
-		branch=branch,
-		created_at=datetime.utcnow()
-	)
+	executor = current_app.extensions["build_executor"]
+	now = datetime.utcnow()
+	cached = None
+	if commit and current_app.config["BUILD_CACHE_ENABLED"] and not data.get("no_cache"):
+		cached = lookup(project_id, branch, commit, chash)
+	if cached is None:
+		try:
+			executor.admit()
+		except QueueFull:
+			resp = jsonify({"error": "queue_full", "message": "Trop de builds en attente, réessayez plus tard"})
+			resp.headers["Retry-After"] = "5"
+			return resp, 503
+		build = Build(project_id=project_id, status="pending", created_at=now)
+	else:
+		# Résultat réutilisé : le build est terminé dès sa création, rien n'est mis en file
+		build = Build(
+			project_id=project_id, status="cached", cached_from_id=cached.id,
+			logs=f"Cache hit: result of build {cached.id}", created_at=now, started_at=now, finished_at=now
+		)
+	build.branch = branch
+	build.priority = priority_for(branch)
+	build.commit_sha = commit
+	build.config_hash = chash
+	project.last_build_status = "pending" if cached is None else "success"
 	db.session.add(build)
-	project.last_build_status = "pending"
+	db.session.flush()
+	record_triggered(project_id, build.created_at)
+	record_event(build.id, project_id, build.status, build.created_at)
+	superseded = coalesce(project_id, branch, build.id) if current_app.config["BUILD_COALESCE"] else []
 	db.session.commit()
+	invalidate_cache()
+	wake_event_bus()
+	if cached is None:
+		executor.submit(build.id)
 	
 	return jsonify({
 		"id": build.id,
 		"status": build.status,
 		"branch": build.branch,
+		"priority": build.priority,
+		"commit": build.commit_sha,
+		"cache_hit": cached is not None,
+		"cached_from": build.cached_from_id,
+		"superseded": superseded,
 		"created_at": build.created_at.isoformat() + "Z"
 	}), 201
 
+@builds_bp.route("/projects/<int:project_id>/builds/<int:build_id>", methods=["GET"])
+def get_build(project_id, build_id):
+	"""
+	Détail d'un build (statut, horodatages, durée)
+	---
+	tags:
+	  - Builds
+	parameters:
+	  - name: project_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: build_id
+	    in: path
+	    type: integer
+	    required: true
+	responses:
+	  200:
+	    description: Détail du build
+	  404:
+	    description: Build non trouvé
+	"""
+	build = get_fresh(Build, build_id)
+	if not build or build.project_id != project_id:
+		abort(404)
+	return jsonify(BUILD.dump(build))
+
+@builds_bp.route("/projects/<int:project_id>/builds/<int:build_id>/logs", methods=["GET"])
+def get_build_logs(project_id, build_id):
+	"""
+	Logs d'un build (complets, plage d'octets via l'en-tête Range, ou N dernières lignes)
+	---
+	tags:
+	  - Builds
+	parameters:
+	  - name: project_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: build_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: tail
+	    in: query
+	    type: integer
+	    required: false
+	    description: Ne renvoyer que les N dernières lignes
+	  - name: Range
+	    in: header
+	    type: string
+	    required: false
+	    description: "Plage d'octets du log décompressé, ex. bytes=0-1023"
+	produces:
+	  - text/plain
+	responses:
+	  200:
+	    description: Log complet (gzip si le client l'accepte et que le build est terminé)
+	  206:
+	    description: Plage d'octets demandée
+	  400:
+	    description: tail invalide
+	  404:
+	    description: Build non trouvé
+	  416:
+	    description: Plage invalide
+	"""
+	build = get_fresh(Build, build_id)
+	if not build or build.project_id != project_id:
+		abort(404)
+	store = current_app.extensions["build_logs"]
+	if "tail" in request.args:
+		tail = request.args.get("tail", type=int)
+		if tail is None or tail < 0:
+			return jsonify({"error": "invalid_request", "message": "tail must be a non-negative integer"}), 400
+		return Response(store.tail(build_id, tail), mimetype="text/plain")
+	size = store.size(build_id)
+	if request.range:
+		rng = request.range.range_for_length(size) if request.range.units == "bytes" else None
+		if rng is None:
+			return Response(status=416, headers={"Content-Range": f"bytes */{size}"})
+		start, end = rng
+		resp = Response(stream_with_context(store.iter_range(build_id, start, end)), status=206, mimetype="text/plain")
+		resp.headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+		resp.headers["Content-Length"] = str(end - start)
+		resp.headers["Accept-Ranges"] = "bytes"
+		return resp
+	if size and build.status not in ("pending", "running") and "gzip" in request.accept_encodings:
+		# Log figé : le fichier de membres gzip est servi tel quel (wsgi.file_wrapper)
+		resp = send_file(store.path(build_id), mimetype="text/plain", conditional=False, etag=False)
+		resp.headers["Content-Encoding"] = "gzip"
+		resp.headers["Vary"] = "Accept-Encoding"
+		return resp
+	resp = Response(stream_with_context(store.iter_range(build_id)), mimetype="text/plain")
+	resp.headers["Content-Length"] = str(size)
+	resp.headers["Accept-Ranges"] = "bytes"
+	resp.headers["Vary"] = "Accept-Encoding"
+	return resp
+
 @builds_bp.route("/projects/<int:project_id>/builds", methods=["GET"])
+@route_class("expensive")
 def list_builds(project_id):
 	"""
-	Liste des builds d'un projet
+	Liste des builds d'un projet (curseur sur created_at, id)
 	---
 	tags:
 	  - Builds
@@ -72,35 +228,107 @@ def list_builds(project_id):
 	    in: path
 	    type: integer
 	    required: true
-	  - name: page
+	  - name: cursor
 	    in: query
-	    type: integer
+	    type: string
 	    required: false
-	    default: 1
+	    description: Curseur opaque renvoyé dans next_cursor par la page précédente
 	  - name: per_page
 	    in: query
 	    type: integer
 	    required: false
 	    default: 10
+	  - name: count
+	    in: query
+	    type: string
+	    required: false
+	    description: "exact pour inclure le total (COUNT(*), coûteux)"
+	  - name: fields
+	    in: query
+	    type: string
+	    required: false
+	    description: "Champs à renvoyer, ex. id,status,created_at (seules ces colonnes sont lues)"
+	  - name: page
+	    in: query
+	    type: integer
+	    required: false
+	    description: Ancienne pagination par numéro de page (OFFSET), dépréciée
 	responses:
 	  200:
 	    description: Liste paginée des builds
+	  400:
+	    description: Curseur ou champs invalides
 	"""
-	if not db.session.get(Project, project_id):
+	if not live_project(project_id):
 		abort(404)
-	page = int(request.args.get("page", 1))
-	per_page = int(request.args.get("per_page", 10))
-	q = Build.query.filter_by(project_id=project_id).order_by(Build.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
-	return jsonify({
-		"items": [
-			{
-				"id": b.id,
-				"status": b.status,
-				"branch": b.branch,
-				"created_at": b.created_at.isoformat() + "Z"
-			} for b in q.items
-		],
-		"total": q.total,
-		"page": q.page,
-		"pages": q.pages
-	})
+	try:
+		per_page = per_page_arg(request.args)
+		page = page_arg(request.args)
+		fields = BUILD.parse_fields(request.args.get("fields"))
+	except (InvalidFields, InvalidPageArg) as e:
+		return jsonify({"error": "invalid_request", "message": str(e)}), 400
+	if "page" in request.args:
+		# Pagination historique par numéro de page (COUNT + OFFSET)
+		q = Build.query.filter_by(project_id=project_id).order_by(Build.created_at.desc(), Build.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+		return jsonify({
+			"items": [BUILD.dump(b, fields) for b in q.items],
+			"total": q.total,
+			"page": q.page,
+			"pages": q.pages
+		})
+	try:
+		rows, next_cursor, total = keyset_page(
+			BUILD.select(fields, extra=(Build.created_at, Build.id)).where(Build.project_id == project_id),
+			Build.created_at, Build.id, per_page,
+			cursor=request.args.get("cursor"), with_total=request.args.get("count") == "exact"
+		)
+	except InvalidCursor:
+		return jsonify({"error": "invalid_request", "message": "cursor invalide"}), 400
+	to_dict = BUILD.row_serializer(fields)
+	body = {
+		"items": [to_dict(row) for row in rows],
+		"next_cursor": next_cursor,
+		"per_page": per_page
+	}
+	if total is not None:
+		body["total"] = total
+	return jsonify(body)
+
+@builds_bp.route("/builds/queue", methods=["GET"])
+@jwt_required()
+def get_build_queue():
+	"""
+	État de la file de builds (ordonnancement)
+	---
+	tags:
+	  - Builds
+	parameters:
+	  - name: limit
+	    in: query
+	    type: integer
+	    default: 20
+	    description: Nombre de projets et de prochains builds listés (max 200)
+	responses:
+	  200:
+	    description: Compteurs, projets les plus chargés et prochains builds dans l'ordre de réclamation
+	    examples:
+	      application/json:
+	        pending: 3
+	        running: 2
+	        pending_by_priority:
+	          high: 1
+	          normal: 2
+	        max_running_per_project: null
+	        projects:
+	          - project_id: 4
+	            pending: 2
+	            running: 1
+	        next:
+	          - id: 120
+	            project_id: 7
+	            branch: main
+	            priority: 0
+	            project_running: 0
+	"""
+	limit = min(max(request.args.get("limit", 20, type=int), 1), 200)
+	return jsonify(queue_state(limit))
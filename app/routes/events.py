@@ -0,0 +1,113 @@
+# Endpoints de flux SSE des builds
+from flask import Blueprint, request, current_app, abort, Response
+from flask_jwt_extended import jwt_required
+from ..purge import live_project
+
+events_bp = Blueprint("events", __name__)
+
+def _last_event_id():
+	value = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+	try:
+		return int(value) if value else None
+	except ValueError:
+		return None
+
+def _stream(project_id=None):
+	bus = current_app.extensions["event_bus"]
+	heartbeat = current_app.config["SSE_HEARTBEAT_S"]
+	retry_ms = current_app.config["SSE_RETRY_MS"]
+	last_id = _last_event_id()
+	# Abonnement avant la relecture : aucun événement ne tombe entre les deux
+	sub = bus.subscribe(project_id)
+
+	def generate():
+		try:
+			yield f"retry: {retry_ms}\n\n"
+			replayed = set()
+			if last_id is not None:
+				frames = bus.replay(last_id, project_id)
+				if frames is None:
+					# Historique insuffisant : le client doit recharger l'état complet
+					yield "event: reset\ndata: {}\n\n"
+				else:
+					for event_id, data in frames:
+						replayed.add(event_id)
+						yield data
+			while True:
+				frames = sub.drain(heartbeat)
+				for event_id, data in frames:
+					if event_id not in replayed:
+						yield data
+				if sub.dropped:
+					yield "event: overflow\ndata: {}\n\n"
+					return
+				if not frames:
+					yield ": heartbeat\n\n"
+		finally:
+			bus.unsubscribe(sub)
+
+	return Response(generate(), mimetype="text/event-stream", headers={
+		"Cache-Control": "no-cache",
+		"X-Accel-Buffering": "no",
+	})
+
+@events_bp.route("/projects/<int:project_id>/builds/stream", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])
+def stream_project_builds(project_id):
+	"""
+	Flux Server-Sent Events des transitions de builds d'un projet
+	---
+	tags:
+	  - Builds
+	produces:
+	  - text/event-stream
+	parameters:
+	  - name: project_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: Last-Event-ID
+	    in: header
+	    type: integer
+	    description: Reprise après cet événement (aussi ?last_event_id=)
+	  - name: jwt
+	    in: query
+	    type: string
+	    description: Access token, pour EventSource qui ne peut pas envoyer d'en-tête
+	responses:
+	  200:
+	    description: >
+	      Flux d'événements `build` (data JSON build_id, project_id, status, at),
+	      commentaires de heartbeat, `reset` si la reprise est impossible,
+	      `overflow` avant déconnexion d'un client trop lent
+	  404:
+	    description: Projet non trouvé
+	"""
+	if not live_project(project_id):
+		abort(404)
+	return _stream(project_id)
+
+@events_bp.route("/builds/stream", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])
+def stream_builds():
+	"""
+	Flux Server-Sent Events des transitions de tous les builds
+	---
+	tags:
+	  - Builds
+	produces:
+	  - text/event-stream
+	parameters:
+	  - name: Last-Event-ID
+	    in: header
+	    type: integer
+	    description: Reprise après cet événement (aussi ?last_event_id=)
+	  - name: jwt
+	    in: query
+	    type: string
+	    description: Access token, pour EventSource qui ne peut pas envoyer d'en-tête
+	responses:
+	  200:
+	    description: Flux d'événements `build`, comme /projects/{project_id}/builds/stream
+	"""
+	return _stream()
@@ -0,0 +1,143 @@
+# Endpoints /exports (NDJSON / CSV streamés)
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from flask_jwt_extended import jwt_required
+from datetime import datetime
+from sqlalchemy import and_, or_, select
+import csv
+import io
+import json
+from ..models import Build, Project
+from ..replicas import read_engine
+from ..admission import route_class
+from ..utils import parse_utc
+
+exports_bp = Blueprint("exports", __name__)
+
+PROJECT_COLUMNS = (Project.id, Project.name, Project.repo, Project.last_build_status, Project.created_at)
+BUILD_COLUMNS = (
+	Build.id, Build.project_id, Build.status, Build.branch, Build.duration_s,
+	Build.created_at, Build.started_at, Build.finished_at
+)
+
+def _cell(value):
+	if isinstance(value, datetime):
+		return value.isoformat() + "Z"
+	return value
+
+def _iter_rows(stmt):
+	"""Lignes brutes (tuples) lues par un curseur côté serveur, par paquets."""
+	chunk = current_app.config["EXPORT_CHUNK_SIZE"]
+	with read_engine().connect() as conn:
+		result = conn.execution_options(stream_results=True, yield_per=chunk).execute(stmt)
+		for partition in result.partitions():
+			yield partition
+
+def _ndjson(stmt, keys):
+	for partition in _iter_rows(stmt):
+		yield "".join(
+			json.dumps(dict(zip(keys, map(_cell, row))), separators=(",", ":")) + "\n"
+			for row in partition
+		)
+
+def _csv(stmt, keys):
+	buf = io.StringIO()
+	writer = csv.writer(buf)
+	writer.writerow(keys)
+	for partition in _iter_rows(stmt):
+		writer.writerows([_cell(v) for v in row] for row in partition)
+		yield buf.getvalue()
+		buf.seek(0)
+		buf.truncate()
+	if buf.tell():
+		yield buf.getvalue()
+
+def _export(columns, since_filter, filename, *criteria):
+	fmt = request.args.get("format", "ndjson")
+	if fmt not in ("ndjson", "csv"):
+		return jsonify({"error": "invalid_request", "message": "format must be ndjson or csv"}), 400
+	stmt = select(*columns).where(*criteria)
+	order = columns[0]
+	since = request.args.get("since")
+	if since:
+		try:
+			stmt = stmt.where(since_filter(parse_utc(since)))
+		except ValueError:
+			return jsonify({"error": "invalid_request", "message": "since must be an ISO 8601 datetime"}), 400
+		# id + 0 : SQLite parcourrait toute la table dans l'ordre des id plutôt que d'utiliser
+		# l'index du filtre ; les quelques lignes retenues sont triées à part
+		order = columns[0] + 0
+	stmt = stmt.order_by(order)
+	keys = [c.key for c in columns]
+	if fmt == "csv":
+		body, mimetype = _csv(stmt, keys), "text/csv"
+	else:
+		body, mimetype = _ndjson(stmt, keys), "application/x-ndjson"
+	return Response(
+		stream_with_context(body),
+		mimetype=mimetype,
+		headers={"Content-Disposition": f"attachment; filename={filename}.{fmt}"}
+	)
+
+def _builds_since(since):
+	"""Builds terminés depuis `since` (même créés avant : réexportés avec leur statut final), ou
+	pas encore terminés et créés depuis. Deux termes servis par l'index sur finished_at."""
+	return or_(Build.finished_at >= since, and_(Build.finished_at.is_(None), Build.created_at >= since))
+
+@exports_bp.route("/exports/projects", methods=["GET"])
+@route_class("export")
+@jwt_required()
+def export_projects():
+	"""
+	Export complet des projets (streaming)
+	---
+	tags:
+	  - Exports
+	parameters:
+	  - name: format
+	    in: query
+	    type: string
+	    enum: [ndjson, csv]
+	    default: ndjson
+	  - name: since
+	    in: query
+	    type: string
+	    required: false
+	    description: Export incrémental, projets créés depuis cette date (ISO 8601)
+	responses:
+	  200:
+	    description: Flux NDJSON ou CSV, une ligne par projet
+	  400:
+	    description: Paramètres invalides
+	"""
+	return _export(PROJECT_COLUMNS, lambda since: Project.created_at >= since, "projects", Project.deleted_at.is_(None))
+
+@exports_bp.route("/exports/builds", methods=["GET"])
+@route_class("export")
+@jwt_required()
+def export_builds():
+	"""
+	Export complet des builds (streaming)
+	---
+	tags:
+	  - Exports
+	parameters:
+	  - name: format
+	    in: query
+	    type: string
+	    enum: [ndjson, csv]
+	    default: ndjson
+	  - name: since
+	    in: query
+	    type: string
+	    required: false
+	    description: Export incrémental, builds créés ou terminés depuis cette date (ISO 8601)
+	responses:
+	  200:
+	    description: Flux NDJSON ou CSV, une ligne par build
+	  400:
+	    description: Paramètres invalides
+	"""
+	return _export(
+		BUILD_COLUMNS, _builds_since, "builds",
+		Build.project_id == Project.id, Project.deleted_at.is_(None),
+	)
@@ -1,10 +1,9 @@
 # Endpoint /login
-from flask import Blueprint, request, jsonify
-from werkzeug.security import check_password_hash
-from flask_jwt_extended import create_access_token
-from datetime import timedelta
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt, get_jwt_identity
 from ..models import User
 from ..db import db
+from ..security import verify_password, needs_rehash, hash_password
 
 login_bp = Blueprint("login", __name__)
 
@@ -35,7 +34,9 @@ def login():
 	    examples:
 	      application/json:
 	        access_token: "..."
+	        refresh_token: "..."
 	        token_type: bearer
+	        expires_in: 1800
 	  401:
 	    description: Identifiants invalides
 	"""
@@ -43,7 +44,74 @@ def login():
 	if not data or "username" not in data or "password" not in data:
 		return jsonify({"error": "invalid_request", "message": "username and password required"}), 400
 	user = User.query.filter_by(username=data["username"]).first()
-	if not user or not check_password_hash(user.password_hash, data["password"]):
+	if not user or not verify_password(user.password_hash, data["password"]):
 		return jsonify({"error": "unauthorized", "message": "Identifiants invalides"}), 401
-	access_token = create_access_token(identity=user.username, expires_delta=timedelta(minutes=30))
-	return jsonify({"access_token": access_token, "token_type": "bearer"})
+	if needs_rehash(user.password_hash):
+		# Paramètres de hash modifiés dans Config : migration au fil des connexions
+		user.password_hash = hash_password(data["password"])
+		db.session.commit()
+	return jsonify(_tokens(user.username))
+
+def _tokens(identity, refresh=True):
+	body = {
+		"access_token": create_access_token(identity=identity),
+		"token_type": "bearer",
+		"expires_in": int(current_app.config["JWT_ACCESS_TOKEN_EXPIRES"].total_seconds())
+	}
+	if refresh:
+		body["refresh_token"] = create_refresh_token(identity=identity)
+	return body
+
+@login_bp.route("/token/refresh", methods=["POST"])
+@jwt_required(refresh=True)
+def refresh():
+	"""
+	Nouveau jeton d'accès à partir d'un refresh token (sans mot de passe)
+	---
+	tags:
+	  - Auth
+	parameters:
+	  - name: Authorization
+	    in: header
+	    type: string
+	    required: true
+	    description: "Bearer <refresh_token>"
+	responses:
+	  200:
+	    description: Nouveaux jetons (le refresh token présenté est révoqué et remplacé)
+	    examples:
+	      application/json:
+	        access_token: "..."
+	        refresh_token: "..."
+	        token_type: bearer
+	        expires_in: 1800
+	  401:
+	    description: Refresh token invalide, expiré ou révoqué
+	"""
+	# Rotation : un refresh token ne sert qu'une fois, même présenté deux fois en même temps
+	if not current_app.extensions["token_blocklist"].revoke(get_jwt()):
+		return jsonify({"error": "unauthorized", "message": "Token has been revoked"}), 401
+	return jsonify(_tokens(get_jwt_identity()))
+
+@login_bp.route("/token/revoke", methods=["POST"])
+@jwt_required(verify_type=False)
+def revoke():
+	"""
+	Révoquer le jeton présenté (access ou refresh), ex. à la déconnexion
+	---
+	tags:
+	  - Auth
+	parameters:
+	  - name: Authorization
+	    in: header
+	    type: string
+	    required: true
+	    description: "Bearer <token>"
+	responses:
+	  204:
+	    description: Jeton révoqué
+	  401:
+	    description: Jeton invalide
+	"""
+	current_app.extensions["token_blocklist"].revoke(get_jwt())
+	return "", 204
@@ -1,51 +1,178 @@
 # Endpoints /projects
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
-from ..models import Project
+from sqlalchemy import func, select
+from ..models import Build, Project, ProjectStats
+from ..stats import stats_to_dict
 from ..db import db
+from ..purge import live_project, soft_delete_project
+from ..replicas import first_fresh
+from ..serializers import BUILD, PROJECT, InvalidFields
+from ..events import wake_event_bus
+from ..cache import cached_response, invalidate_cache
+from ..imports import iter_records, import_projects as bulk_import
+from ..pagination import InvalidCursor, InvalidPageArg, keyset_page, page_arg, per_page_arg
+from ..search import InvalidQuery, search_page
+from ..admission import route_class
 
 projects_bp = Blueprint("projects", __name__)
 
+INCLUDES = {"recent_builds"}
+MAX_RECENT = 50
+
+def _include_args():
+	"""(expansions demandées par ?include=, nombre de builds récents) ; lève InvalidFields."""
+	include = {name.strip() for name in request.args.get("include", "").split(",") if name.strip()}
+	unknown = include - INCLUDES
+	if unknown:
+		raise InvalidFields(f"unknown include: {', '.join(sorted(unknown))}")
+	recent = request.args.get("recent", type=int)
+	if recent is None and "recent" in request.args:
+		raise InvalidFields("recent must be an integer")
+	return include, max(1, min(5 if recent is None else recent, MAX_RECENT))
+
+def _attach_recent_builds(items, ids, k):
+	"""Ajoute à chaque item les k derniers builds de son projet, en une requête pour toute la page."""
+	by_project = {project_id: [] for project_id in ids}
+	if ids:
+		# ROW_NUMBER() par projet, servi par l'index (project_id, created_at, id)
+		rank = func.row_number().over(
+			partition_by=Build.project_id, order_by=(Build.created_at.desc(), Build.id.desc())
+		).label("rank")
+		ranked = BUILD.select(BUILD.names).add_columns(rank).where(Build.project_id.in_(ids)).subquery()
+		stmt = select(ranked).where(ranked.c.rank <= k).order_by(ranked.c.project_id, ranked.c.rank)
+		to_dict = BUILD.row_serializer(BUILD.names)
+		for row in db.session.execute(stmt):
+			by_project[row.project_id].append(to_dict(row))
+	for item, project_id in zip(items, ids):
+		item["recent_builds"] = by_project[project_id]
+
 @projects_bp.route("/projects", methods=["GET"])
+@route_class("expensive")
+@jwt_required()
+@cached_response
 def list_projects():
 	"""
-	Liste paginée des projets
+	Liste paginée des projets (curseur sur created_at, id)
 	---
 	tags:
 	  - Projets
 	parameters:
-	  - name: page
+	  - name: cursor
 	    in: query
-	    type: integer
+	    type: string
 	    required: false
-	    default: 1
+	    description: Curseur opaque renvoyé dans next_cursor par la page précédente
 	  - name: per_page
 	    in: query
 	    type: integer
 	    required: false
 	    default: 10
+	  - name: count
+	    in: query
+	    type: string
+	    required: false
+	    description: "exact pour inclure le total (COUNT(*), coûteux)"
+	  - name: q
+	    in: query
+	    type: string
+	    required: false
+	    description: >
+	      Recherche (au moins 3 caractères) dans le nom et l'URL du dépôt, par index
+	      de trigrammes ; résultats classés par pertinence (nom exact, préfixe,
+	      sous-chaîne, dépôt)
+	  - name: with_stats
+	    in: query
+	    type: boolean
+	    required: false
+	    description: Inclure les statistiques de builds de chaque projet
+	  - name: include
+	    in: query
+	    type: string
+	    required: false
+	    description: "recent_builds pour inclure les derniers builds de chaque projet (une seule requête fenêtrée)"
+	  - name: recent
+	    in: query
+	    type: integer
+	    required: false
+	    default: 5
+	    description: Nombre de builds récents par projet avec include=recent_builds (max 50)
+	  - name: fields
+	    in: query
+	    type: string
+	    required: false
+	    description: "Champs à renvoyer, ex. id,name,last_build_status (seules ces colonnes sont lues)"
+	  - name: page
+	    in: query
+	    type: integer
+	    required: false
+	    description: Ancienne pagination par numéro de page (OFFSET), dépréciée
 	responses:
 	  200:
-	    description: Liste paginée
+	    description: Liste paginée (ETag fort, mise en cache)
+	  304:
+	    description: Inchangée depuis l'ETag fourni dans If-None-Match
+	  400:
+	    description: Curseur, champs ou recherche invalides
 	"""
-	page = int(request.args.get("page", 1))
-	per_page = int(request.args.get("per_page", 10))
-	q = Project.query.order_by(Project.created_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
-	return jsonify({
-		"items": [
-			{
-				"id": p.id,
-				"name": p.name,
-				"repo": p.repo,
-				"last_build_status": p.last_build_status,
-				"created_at": p.created_at.isoformat() + "Z"
-			} for p in q.items
-		],
-		"total": q.total,
-		"page": q.page,
-		"pages": q.pages
-	})
+	try:
+		per_page = per_page_arg(request.args)
+		page = page_arg(request.args)
+		fields = PROJECT.parse_fields(request.args.get("fields"))
+		include, recent = _include_args()
+	except (InvalidFields, InvalidPageArg) as e:
+		return jsonify({"error": "invalid_request", "message": str(e)}), 400
+	q = request.args.get("q")
+	if "page" in request.args and q is None:
+		# Pagination historique par numéro de page (COUNT + OFFSET)
+		q = Project.query.filter(Project.deleted_at.is_(None)).order_by(Project.created_at.desc(), Project.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+		items = [PROJECT.dump(p, fields) for p in q.items]
+		if "recent_builds" in include:
+			_attach_recent_builds(items, [p.id for p in q.items], recent)
+		return jsonify({
+			"items": items,
+			"total": q.total,
+			"page": q.page,
+			"pages": q.pages
+		})
+	try:
+		if q is not None:
+			# Recherche : classement par pertinence, curseur sur (pertinence, id)
+			rows, next_cursor = search_page(
+				PROJECT.select(fields, extra=(Project.id,)).where(Project.deleted_at.is_(None)),
+				q, per_page, cursor=request.args.get("cursor")
+			)
+			total = None
+		else:
+			rows, next_cursor, total = keyset_page(
+				PROJECT.select(fields, extra=(Project.created_at, Project.id)).where(Project.deleted_at.is_(None)),
+				Project.created_at, Project.id, per_page,
+				cursor=request.args.get("cursor"), with_total=request.args.get("count") == "exact"
+			)
+	except InvalidCursor:
+		return jsonify({"error": "invalid_request", "message": "cursor invalide"}), 400
+	except InvalidQuery as e:
+		return jsonify({"error": "invalid_request", "message": str(e)}), 400
+	to_dict = PROJECT.row_serializer(fields)
+	body = {
+		"items": [to_dict(row) for row in rows],
+		"next_cursor": next_cursor,
+		"per_page": per_page
+	}
+	if request.args.get("with_stats") in ("1", "true"):
+		# Une seule requête pour les statistiques de toute la page
+		ids = [row.id for row in rows]
+		stats = {s.project_id: s for s in db.session.execute(
+			select(ProjectStats).where(ProjectStats.project_id.in_(ids))
+		).scalars()} if ids else {}
+		for item, row in zip(body["items"], rows):
+			item["stats"] = stats_to_dict(stats.get(row.id))
+	if "recent_builds" in include:
+		_attach_recent_builds(body["items"], [row.id for row in rows], recent)
+	if total is not None:
+		body["total"] = total
+	return jsonify(body)
 
 @projects_bp.route("/projects", methods=["POST"])
 @jwt_required()
@@ -81,7 +208,8 @@ def create_project():
 	
 	existing = Project.query.filter_by(name=data["name"]).first()
 	if existing:
-		return jsonify({"error": "conflict", "message": "Un projet avec ce nom existe déjà"}), 409
+		message = "Un projet avec ce nom est en cours de suppression" if existing.deleted_at else "Un projet avec ce nom existe déjà"
+		return jsonify({"error": "conflict", "message": message}), 409
 	
 	project = Project(
 		name=data["name"],
@@ -91,20 +219,111 @@ def create_project():
 	)
 	db.session.add(project)
 	db.session.commit()
+	invalidate_cache()
 	
-	return jsonify({
-		"id": project.id,
-		"name": project.name,
-		"repo": project.repo,
-		"last_build_status": project.last_build_status,
-		"created_at": project.created_at.isoformat() + "Z"
-	}), 201
+	return jsonify(PROJECT.dump(project)), 201
+
+@projects_bp.route("/projects/import", methods=["POST"])
+@route_class("expensive")
+@jwt_required()
+def import_projects():
+	"""
+	Import en masse de projets (tableau JSON ou NDJSON)
+	---
+	tags:
+	  - Projets
+	requestBody:
+	  required: true
+	  content:
+	    application/json:
+	      schema:
+	        type: array
+	        items:
+	          type: object
+	          properties:
+	            name:
+	              type: string
+	            repo:
+	              type: string
+	    application/x-ndjson:
+	      schema:
+	        type: string
+	      example: |
+	        {"name": "proj-a", "repo": "https://github.com/org/a"}
+	        {"name": "proj-b", "repo": "https://github.com/org/b"}
+	responses:
+	  200:
+	    description: Résumé (created, conflict, invalid) et résultat de chaque record
+	  400:
+	    description: Corps invalide
+	"""
+	try:
+		records = iter_records(request)
+		report = bulk_import(records, batch_size=current_app.config["IMPORT_BATCH_SIZE"])
+	except ValueError as e:
+		return jsonify({"error": "invalid_request", "message": str(e)}), 400
+	finally:
+		invalidate_cache()
+	return jsonify(report)
 
 @projects_bp.route("/projects/<int:project_id>", methods=["GET"])
+@cached_response
 def get_project(project_id):
 	"""
 	Détails d'un projet
 	---
+	tags:
+	  - Projets
+	parameters:
+	  - name: project_id
+	    in: path
+	    type: integer
+	    required: true
+	  - name: fields
+	    in: query
+	    type: string
+	    required: false
+	    description: "Champs à renvoyer, ex. id,name,last_build_status (seules ces colonnes sont lues)"
+	  - name: include
+	    in: query
+	    type: string
+	    required: false
+	    description: "recent_builds pour inclure les derniers builds de chaque projet (une seule requête fenêtrée)"
+	  - name: recent
+	    in: query
+	    type: integer
+	    required: false
+	    default: 5
+	    description: Nombre de builds récents par projet avec include=recent_builds (max 50)
+	responses:
+	  200:
+	    description: Détails du projet (ETag fort, mise en cache)
+	  304:
+	    description: Inchangé depuis l'ETag fourni dans If-None-Match
+	  400:
+	    description: Champs invalides
+	  404:
+	    description: Projet non trouvé
+	"""
+	try:
+		fields = PROJECT.parse_fields(request.args.get("fields"))
+		include, recent = _include_args()
+	except InvalidFields as e:
+		return jsonify({"error": "invalid_request", "message": str(e)}), 400
+	row = first_fresh(PROJECT.select(fields).where(Project.id == project_id, Project.deleted_at.is_(None)))
+	if row is None:
+		abort(404)
+	item = PROJECT.row_serializer(fields)(row)
+	if "recent_builds" in include:
+		_attach_recent_builds([item], [project_id], recent)
+	return jsonify(item)
+
+@projects_bp.route("/projects/<int:project_id>/stats", methods=["GET"])
+@cached_response
+def get_project_stats(project_id):
+	"""
+	Statistiques de builds d'un projet (lecture O(1), tenues à jour à chaque build)
+	---
 	tags:
 	  - Projets
 	parameters:
@@ -114,18 +333,25 @@ def get_project(project_id):
 	    required: true
 	responses:
 	  200:
-	    description: Détails du projet
+	    description: Compteurs, taux de succès, moyenne et variance des durées, séries
+	    examples:
+	      application/json:
+	        total_builds: 12
+	        success_count: 9
+	        failure_count: 2
+	        success_rate: 0.8182
+	        duration_mean_s: 5.4
+	        duration_variance: 1.7
+	        duration_stddev_s: 1.3
+	        last_build_at: 2025-08-31T12:34:56.789Z
+	        current_streak: 3
+	        best_success_streak: 5
 	  404:
 	    description: Projet non trouvé
 	"""
-	project = Project.query.get_or_404(project_id)
-	return jsonify({
-		"id": project.id,
-		"name": project.name,
-		"repo": project.repo,
-		"last_build_status": project.last_build_status,
-		"created_at": project.created_at.isoformat() + "Z"
-	})
+	if not live_project(project_id):
+		abort(404)
+	return jsonify(stats_to_dict(db.session.get(ProjectStats, project_id)))
 
 @projects_bp.route("/projects/<int:project_id>", methods=["DELETE"])
 @jwt_required()
@@ -142,11 +368,16 @@ def delete_project(project_id):
 	    required: true
 	responses:
 	  204:
-	    description: Projet supprimé
+	    description: >
+	      Projet supprimé (immédiatement invisible ; builds, logs et artefacts
+	      purgés en arrière-plan)
 	  404:
 	    description: Projet non trouvé
 	"""
-	project = Project.query.get_or_404(project_id)
-	db.session.delete(project)
-	db.session.commit()
+	canceled = soft_delete_project(project_id)
+	if canceled is None:
+		abort(404)
+	invalidate_cache()
+	wake_event_bus()
+	current_app.extensions["project_purge"].wake()
 	return "", 204
@@ -1,10 +1,13 @@
 # Endpoint /status
-from flask import Blueprint, jsonify, current_app
-from sqlalchemy.exc import OperationalError
-from sqlalchemy import text
+from flask import Blueprint, jsonify, current_app, Response
+from sqlalchemy import select, func
 from datetime import datetime, UTC
 import time
 from ..db import db
+from ..models import Build
+from ..replicas import primary
+from ..buildcache import entry_count
+from ..admission import route_class
 
 status_bp = Blueprint("status", __name__)
 
@@ -12,6 +15,7 @@ _start_time = time.time()
 _version = "0.1.0"
 
 @status_bp.route("/status", methods=["GET"])
+@route_class("exempt")
 def status():
 		"""
 		Health check et monitoring API
@@ -27,18 +31,73 @@ def status():
 						version: 0.1.0
 						uptime_s: 12
 						db_ok: true
+						db_checked_at: 2025-08-31T12:34:55.123Z
+						db_age_s: 1.666
 						time: 2025-08-31T12:34:56.789Z
 		"""
 		uptime = int(time.time() - _start_time)
-		db_ok = True
-		try:
-			db.session.execute(text("SELECT 1"))
-		except OperationalError:
-			db_ok = False
+		db_ok, checked_at, age = current_app.extensions["health"].snapshot()
 		return jsonify({
 			"status": "ok",
 			"version": _version,
 			"uptime_s": uptime,
 			"db_ok": db_ok,
+			"db_checked_at": checked_at.isoformat().replace("+00:00", "Z"),
+			"db_age_s": round(age, 3),
 			"time": datetime.now(UTC).isoformat().replace("+00:00", "Z")
 		})
+
+@status_bp.route("/metrics", methods=["GET"])
+@route_class("exempt")
+@primary  # file de builds et pool : état du primaire
+def metrics():
+		"""
+		Métriques au format texte Prometheus
+		---
+		tags:
+			- Monitoring
+		produces:
+			- text/plain
+		responses:
+			200:
+				description: Requêtes et latences par route, pool DB, file et cache de builds
+		"""
+		pool = db.engine.pool
+		health = current_app.extensions["health"]
+		executor = current_app.extensions["build_executor"]
+		pending, cache_entries = _counts()
+		gauges = [
+			("db_pool_size", "Taille du pool de connexions", _pool_stat(pool, "size")),
+			("db_pool_checked_out", "Connexions empruntées au pool", _pool_stat(pool, "checkedout")),
+			("db_pool_overflow", "Connexions en débordement du pool", _pool_stat(pool, "overflow")),
+			("db_health_ok", "Dernier health check DB (1 = ok)", None if health.db_ok is None else int(health.db_ok)),
+			("db_health_age_seconds", "Âge du dernier health check DB", round(health.age(), 3) if health.checked_at else None),
+			("build_queue_pending", "Builds en attente (toute l'instance)", pending),
+			("build_executor_outstanding", "Builds réclamés par ce processus et non terminés", executor.depth),
+			("build_transitions_buffered", "Fins de builds en attente d'écriture", current_app.extensions["build_transitions"].depth),
+		]
+		gauges.append(("build_cache_entries", "Entrées du cache de résultats de builds", cache_entries))
+		admission = current_app.extensions.get("admission")
+		if admission is not None:
+			gauges.append(("admission_in_flight", "Requêtes admises en cours (classes limitées)", admission.in_flight()))
+			gauges.append(("admission_waiting", "Requêtes en attente d'un slot", admission.waiting()))
+		replicas = current_app.extensions.get("replicas")
+		if replicas is not None:
+			gauges.append(("db_replica_max_lag_seconds", "Plus grand retard connu des réplicas", replicas.max_known_lag()))
+		body = current_app.extensions["metrics"].render(gauges)
+		return Response(body, mimetype="text/plain; version=0.0.4")
+
+def _counts():
+		"""(builds pending, entrées du cache) : COUNT(*) relus au plus toutes les HEALTH_CHECK_INTERVAL_S secondes."""
+		cached = current_app.extensions.get("metrics_counts")
+		now = time.monotonic()
+		if cached is None or now - cached[0] > current_app.config["HEALTH_CHECK_INTERVAL_S"]:
+			pending = db.session.execute(
+				select(func.count()).select_from(Build).where(Build.status == "pending")
+			).scalar()
+			cached = current_app.extensions["metrics_counts"] = (now, pending, entry_count())
+		return cached[1], cached[2]
+
+def _pool_stat(pool, name):
+		stat = getattr(pool, name, None)
+		return stat() if callable(stat) else None
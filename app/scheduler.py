@@ -0,0 +1,113 @@
+# Ordonnancement des builds en attente
+"""scheduler.py : coalescence des builds redondants, priorités et partage équitable.
+
+- Coalescence : un nouveau build pour (projet, branche) remplace les builds
+  encore pending de la même branche, qui passent à "superseded" sans être
+  exécutés. Une rafale de pushs ne laisse qu'un build en file par branche.
+- Priorités : les branches de BUILD_PRIORITY_BRANCHES (main, master) sont en
+  classe 0, les autres en classe 1 ; une classe plus basse passe d'abord.
+- Partage équitable : dans une même classe, le prochain build est celui du
+  projet qui a le moins de builds running (puis le plus ancien). Avec
+  BUILD_MAX_RUNNING_PER_PROJECT, un projet qui atteint la limite attend.
+
+L'ordre est calculé en SQL au moment de la réclamation (app/executor.py) :
+aucun état d'ordonnancement n'est gardé en mémoire, plusieurs processus
+partagent la même file.
+"""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, func, select, update
+
+from .db import db
+from .events import record_event
+from .models import Build
+
+HIGH, NORMAL = 0, 1
+
+
+def priority_for(branch, app=None):
+	branches = (app or current_app).config["BUILD_PRIORITY_BRANCHES"]
+	return HIGH if branch in branches else NORMAL
+
+
+def coalesce(project_id, branch, keep_id):
+	"""Passe à superseded les builds pending de (projet, branche) plus anciens que keep_id ; retourne leurs ids.
+
+	À appeler dans la transaction qui insère le build keep_id.
+	"""
+	now = datetime.utcnow()
+	superseded = [row.id for row in db.session.execute(
+		update(Build)
+		.where(Build.project_id == project_id, Build.branch == branch, Build.status == "pending", Build.id < keep_id)
+		.values(status="superseded", finished_at=now, logs=f"Superseded by build {keep_id}")
+		.returning(Build.id)
+	)]
+	for build_id in superseded:
+		record_event(build_id, project_id, "superseded", now)
+	return superseded
+
+
+def _running_by_project():
+	return (
+		select(Build.project_id, func.count().label("running"))
+		.where(Build.status == "running")
+		.group_by(Build.project_id)
+		.subquery()
+	)
+
+
+def pending_in_order(limit, max_running_per_project=0):
+	"""SELECT des builds pending dans l'ordre où ils seront réclamés (id, project_id, branch, priority, running)."""
+	running = _running_by_project()
+	n_running = func.coalesce(running.c.running, 0)
+	stmt = (
+		select(Build.id, Build.project_id, Build.branch, Build.priority, n_running.label("running"))
+		.outerjoin(running, running.c.project_id == Build.project_id)
+		.where(Build.status == "pending")
+		.order_by(Build.priority, n_running, Build.id)
+		.limit(limit)
+	)
+	if max_running_per_project:
+		stmt = stmt.where(n_running < max_running_per_project)
+	return stmt
+
+
+def next_build_id(app=None):
+	"""Prochain build à réclamer selon priorité et partage équitable ; None si rien n'est éligible."""
+	cap = (app or current_app).config["BUILD_MAX_RUNNING_PER_PROJECT"]
+	row = db.session.execute(pending_in_order(1, cap)).first()
+	return row.id if row else None
+
+
+def queue_state(limit=20):
+	"""Vue de la file : compteurs par statut, classe et projet, et prochains builds dans l'ordre."""
+	cap = current_app.config["BUILD_MAX_RUNNING_PER_PROJECT"]
+	counts = dict(db.session.execute(
+		select(Build.status, func.count()).where(Build.status.in_(("pending", "running"))).group_by(Build.status)
+	).all())
+	by_priority = dict(db.session.execute(
+		select(Build.priority, func.count()).where(Build.status == "pending").group_by(Build.priority)
+	).all())
+	projects = db.session.execute(
+		select(
+			Build.project_id,
+			func.sum(case((Build.status == "pending", 1), else_=0)).label("pending"),
+			func.sum(case((Build.status == "running", 1), else_=0)).label("running"),
+		)
+		.where(Build.status.in_(("pending", "running")))
+		.group_by(Build.project_id)
+		.order_by(func.count().desc(), Build.project_id)
+		.limit(limit)
+	).all()
+	return {
+		"pending": counts.get("pending", 0),
+		"running": counts.get("running", 0),
+		"pending_by_priority": {"high" if p == HIGH else "normal": n for p, n in sorted(by_priority.items())},
+		"max_running_per_project": cap or None,
+		"projects": [{"project_id": p.project_id, "pending": p.pending, "running": p.running} for p in projects],
+		"next": [
+			{"id": r.id, "project_id": r.project_id, "branch": r.branch, "priority": r.priority, "project_running": r.running}
+			for r in db.session.execute(pending_in_order(limit, cap))
+		],
+	}
@@ -4,3 +4,18 @@ from typing import TypedDict
 class ProjectSchema(TypedDict):
 	name: str
 	repo: str
+
+def validate_project(data):
+	"""Retourne la liste des erreurs de validation d'un ProjectSchema (vide si valide)."""
+	if not isinstance(data, dict):
+		return ["record must be an object"]
+	errors = []
+	if not isinstance(data.get("name"), str) or not data["name"].strip():
+		errors.append("name is required and must be a non-empty string")
+	elif len(data["name"]) > 100:
+		errors.append("name must be at most 100 characters")
+	if not isinstance(data.get("repo"), str) or not data["repo"].strip():
+		errors.append("repo is required and must be a non-empty string")
+	elif len(data["repo"]) > 255:
+		errors.append("repo must be at most 255 characters")
+	return errors
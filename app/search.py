@@ -0,0 +1,105 @@
+# Recherche de projets par nom et URL de dépôt
+"""search.py : recherche par sous-chaîne indexée (FTS5 trigram sous SQLite, pg_trgm sous PostgreSQL).
+
+SQLite : une table virtuelle FTS5 `project_fts` (tokenizer trigram, contenu
+externe : la table project) indexe name et repo ; des triggers la tiennent à
+jour à chaque INSERT, DELETE et UPDATE de name/repo, y compris pour l'import
+en masse et la purge des projets supprimés. PostgreSQL : index GIN
+gin_trgm_ops sur name et repo, qui servent les ILIKE '%...%'. Dans les deux
+cas, seuls les projets qui contiennent la chaîne cherchée sont lus, sans
+parcourir la table.
+
+Les résultats sont classés par pertinence : nom identique, nom qui commence
+par la chaîne, nom qui la contient, puis correspondance sur le dépôt
+seulement ; à pertinence égale, par id. La pagination par curseur porte sur
+(pertinence, id). Un index de trigrammes ne peut pas servir une chaîne de
+moins de trois caractères : ces recherches sont refusées.
+"""
+from sqlalchemy import case, column, func, literal_column, select, table, text, tuple_
+
+from .db import db
+from .models import Project
+from .pagination import InvalidCursor, decode_values, encode_values
+
+MIN_QUERY_LENGTH = 3
+
+SQLITE_DDL = (
+	"CREATE VIRTUAL TABLE IF NOT EXISTS project_fts USING fts5("
+	"name, repo, content='project', content_rowid='id', tokenize='trigram')",
+	"CREATE TRIGGER IF NOT EXISTS project_fts_ai AFTER INSERT ON project BEGIN "
+	"INSERT INTO project_fts(rowid, name, repo) VALUES (new.id, new.name, new.repo); END",
+	"CREATE TRIGGER IF NOT EXISTS project_fts_ad AFTER DELETE ON project BEGIN "
+	"INSERT INTO project_fts(project_fts, rowid, name, repo) VALUES ('delete', old.id, old.name, old.repo); END",
+	# Pas de trigger sur last_build_status : seules les modifications de name/repo touchent l'index
+	"CREATE TRIGGER IF NOT EXISTS project_fts_au AFTER UPDATE OF name, repo ON project BEGIN "
+	"INSERT INTO project_fts(project_fts, rowid, name, repo) VALUES ('delete', old.id, old.name, old.repo); "
+	"INSERT INTO project_fts(rowid, name, repo) VALUES (new.id, new.name, new.repo); END",
+)
+
+POSTGRES_DDL = (
+	"CREATE EXTENSION IF NOT EXISTS pg_trgm",
+	"CREATE INDEX IF NOT EXISTS ix_project_name_trgm ON project USING gin (name gin_trgm_ops)",
+	"CREATE INDEX IF NOT EXISTS ix_project_repo_trgm ON project USING gin (repo gin_trgm_ops)",
+)
+
+_fts = table("project_fts", column("rowid"))
+
+
+class InvalidQuery(ValueError):
+	"""Chaîne de recherche trop courte pour l'index de trigrammes."""
+
+
+def init_search():
+	"""Crée l'index de recherche s'il manque et l'alimente avec les projets existants (idempotent)."""
+	dialect = db.engine.dialect.name
+	with db.engine.begin() as conn:
+		if dialect == "sqlite":
+			existed = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'project_fts'")).first()
+			for ddl in SQLITE_DDL:
+				conn.execute(text(ddl))
+			if not existed:
+				conn.execute(text("INSERT INTO project_fts(project_fts) VALUES ('rebuild')"))
+		elif dialect == "postgresql":
+			for ddl in POSTGRES_DDL:
+				conn.execute(text(ddl))
+
+
+def _matches(q):
+	if db.session.get_bind().dialect.name == "sqlite":
+		# Phrase FTS5 : la chaîne entière, guillemets doublés
+		phrase = '"' + q.replace('"', '""') + '"'
+		return Project.id.in_(select(_fts.c.rowid).where(literal_column("project_fts").op("MATCH")(phrase)))
+	return Project.name.icontains(q, autoescape=True) | Project.repo.icontains(q, autoescape=True)
+
+
+def _rank(q):
+	return case(
+		(func.lower(Project.name) == q.lower(), 0),
+		(Project.name.istartswith(q, autoescape=True), 1),
+		(Project.name.icontains(q, autoescape=True), 2),
+		else_=3,
+	)
+
+
+def search_page(stmt, q, per_page, cursor=None):
+	"""Page de `stmt` (select de colonnes incluant Project.id) limitée aux projets qui contiennent `q`.
+
+	Retourne (lignes, next_cursor) ; lève InvalidQuery ou InvalidCursor.
+	"""
+	q = q.strip()
+	if len(q) < MIN_QUERY_LENGTH:
+		raise InvalidQuery(f"q must be at least {MIN_QUERY_LENGTH} characters")
+	rank = _rank(q)
+	page_stmt = stmt.add_columns(rank.label("search_rank")).where(_matches(q))
+	if cursor:
+		try:
+			last_rank, last_id = (int(v) for v in decode_values(cursor))
+		except (ValueError, TypeError) as e:
+			raise InvalidCursor(str(e)) from e
+		page_stmt = page_stmt.where(tuple_(rank, Project.id) > tuple_(last_rank, last_id))
+	rows = db.session.execute(page_stmt.order_by(rank, Project.id).limit(per_page + 1)).all()
+	next_cursor = None
+	if len(rows) > per_page:
+		rows = rows[:per_page]
+		next_cursor = encode_values([rows[-1].search_rank, rows[-1].id])
+	return rows, next_cursor
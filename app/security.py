@@ -1 +1,25 @@
-# Fonctions de sécurité (hash, etc.) à compléter
+# Fonctions de sécurité (hash des mots de passe)
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+def hash_password(password):
+	"""Hash d'un mot de passe selon PASSWORD_HASH_METHOD / PASSWORD_SALT_LENGTH."""
+	return generate_password_hash(
+		password,
+		method=current_app.config["PASSWORD_HASH_METHOD"],
+		salt_length=current_app.config["PASSWORD_SALT_LENGTH"]
+	)
+
+def verify_password(password_hash, password):
+	return check_password_hash(password_hash, password)
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+	"""Préfixe écrit par werkzeug pour `method`, paramètres compris (ex. "scrypt" -> "scrypt:32768:8:1")."""
+	return generate_password_hash("x", method=method, salt_length=1).split("$", 1)[0]
+
+def needs_rehash(password_hash):
+	"""Vrai si le hash a été produit avec d'autres paramètres que ceux configurés."""
+	return password_hash.split("$", 1)[0] != _method_prefix(current_app.config["PASSWORD_HASH_METHOD"])
@@ -0,0 +1,108 @@
+# Sérialisation JSON des projets et des builds
+"""serializers.py : sérialiseurs précompilés lisant des lignes Core, avec champs à la demande.
+
+Chaque sérialiseur déclare, une fois, la liste ordonnée de ses champs publics :
+colonne SQL et conversion éventuelle (dates en ISO 8601 « Z »). Les vues de
+liste sélectionnent ces colonnes avec select() et reçoivent des tuples : ni
+objets ORM, ni identity map, ni suivi des modifications. Pour chaque
+ensemble de champs (paramètre ?fields=id,name,...), la fonction ligne -> dict
+est construite une fois puis réutilisée : seules les colonnes demandées sont
+lues en SQL et seules les colonnes datées passent par une conversion.
+"""
+from functools import lru_cache
+
+from sqlalchemy import select
+
+from .models import Artifact, Build, Project
+
+
+class InvalidFields(ValueError):
+	"""Paramètre fields (ou include) inconnu."""
+
+
+def iso(dt):
+	return dt.isoformat() + "Z"
+
+
+class Serializer:
+	"""Champs publics d'un modèle : (nom, colonne, conversion ou None), dans l'ordre de sortie."""
+
+	def __init__(self, *fields):
+		self.fields = {name: (column, convert) for name, column, convert in fields}
+		self.names = tuple(self.fields)
+
+	def parse_fields(self, raw):
+		"""Noms demandés par ?fields= (tous si absent), dans l'ordre de déclaration ; lève InvalidFields."""
+		if not raw:
+			return self.names
+		wanted = {name.strip() for name in raw.split(",") if name.strip()}
+		unknown = wanted - self.fields.keys()
+		if unknown or not wanted:
+			raise InvalidFields(f"unknown fields: {', '.join(sorted(unknown))}" if unknown else "fields is empty")
+		return tuple(name for name in self.names if name in wanted)
+
+	def columns(self, names, extra=()):
+		"""Colonnes à sélectionner pour `names`, suivies des colonnes `extra` absentes (ex. clés de curseur)."""
+		columns = [self.fields[name][0] for name in names]
+		return columns + [c for c in extra if not any(c is col for col in columns)]
+
+	def select(self, names, extra=()):
+		return select(*self.columns(names, extra))
+
+	def row_serializer(self, names):
+		"""Fonction ligne -> dict pour `names` (les colonnes en plus en fin de ligne sont ignorées)."""
+		return _compile(self, names)
+
+	def dump(self, obj, names=None):
+		"""Sérialise un objet ORM déjà chargé (création, détail d'un build)."""
+		return self.row_serializer(names or self.names)(
+			tuple(getattr(obj, column.key) for column in self.columns(names or self.names))
+		)
+
+
+@lru_cache(maxsize=256)
+def _compile(serializer, names):
+	keys = names
+	converters = [(i, serializer.fields[name][1]) for i, name in enumerate(names) if serializer.fields[name][1]]
+	if not converters:
+		return lambda row: dict(zip(keys, row))
+
+	def to_dict(row):
+		values = list(row)
+		for i, convert in converters:
+			if values[i] is not None:
+				values[i] = convert(values[i])
+		return dict(zip(keys, values))
+	return to_dict
+
+
+PROJECT = Serializer(
+	("id", Project.id, None),
+	("name", Project.name, None),
+	("repo", Project.repo, None),
+	("last_build_status", Project.last_build_status, None),
+	("created_at", Project.created_at, iso),
+)
+
+BUILD = Serializer(
+	("id", Build.id, None),
+	("project_id", Build.project_id, None),
+	("status", Build.status, None),
+	("branch", Build.branch, None),
+	("priority", Build.priority, None),
+	("commit", Build.commit_sha, None),
+	("cached_from", Build.cached_from_id, None),
+	("duration_s", Build.duration_s, None),
+	("logs", Build.logs, None),
+	("created_at", Build.created_at, iso),
+	("started_at", Build.started_at, iso),
+	("finished_at", Build.finished_at, iso),
+)
+
+ARTIFACT = Serializer(
+	("name", Artifact.name, None),
+	("digest", Artifact.digest, None),
+	("size", Artifact.size, None),
+	("content_type", Artifact.content_type, None),
+	("created_at", Artifact.created_at, iso),
+)
@@ -0,0 +1,135 @@
+# Statistiques de builds par projet
+"""stats.py : statistiques par projet maintenues incrémentalement (table ProjectStats).
+
+Chaque transition de build met à jour la ligne du projet par un UPDATE
+arithmétique, dans la transaction de la transition : aucun agrégat sur
+la table Build n'est nécessaire pour lire les statistiques. La moyenne et la
+variance des durées sont tenues par l'algorithme de Welford.
+"""
+import math
+
+from sqlalchemy import Float, Integer, and_, bindparam, case, delete, insert, select, update
+
+from .db import db, upsert
+from .models import Build, ProjectStats
+
+FINISHED = ("success", "fail")
+
+
+def _ensure_row(project_id):
+	db.session.execute(upsert()(ProjectStats).values(project_id=project_id).on_conflict_do_nothing())
+
+
+def record_triggered(project_id, at):
+	"""Un build a été mis en file (à appeler avant le commit de l'insertion)."""
+	_ensure_row(project_id)
+	db.session.execute(
+		update(ProjectStats).where(ProjectStats.project_id == project_id)
+		.values(total_builds=ProjectStats.total_builds + 1, last_build_at=at)
+	)
+
+
+def record_finished_batch(builds):
+	"""Builds terminés, (project_id, statut, durée) dans l'ordre de fin (dans la transaction qui fixe leur statut final).
+
+	Une seule instruction UPDATE, exécutée en executemany : une ligne de
+	paramètres par build, appliquées dans l'ordre.
+	"""
+	if not builds:
+		return
+	conn = db.session.connection()
+	conn.execute(
+		upsert()(ProjectStats.__table__).on_conflict_do_nothing(),
+		[{"project_id": project_id} for project_id in {b[0] for b in builds}],
+	)
+	s = ProjectStats
+	success = bindparam("b_success", type_=Integer)
+	duration = bindparam("b_duration", type_=Float)
+	n = s.success_count + s.failure_count + 1
+	new_mean = s.duration_mean + (duration - s.duration_mean) / n
+	new_streak = case(
+		(success == 1, case((s.current_streak > 0, s.current_streak + 1), else_=1)),
+		else_=case((s.current_streak < 0, s.current_streak - 1), else_=-1),
+	)
+	stmt = update(s.__table__).where(s.project_id == bindparam("b_project_id")).values(
+		success_count=s.success_count + success,
+		failure_count=s.failure_count + 1 - success,
+		duration_mean=new_mean,
+		duration_m2=s.duration_m2 + (duration - s.duration_mean) * (duration - new_mean),
+		current_streak=new_streak,
+		best_success_streak=case(
+			(and_(success == 1, new_streak > s.best_success_streak), new_streak), else_=s.best_success_streak
+		),
+	)
+	conn.execute(stmt, [
+		{"b_project_id": project_id, "b_success": int(status == "success"), "b_duration": duration_s}
+		for project_id, status, duration_s in builds
+	])
+
+
+def stats_to_dict(stats):
+	if stats is None:
+		stats = ProjectStats(
+			total_builds=0, success_count=0, failure_count=0, duration_mean=0.0, duration_m2=0.0,
+			current_streak=0, best_success_streak=0
+		)
+	finished = stats.success_count + stats.failure_count
+	variance = stats.duration_m2 / (finished - 1) if finished > 1 else None
+	return {
+		"total_builds": stats.total_builds,
+		"success_count": stats.success_count,
+		"failure_count": stats.failure_count,
+		"success_rate": round(stats.success_count / finished, 4) if finished else None,
+		"duration_mean_s": stats.duration_mean if finished else None,
+		"duration_variance": variance,
+		"duration_stddev_s": math.sqrt(variance) if variance is not None else None,
+		"last_build_at": stats.last_build_at.isoformat() + "Z" if stats.last_build_at else None,
+		"current_streak": stats.current_streak,
+		"best_success_streak": stats.best_success_streak,
+	}
+
+
+def rebuild_stats(batch=10000):
+	"""Recalcule toutes les statistiques depuis la table Build (une seule passe triée)."""
+	db.session.execute(delete(ProjectStats))
+	rows = db.session.execute(
+		select(Build.project_id, Build.status, Build.duration_s, Build.created_at)
+		.order_by(Build.project_id, Build.created_at, Build.id)
+		.execution_options(yield_per=batch)
+	)
+	current = None
+	pending = []
+	for project_id, status, duration, created_at in rows:
+		if current is None or current.project_id != project_id:
+			current = ProjectStats(
+				project_id=project_id, total_builds=0, success_count=0, failure_count=0,
+				duration_mean=0.0, duration_m2=0.0, current_streak=0, best_success_streak=0
+			)
+			pending.append(current)
+		current.total_builds += 1
+		current.last_build_at = created_at
+		if status not in FINISHED or duration is None:
+			continue
+		if status == "success":
+			current.success_count += 1
+			current.current_streak = current.current_streak + 1 if current.current_streak > 0 else 1
+			current.best_success_streak = max(current.best_success_streak, current.current_streak)
+		else:
+			current.failure_count += 1
+			current.current_streak = current.current_streak - 1 if current.current_streak < 0 else -1
+		n = current.success_count + current.failure_count
+		delta = duration - current.duration_mean
+		current.duration_mean += delta / n
+		current.duration_m2 += delta * (duration - current.duration_mean)
+		if len(pending) >= batch:
+			_flush_stats(pending[:-1])
+			pending = pending[-1:]
+	_flush_stats(pending)
+	db.session.commit()
+
+
+def _flush_stats(stats):
+	if stats:
+		db.session.execute(insert(ProjectStats), [
+			{c.key: getattr(s, c.key) for c in ProjectStats.__table__.columns} for s in stats
+		])
@@ -1,14 +1,27 @@
 # Fonctions utilitaires
+from datetime import datetime, timezone
 from .models import User
 from .db import db
-from werkzeug.security import generate_password_hash
+from .security import hash_password
 
 def seed_admin():
 	if not User.query.filter_by(username="admin").first():
 		admin = User(
 			username="admin",
-			password_hash=generate_password_hash("admin123"),
+			password_hash=hash_password("admin123"),
 			is_admin=True
 		)
 		db.session.add(admin)
 		db.session.commit()
+
+def init_db():
+	"""Crée le schéma, l'index de recherche et le compte admin (commande init-db, une fois par déploiement)."""
+	from .search import init_search
+	db.create_all()
+	init_search()
+	seed_admin()
+
+def parse_utc(value):
+	"""Date ISO 8601 en UTC naïf, comme en base : "Z" ou un décalage (+02:00) sont convertis ; lève ValueError."""
+	dt = datetime.fromisoformat(value.rstrip("Z"))
+	return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
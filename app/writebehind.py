@@ -0,0 +1,219 @@
+# Écriture différée des fins de builds
+"""writebehind.py : fins de builds regroupées en une transaction par lot.
+
+Un worker qui termine un build ne fait plus de commit : la transition
+(statut final, durée, logs) est mise en tampon, et un thread de vidage écrit
+toutes les transitions accumulées pendant BUILD_FLUSH_INTERVAL_S (ou dès que
+BUILD_FLUSH_MAX_BATCH sont en attente) en une seule transaction : builds,
+statistiques et événements SSE en executemany, rollups agrégés par tranche,
+cache de résultats, puis un seul UPDATE de last_build_status par projet.
+Sous SQLite, un commit par lot au lieu d'un par build.
+
+Durabilité : une fin de build n'est visible (API, SSE) et durable qu'une fois
+son lot commité, au plus BUILD_FLUSH_INTERVAL_S après la fin du build. Le
+tampon est vidé à l'arrêt de l'exécuteur (atexit, fin de worker gunicorn).
+Si le processus meurt avant, le build reste running en base ; la reprise
+(BUILD_LEASE_S) le remet en file et il est reconstruit : aucune fin de build
+n'est publiée sans être écrite. Le passage pending -> running reste
+synchrone : c'est lui qui réserve le build entre processus.
+
+Une fin n'est écrite que si le build est toujours running depuis le même
+démarrage (started_at) : une fin tardive ne remplace pas un build remis en
+file par la reprise, annulé, ou réclamé de nouveau. Le build d'un projet
+supprimé est terminé, pour que la purge puisse l'effacer, mais sans
+statistiques, événement ni entrée de cache. Les fins ignorées sont comptées
+dans build_transitions_skipped_total.
+
+`flush()` vide le tampon sur le thread appelant (arrêt de l'exécuteur) ;
+BUILD_WRITE_BEHIND=0 écrit chaque fin dans sa propre transaction, sans tampon.
+"""
+import threading
+from collections import namedtuple
+
+from sqlalchemy import and_, bindparam, exists, insert, select, update
+
+from .analytics import record_builds
+from .buildcache import store as store_cached_result
+from .cache import invalidate_cache
+from .db import db
+from .events import wake_event_bus
+from .models import Build, BuildEvent, Project
+from .stats import record_finished_batch
+
+# build : objet Build détaché (project_id, branch, created_at... lus au vidage)
+Transition = namedtuple("Transition", "build status finished_at duration_s logs")
+
+
+class TransitionBuffer:
+	"""Tampon des fins de builds d'un processus, vidé par lots par un thread dédié."""
+
+	def __init__(self, app, interval=0.05, max_batch=200, enabled=True):
+		self.app = app
+		self.interval = interval
+		self.max_batch = max_batch
+		self.enabled = enabled
+		self._pending = []  # (transition, rappel après commit)
+		self._lock = threading.Lock()
+		self._flush_lock = threading.Lock()  # un lot à la fois : ordre des transitions préservé
+		self._wakeup = threading.Event()
+		self._full = threading.Event()
+		self._stopping = False
+		self._thread = None
+
+	@property
+	def depth(self):
+		return len(self._pending)
+
+	def add(self, transition, on_flushed=None):
+		"""Met une transition en tampon ; `on_flushed` est appelé une fois son lot commité (ou ignoré)."""
+		with self._lock:
+			self._pending.append((transition, on_flushed))
+			size = len(self._pending)
+		if not self.enabled or self._stopping:
+			self.flush()
+			return
+		self._start()
+		self._wakeup.set()
+		if size >= self.max_batch:
+			self._full.set()
+
+	def _start(self):
+		if self._thread is None:
+			with self._lock:
+				if self._thread is None:
+					self._thread = threading.Thread(target=self._loop, name="build-transitions", daemon=True)
+					self._thread.start()
+
+	def _loop(self):
+		while not self._stopping:
+			self._wakeup.wait()
+			# Fenêtre de regroupement, écourtée quand le lot est plein
+			self._full.wait(self.interval)
+			self._wakeup.clear()
+			self._full.clear()
+			try:
+				self.flush()
+			except Exception:
+				self.app.logger.exception("build transitions flush error")
+
+	def stop(self, timeout=5.0):
+		"""Arrête le thread et écrit les transitions restantes."""
+		self._stopping = True
+		self._wakeup.set()
+		self._full.set()
+		if self._thread is not None:
+			self._thread.join(timeout)
+			self._thread = None
+		self.flush()
+		self._stopping = False
+
+	def flush(self):
+		"""Écrit tout le tampon (lots de max_batch) ; retourne le nombre de transitions écrites."""
+		written = 0
+		with self._flush_lock:
+			while True:
+				with self._lock:
+					batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+				if not batch:
+					return written
+				try:
+					self._write([t for t, _ in batch])
+				except Exception:
+					# Lot refusé : chaque transition dans sa propre transaction, pour ne perdre que la fautive
+					self.app.logger.exception("build transitions batch failed, retrying one by one")
+					for t, _ in batch:
+						try:
+							self._write([t])
+						except Exception:
+							self.app.logger.exception("build %s transition lost (requeued after lease)", t.build.id)
+				written += len(batch)
+				metrics = self.app.extensions.get("metrics")
+				if metrics is not None:
+					metrics.inc("build_transition_batches_total")
+					metrics.inc("build_transitions_flushed_total", len(batch))
+				for _, on_flushed in batch:
+					if on_flushed is not None:
+						on_flushed()
+
+	def _write(self, batch):
+		with self.app.app_context():
+			try:
+				# Seul le build encore running de la même exécution est terminé : une fin tardive
+				# ne touche pas un build remis en file (reprise), annulé ou relancé depuis
+				db.session.connection().execute(
+					update(Build.__table__)
+					.where(
+						Build.id == bindparam("b_id"),
+						Build.status == "running",
+						Build.started_at == bindparam("b_started_at"),
+					)
+					.values(
+						status=bindparam("b_status"),
+						finished_at=bindparam("b_finished_at"),
+						duration_s=bindparam("b_duration_s"),
+						logs=bindparam("b_logs"),
+					),
+					[
+						{
+							"b_id": t.build.id,
+							"b_started_at": t.build.started_at,
+							"b_status": t.status,
+							"b_finished_at": t.finished_at,
+							"b_duration_s": t.duration_s,
+							"b_logs": t.logs[:255] if t.logs else None,
+						}
+						for t in batch
+					],
+				)
+				# Lignes effectivement terminées par ce lot (relues après l'UPDATE, dans la transaction)
+				current = dict(db.session.execute(
+					select(Build.id, Build.finished_at)
+					.join(Project, Project.id == Build.project_id)
+					.where(Build.id.in_([t.build.id for t in batch]), Project.deleted_at.is_(None))
+				).all())
+				applied = [t for t in batch if current.get(t.build.id) == t.finished_at]
+				if applied:
+					self._record(applied)
+				db.session.commit()
+			except Exception:
+				db.session.rollback()
+				raise
+		skipped = len(batch) - len(applied)
+		metrics = self.app.extensions.get("metrics")
+		if skipped and metrics is not None:
+			metrics.inc("build_transitions_skipped_total", skipped)
+		invalidate_cache(self.app)
+		wake_event_bus(self.app)
+
+	def _record(self, applied):
+		"""Écritures dérivées des fins appliquées : statistiques, rollups, événements, cache, statut du projet."""
+		record_finished_batch([(t.build.project_id, t.status, t.duration_s) for t in applied])
+		record_builds([(t.build.project_id, t.build.created_at, t.status, t.duration_s) for t in applied])
+		db.session.execute(insert(BuildEvent), [
+			{"build_id": t.build.id, "project_id": t.build.project_id, "status": t.status, "created_at": t.finished_at}
+			for t in applied
+		])
+		last = {}
+		for t in applied:
+			if t.status == "success":
+				store_cached_result(t.build, self.app)
+			last[t.build.project_id] = t
+		for project_id, t in last.items():
+			# Un build du projet démarré après cette fin reste le dernier (running)
+			newer = exists().where(and_(
+				Build.project_id == project_id, Build.status == "running", Build.started_at > t.finished_at,
+			))
+			db.session.execute(
+				update(Project).where(Project.id == project_id, ~newer).values(last_build_status=t.status)
+			)
+
+
+def init_writebehind(app):
+	buffer = TransitionBuffer(
+		app,
+		interval=app.config["BUILD_FLUSH_INTERVAL_S"],
+		max_batch=app.config["BUILD_FLUSH_MAX_BATCH"],
+		enabled=app.config["BUILD_WRITE_BEHIND"],
+	)
+	app.extensions["build_transitions"] = buffer
+	return buffer
@@ -0,0 +1 @@
+# Suite de benchmarks (seed de gros volumes + scénarios de charge)
@@ -0,0 +1,219 @@
+# Scénarios de charge sur l'application WSGI (en processus)
+"""run.py : débit et latences p50/p95/p99 par route, comparés à une baseline.
+
+Chaque scénario est rejoué `--requests` fois pour chaque niveau de concurrence
+(un client de test Flask par thread), sur une base créée par bench.seed.
+Le résultat JSON est comparé à `--baseline` : une latence p95 plus haute ou un
+débit plus bas que la baseline au-delà de `--tolerance` fait échouer le run.
+
+    python -m bench.seed --db bench/bench.db
+    python -m bench.run --db bench/bench.db --output bench_output.json
+    python -m bench.run --db bench/bench.db --update-baseline
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCENARIOS = {}
+
+
+def scenario(name):
+	def register(fn):
+		SCENARIOS[name] = fn
+		return fn
+	return register
+
+
+@scenario("login")
+def _login(client, ctx, rnd):
+	return client.post("/login", json={"username": "admin", "password": "admin123"})
+
+
+@scenario("list_projects")
+def _list_projects(client, ctx, rnd):
+	return client.get("/projects?per_page=50", headers=ctx["headers"])
+
+
+@scenario("list_projects_deep")
+def _list_projects_deep(client, ctx, rnd):
+	return client.get(f"/projects?per_page=50&cursor={ctx['deep_cursor']}", headers=ctx["headers"])
+
+
+@scenario("list_projects_recent")
+def _list_projects_recent(client, ctx, rnd):
+	return client.get("/projects?per_page=50&include=recent_builds&recent=5", headers=ctx["headers"])
+
+
+@scenario("get_project")
+def _get_project(client, ctx, rnd):
+	return client.get(f"/projects/{rnd.choice(ctx['project_ids'])}", headers=ctx["headers"])
+
+
+@scenario("trigger_build")
+def _trigger_build(client, ctx, rnd):
+	return client.post(f"/projects/{rnd.choice(ctx['project_ids'])}/builds", json={"branch": "main"}, headers=ctx["headers"])
+
+
+@scenario("list_builds")
+def _list_builds(client, ctx, rnd):
+	return client.get(f"/projects/{rnd.choice(ctx['project_ids'])}/builds?per_page=50", headers=ctx["headers"])
+
+
+@scenario("list_builds_500")
+def _list_builds_500(client, ctx, rnd):
+	return client.get(f"/projects/{rnd.choice(ctx['project_ids'])}/builds?per_page=500", headers=ctx["headers"])
+
+
+@scenario("list_builds_fields")
+def _list_builds_fields(client, ctx, rnd):
+	return client.get(
+		f"/projects/{rnd.choice(ctx['project_ids'])}/builds?per_page=500&fields=id,status,created_at", headers=ctx["headers"]
+	)
+
+
+def percentile(sorted_values, p):
+	if not sorted_values:
+		return None
+	k = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+	return sorted_values[k]
+
+
+def make_app(db_path):
+	os.environ["DB_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+	os.environ.setdefault("BUILD_SIMULATED_MAX_S", "0")
+	os.environ.setdefault("BUILD_QUEUE_MAX", "1000000")
+	# Pas de workers : les builds déclenchés restent pending et ne faussent pas les mesures
+	os.environ.setdefault("BUILD_EXECUTOR_AUTOSTART", "0")
+	# Rafales d'une seule identité : pas de quota
+	os.environ.setdefault("ADMISSION_RATE_PER_S", "0")
+	from app import create_app
+	return create_app()
+
+
+def make_context(app):
+	from sqlalchemy import select
+	from app.db import db
+	from app.models import Project
+	from app.pagination import encode_cursor
+	client = app.test_client()
+	token = client.post("/login", json={"username": "admin", "password": "admin123"}).get_json()["access_token"]
+	with app.app_context():
+		rows = db.session.execute(select(Project.id, Project.created_at).order_by(Project.created_at, Project.id)).all()
+	if not rows:
+		raise SystemExit("base vide : lancer d'abord python -m bench.seed")
+	mid = rows[len(rows) // 2]
+	return {
+		"headers": {"Authorization": f"Bearer {token}"},
+		"project_ids": [r.id for r in rows],
+		"deep_cursor": encode_cursor(mid.created_at, mid.id),
+	}
+
+
+def run_scenario(app, ctx, fn, requests, concurrency):
+	latencies = []
+	errors = 0
+	lock = threading.Lock()
+	per_worker = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+	def worker(i):
+		nonlocal errors
+		rnd = random.Random(i)
+		client = app.test_client()
+		local, local_errors = [], 0
+		for _ in range(per_worker[i]):
+			t0 = time.perf_counter()
+			resp = fn(client, ctx, rnd)
+			local.append(time.perf_counter() - t0)
+			local_errors += resp.status_code >= 400
+		with lock:
+			latencies.extend(local)
+			errors += local_errors
+
+	t0 = time.perf_counter()
+	with ThreadPoolExecutor(concurrency) as pool:
+		list(pool.map(worker, range(concurrency)))
+	elapsed = time.perf_counter() - t0
+	latencies.sort()
+	ms = lambda v: round(v * 1000, 3)
+	return {
+		"requests": requests,
+		"concurrency": concurrency,
+		"errors": errors,
+		"throughput_rps": round(requests / elapsed, 1),
+		"p50_ms": ms(percentile(latencies, 50)),
+		"p95_ms": ms(percentile(latencies, 95)),
+		"p99_ms": ms(percentile(latencies, 99)),
+	}
+
+
+def compare(results, baseline, tolerance, min_delta_ms=2.0):
+	"""Liste des régressions (message par scénario) par rapport à la baseline.
+
+	Une latence n'est en régression que si elle dépasse la baseline à la fois de
+	`tolerance` (relatif) et de `min_delta_ms` (absolu, pour les routes sub-ms).
+	Un scénario mesuré sans baseline échoue aussi : --update-baseline l'ajoute.
+	"""
+	regressions = []
+	for key, cur in results["results"].items():
+		base = baseline.get("results", {}).get(key)
+		if base is None:
+			regressions.append(f"{key}: pas de baseline (relancer avec --update-baseline)")
+			continue
+		if cur["p95_ms"] > max(base["p95_ms"] * (1 + tolerance), base["p95_ms"] + min_delta_ms):
+			regressions.append(f"{key}: p95 {cur['p95_ms']}ms > {base['p95_ms']}ms (+{tolerance:.0%})")
+		if cur["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+			regressions.append(f"{key}: {cur['throughput_rps']} req/s < {base['throughput_rps']} req/s (-{tolerance:.0%})")
+		if cur["errors"] > base.get("errors", 0):
+			regressions.append(f"{key}: {cur['errors']} erreurs")
+	return regressions
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--db", default="bench/bench.db")
+	parser.add_argument("--requests", type=int, default=300)
+	parser.add_argument("--concurrency", default="1,4", help="niveaux de concurrence, séparés par des virgules")
+	parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+	parser.add_argument("--output", help="fichier JSON de résultats (stdout sinon)")
+	parser.add_argument("--baseline", default="bench/baseline.json")
+	parser.add_argument("--tolerance", type=float, default=0.25)
+	parser.add_argument("--min-delta-ms", type=float, default=2.0)
+	parser.add_argument("--update-baseline", action="store_true")
+	args = parser.parse_args()
+
+	app = make_app(args.db)
+	ctx = make_context(app)
+	results = {"db": os.path.basename(args.db), "results": {}}
+	for name in args.scenarios.split(","):
+		for concurrency in map(int, args.concurrency.split(",")):
+			# Échauffement (caches, connexions du pool)
+			run_scenario(app, ctx, SCENARIOS[name], min(20, args.requests), concurrency)
+			results["results"][f"{name}@{concurrency}"] = run_scenario(app, ctx, SCENARIOS[name], args.requests, concurrency)
+
+	text = json.dumps(results, indent=2)
+	if args.output:
+		with open(args.output, "w") as f:
+			f.write(text + "\n")
+	else:
+		print(text)
+	if args.update_baseline:
+		with open(args.baseline, "w") as f:
+			f.write(text + "\n")
+		return 0
+	if not os.path.exists(args.baseline):
+		print(f"pas de baseline ({args.baseline}), comparaison ignorée", file=sys.stderr)
+		return 0
+	with open(args.baseline) as f:
+		regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+	for r in regressions:
+		print(f"REGRESSION {r}", file=sys.stderr)
+	return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,102 @@
+# Seed rapide d'une base SQLite de benchmark
+"""seed.py : génère N projets et M builds dans un fichier SQLite.
+
+Le schéma (tables et index) est créé par l'application elle-même (init_db), puis les
+lignes sont insérées en executemany directement via sqlite3, journal et fsync
+désactivés : ~10M builds en quelques minutes. Les tables dérivées (statistiques
+par projet, rollups analytiques) sont ensuite recalculées en bloc.
+
+    python -m bench.seed --db bench/bench.db --projects 100000 --builds 10000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+STATUSES = ("success", "fail")
+BRANCHES = ("main", "develop", "feature/a", "feature/b")
+
+
+def create_app(path):
+	os.environ["DB_URL"] = f"sqlite:///{os.path.abspath(path)}"
+	os.environ["BUILD_EXECUTOR_AUTOSTART"] = "0"
+	from app import create_app
+	return create_app()
+
+
+def _projects(n, start):
+	for i in range(n):
+		created = start + timedelta(seconds=i * 30)
+		yield (f"bench-project-{i}", f"https://github.com/bench/project-{i}", random.choice(STATUSES), created)
+
+
+def _builds(n, n_projects, start, span_s):
+	rnd = random.Random(42)
+	for i in range(n):
+		created = start + timedelta(seconds=span_s * i / n)
+		duration = round(rnd.lognormvariate(3, 0.6), 2)
+		yield (
+			rnd.randint(1, n_projects), rnd.choice(STATUSES), rnd.choice(BRANCHES), duration,
+			created, created, created + timedelta(seconds=duration)
+		)
+
+
+def _insert(conn, sql, rows, batch=50000):
+	buf = []
+	for row in rows:
+		buf.append(row)
+		if len(buf) >= batch:
+			conn.executemany(sql, buf)
+			buf.clear()
+	if buf:
+		conn.executemany(sql, buf)
+
+
+def seed(path, n_projects, n_builds):
+	if os.path.exists(path):
+		os.remove(path)
+	app = create_app(path)
+	with app.app_context():
+		from app.db import db
+		from app.utils import init_db
+		init_db()
+		# Connexions du pool fermées : journal_mode=OFF exige d'être seul sur la base
+		db.engine.dispose()
+	conn = sqlite3.connect(path, isolation_level=None)
+	conn.execute("PRAGMA journal_mode=OFF")
+	conn.execute("PRAGMA synchronous=OFF")
+	conn.execute("PRAGMA cache_size=-200000")
+	start = datetime.utcnow() - timedelta(days=365)
+	conn.execute("BEGIN")
+	_insert(conn, "INSERT INTO project (name, repo, last_build_status, created_at) VALUES (?, ?, ?, ?)",
+		_projects(n_projects, start))
+	_insert(conn, "INSERT INTO build (project_id, status, branch, duration_s, created_at, started_at, finished_at) "
+		"VALUES (?, ?, ?, ?, ?, ?, ?)", _builds(n_builds, n_projects, start, 365 * 86400))
+	conn.execute("COMMIT")
+	conn.close()
+	# Tables dérivées, calculées en bloc
+	with app.app_context():
+		from app.stats import rebuild_stats
+		from app.analytics import rebuild_rollups
+		rebuild_stats()
+		rebuild_rollups()
+	conn = sqlite3.connect(path, isolation_level=None)
+	conn.execute("ANALYZE")
+	conn.close()
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--db", default="bench/bench.db")
+	parser.add_argument("--projects", type=int, default=2000)
+	parser.add_argument("--builds", type=int, default=100000)
+	args = parser.parse_args()
+	t0 = time.perf_counter()
+	seed(args.db, args.projects, args.builds)
+	print(f"{args.projects} projets, {args.builds} builds -> {args.db} en {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+	main()
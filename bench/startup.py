@@ -0,0 +1,99 @@
+# Profil de démarrage d'un worker
+"""startup.py : temps d'import de `app` et de create_app() dans des processus neufs.
+
+Chaque mesure lance un interpréteur Python vierge (comme un worker gunicorn
+qui démarre) : `import app` puis `create_app()`, sans base initialisée ni
+requête servie. Le run échoue si la médiane de create_app() dépasse
+`--max-factory-ms`. `--importtime` affiche les modules les plus coûteux
+(python -X importtime), pour trouver l'import à rendre paresseux.
+
+    python -m bench.startup --runs 5 --max-factory-ms 100
+    python -m bench.startup --importtime 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.create_app()
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "factory_ms": (t2 - t1) * 1000}))
+"""
+
+
+def probe_env(tmpdir):
+	env = dict(os.environ)
+	env.setdefault("DB_URL", f"sqlite:///{os.path.join(tmpdir, 'startup.db')}")
+	env.setdefault("BUILD_EXECUTOR_AUTOSTART", "0")
+	env.setdefault("BUILD_LOG_DIR", os.path.join(tmpdir, "logs"))
+	env.setdefault("SWAGGER_SPEC_CACHE_DIR", os.path.join(tmpdir, "apispec"))
+	return env
+
+
+def measure(runs, env):
+	samples = []
+	for _ in range(runs):
+		out = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True)
+		samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+	return {
+		key: {
+			"median_ms": round(statistics.median(s[key] for s in samples), 1),
+			"max_ms": round(max(s[key] for s in samples), 1),
+		}
+		for key in ("import_ms", "factory_ms")
+	}
+
+
+def importtime(top, env):
+	"""Modules les plus coûteux (temps cumulé, µs) à l'import de app et pendant create_app()."""
+	out = subprocess.run(
+		[sys.executable, "-X", "importtime", "-c", "import app; app.create_app()"],
+		env=env, capture_output=True, text=True, check=True
+	)
+	rows = []
+	for line in out.stderr.splitlines():
+		if not line.startswith("import time:") or "cumulative" in line:
+			continue
+		_, cumulative, name = line[len("import time:"):].split("|")
+		rows.append((int(cumulative), name.rstrip()))
+	return sorted(rows, reverse=True)[:top]
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--runs", type=int, default=5)
+	parser.add_argument("--max-factory-ms", type=float, default=100.0)
+	parser.add_argument("--importtime", type=int, default=0, metavar="N", help="afficher les N imports les plus lents")
+	parser.add_argument("--output", help="fichier JSON de résultats (stdout sinon)")
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory(prefix="usine-startup-") as tmpdir:
+		env = probe_env(tmpdir)
+		results = measure(args.runs, env)
+		if args.importtime:
+			for cumulative, name in importtime(args.importtime, env):
+				print(f"{cumulative / 1000:8.1f} ms  {name}", file=sys.stderr)
+
+	text = json.dumps(results, indent=2)
+	if args.output:
+		with open(args.output, "w") as f:
+			f.write(text + "\n")
+	else:
+		print(text)
+	factory = results["factory_ms"]["median_ms"]
+	if factory > args.max_factory_ms:
+		print(f"REGRESSION create_app() {factory}ms > {args.max_factory_ms}ms", file=sys.stderr)
+		return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
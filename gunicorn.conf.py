@@ -0,0 +1,41 @@
+# Configuration gunicorn (gunicorn -c gunicorn.conf.py "app:create_app()")
+"""Workers et threads lus dans l'environnement.
+
+- gthread (défaut) : GUNICORN_WORKERS processus x GUNICORN_THREADS threads ;
+  DB_POOL_SIZE doit couvrir les threads d'un worker plus ses threads de fond.
+- gevent : GUNICORN_WORKER_CLASS=gevent ; psycopg2 est rendu coopératif via
+  psycogreen s'il est installé.
+
+Pas de preload par défaut : l'exécuteur de builds et le health check tournent
+dans des threads, qui ne survivent pas au fork. Avec GUNICORN_PRELOAD=1, les
+connexions héritées du maître sont abandonnées dans chaque worker (app/engine.py).
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("GUNICORN_WORKERS", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+# Recyclage des workers (fuites mémoire), décalé pour ne pas tous les redémarrer ensemble
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+
+def post_fork(server, worker):
+	if worker_class == "gevent":
+		try:
+			from psycogreen.gevent import patch_psycopg
+		except ImportError:
+			return
+		patch_psycopg()
+
+
+def worker_exit(server, worker):
+	from app.engine import dispose_engines
+	dispose_engines()
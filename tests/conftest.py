@@ -0,0 +1,26 @@
+# Configuration commune des tests : base SQLite temporaire et builds instantanés
+import os
+import tempfile
+
+import pytest
+
+_tmpdir = tempfile.mkdtemp(prefix="usine-tests-")
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'test.db')}"
+os.environ["BUILD_SIMULATED_MAX_S"] = "0"
+os.environ["BUILD_EXECUTOR_AUTOSTART"] = "0"
+os.environ["BUILD_LOG_DIR"] = os.path.join(_tmpdir, "logs")
+os.environ["ARTIFACT_DIR"] = os.path.join(_tmpdir, "artifacts")
+# Hash volontairement peu coûteux pour accélérer les tests
+os.environ["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+# Spec Swagger mise en cache hors du dépôt
+os.environ["SWAGGER_SPEC_CACHE_DIR"] = os.path.join(_tmpdir, "apispec")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _schema():
+	"""Schéma et admin créés une fois, comme le ferait `flask --app app init-db`."""
+	from app import create_app
+	from app.utils import init_db
+	app = create_app()
+	with app.app_context():
+		init_db()
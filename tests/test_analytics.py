@@ -0,0 +1,75 @@
+# Tests analytique des builds
+
+import pytest
+from app import create_app
+import random
+import uuid
+import time
+
+@pytest.fixture
+def client():
+	app = create_app()
+	app.config["TESTING"] = True
+	with app.test_client() as client:
+		yield client
+	app.extensions["build_executor"].stop()
+
+def get_token(client):
+	resp = client.post("/login", json={"username": "admin", "password": "admin123"})
+	return resp.get_json()["access_token"]
+
+def wait_for_build(client, headers, pid, bid, timeout=5.0):
+	deadline = time.monotonic() + timeout
+	while time.monotonic() < deadline:
+		if client.get(f"/projects/{pid}/builds/{bid}", headers=headers).get_json()["status"] not in ("pending", "running"):
+			return
+		time.sleep(0.02)
+	raise AssertionError(f"build {bid} not finished")
+
+def test_sketch_quantiles_relative_error():
+	from app.analytics import ALPHA, sketch_key, sketch_quantile
+	rnd = random.Random(1)
+	durations = sorted(rnd.lognormvariate(1.5, 1.0) for _ in range(5000))
+	sketch = {}
+	for d in durations:
+		sketch[sketch_key(d)] = sketch.get(sketch_key(d), 0) + 1
+	for q in (0.5, 0.95, 0.99):
+		exact = durations[int(q * (len(durations) - 1))]
+		assert sketch_quantile(sketch, q) == pytest.approx(exact, rel=ALPHA * 1.01)
+
+def test_build_analytics_rollups(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	pid = client.post("/projects", json={"name": f"Analytics_{uuid.uuid4()}", "repo": "https://github.com/demo/a"}, headers=headers).get_json()["id"]
+	outcomes = iter(["success", "fail", "success"])
+	client.application.extensions["build_executor"].runner = lambda build, log: (next(outcomes), "ok")
+	client.application.extensions["build_executor"].start()
+	for _ in range(3):
+		bid = client.post(f"/projects/{pid}/builds", headers=headers).get_json()["id"]
+		wait_for_build(client, headers, pid, bid)
+	for granularity in ("hour", "day"):
+		data = client.get(f"/analytics/builds?granularity={granularity}&project_id={pid}", headers=headers).get_json()
+		assert data["granularity"] == granularity
+		assert len(data["items"]) >= 1
+		assert data["total"]["count"] == 3
+		assert data["total"]["failure_count"] == 1
+		assert data["total"]["failure_rate"] == pytest.approx(1 / 3, abs=1e-4)
+		assert sum(item["count"] for item in data["items"]) == 3
+	assert client.get("/analytics/builds?granularity=week", headers=headers).status_code == 400
+	assert client.get("/analytics/builds?from=hier", headers=headers).status_code == 400
+	# Recalcul en bloc depuis la table Build : mêmes agrégats
+	from app.analytics import query_rollups, default_range, rebuild_rollups
+	with client.application.app_context():
+		before = query_rollups("day", *default_range("day"), project_id=pid)
+		rebuild_rollups()
+		after = query_rollups("day", *default_range("day"), project_id=pid)
+	assert after[1]["count"] == before[1]["count"] == 3
+	assert after[1]["duration_p50_s"] == before[1]["duration_p50_s"]
+	assert [i["bucket_start"] for i in after[0]] == [i["bucket_start"] for i in before[0]]
+
+
+def test_build_analytics_range_with_utc_offset(client):
+	headers = {"Authorization": f"Bearer {get_token(client)}"}
+	resp = client.get("/analytics/builds?from=2025-08-01T00:00:00%2B02:00&to=2025-08-02T00:00:00Z", headers=headers)
+	assert resp.status_code == 200
+	assert resp.get_json()["from"] == "2025-07-31T22:00:00Z"
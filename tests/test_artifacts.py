@@ -0,0 +1,73 @@
+# Tests artefacts
+
+import os
+import uuid
+
+import pytest
+from app import create_app
+from app.artifacts import collect_garbage
+
+@pytest.fixture
+def client():
+	app = create_app()
+	app.config["TESTING"] = True
+	# Les builds restent en file : seuls leurs artefacts comptent ici
+	app.extensions["build_executor"].workers = 0
+	with app.test_client() as client:
+		yield client
+	app.extensions["build_executor"].stop()
+
+def auth(client):
+	token = client.post("/login", json={"username": "admin", "password": "admin123"}).get_json()["access_token"]
+	return {"Authorization": f"Bearer {token}"}
+
+def create_build(client, headers):
+	pid = client.post("/projects", json={"name": f"ArtProj_{uuid.uuid4()}", "repo": "https://github.com/demo/art"}, headers=headers).get_json()["id"]
+	bid = client.post(f"/projects/{pid}/builds", json={"branch": f"b-{uuid.uuid4()}"}, headers=headers).get_json()["id"]
+	return f"/projects/{pid}/builds/{bid}/artifacts"
+
+def test_artifact_upload_dedup_and_download(client):
+	headers = auth(client)
+	first, second = create_build(client, headers), create_build(client, headers)
+	payload = os.urandom(300_000)
+	resp = client.put(f"{first}/dist/app.bin", data=payload, headers={**headers, "Content-Type": "application/octet-stream"})
+	assert resp.status_code == 201
+	meta = resp.get_json()
+	assert (meta["size"], meta["deduplicated"]) == (len(payload), False)
+	# Même contenu dans un autre build : un seul blob sur disque
+	again = client.put(f"{second}/app.bin", data=payload, headers=headers).get_json()
+	assert (again["digest"], again["deduplicated"]) == (meta["digest"], True)
+	assert [a["name"] for a in client.get(first).get_json()] == ["dist/app.bin"]
+	resp = client.get(f"{first}/dist/app.bin")
+	assert resp.status_code == 200 and resp.data == payload
+	assert resp.headers["ETag"] == f'"{meta["digest"]}"'
+	resp = client.get(f"{first}/dist/app.bin", headers={"Range": "bytes=100-199"})
+	assert resp.status_code == 206 and resp.data == payload[100:200]
+	assert client.get(f"{first}/dist/app.bin", headers={"If-None-Match": f'"{meta["digest"]}"'}).status_code == 304
+	assert client.put(f"{first}/../escape", data=b"x", headers=headers).status_code in (400, 404)
+	assert client.get(f"{first}/missing.bin").status_code == 404
+
+def test_artifact_garbage_collection(client):
+	headers = auth(client)
+	url = create_build(client, headers)
+	digest = client.put(f"{url}/report.txt", data=b"unique " + uuid.uuid4().bytes, headers=headers).get_json()["digest"]
+	store = client.application.extensions["artifacts"]
+	with client.application.app_context():
+		collect_garbage(store, 0)
+	assert os.path.exists(store.path(digest))
+	assert client.delete(f"{url}/report.txt", headers=headers).status_code == 204
+	with client.application.app_context():
+		assert collect_garbage(store, 0) >= 1
+	assert not os.path.exists(store.path(digest))
+	assert client.get(f"{url}/report.txt").status_code == 404
+
+def test_artifacts_of_deleted_project_are_hidden(client):
+	from app.purge import soft_delete_project
+	headers = auth(client)
+	url = create_build(client, headers)
+	assert client.put(f"{url}/app.bin", data=b"bin", headers=headers).status_code == 201
+	with client.application.app_context():
+		soft_delete_project(int(url.split("/")[2]))
+	assert client.get(url).status_code == 404
+	assert client.get(f"{url}/app.bin").status_code == 404
+	assert client.put(f"{url}/other.bin", data=b"x", headers=headers).status_code == 404
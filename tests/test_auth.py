@@ -21,3 +21,49 @@ def test_login_nok(client):
 	assert resp.status_code == 401
 	data = resp.get_json()
 	assert data["error"] == "unauthorized"
+
+def test_refresh_token_rotation(client):
+	tokens = client.post("/login", json={"username": "admin", "password": "admin123"}).get_json()
+	assert "refresh_token" in tokens
+	# Un access token ne permet pas de rafraîchir
+	resp = client.post("/token/refresh", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+	assert resp.status_code == 422
+	resp = client.post("/token/refresh", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+	assert resp.status_code == 200
+	renewed = resp.get_json()
+	resp = client.get("/projects", headers={"Authorization": f"Bearer {renewed['access_token']}"})
+	assert resp.status_code == 200
+	# L'ancien refresh token a été révoqué par la rotation
+	resp = client.post("/token/refresh", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+	assert resp.status_code == 401
+
+def test_revoke_access_token(client):
+	token = client.post("/login", json={"username": "admin", "password": "admin123"}).get_json()["access_token"]
+	headers = {"Authorization": f"Bearer {token}"}
+	assert client.post("/token/revoke", headers=headers).status_code == 204
+	assert client.get("/projects", headers=headers).status_code == 401
+
+def test_needs_rehash_with_shorthand_method(client):
+	from app.security import hash_password, needs_rehash
+	app = client.application
+	with app.app_context():
+		# Werkzeug écrit les paramètres dans le préfixe : "pbkdf2:sha256" -> "pbkdf2:sha256:600000"
+		app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256"
+		current = hash_password("secret")
+		assert not needs_rehash(current)
+		app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+		assert needs_rehash(current)
+		assert not needs_rehash(hash_password("secret"))
+
+def test_concurrent_refresh_revokes_once(client):
+	from flask_jwt_extended import decode_token
+	refresh_token = client.post("/login", json={"username": "admin", "password": "admin123"}).get_json()["refresh_token"]
+	app = client.application
+	with app.app_context():
+		payload = decode_token(refresh_token)
+		blocklist = app.extensions["token_blocklist"]
+		# Deux rafraîchissements passés tous deux par la vérification : un seul l'emporte
+		assert blocklist.revoke(payload) is True
+		assert blocklist.revoke(payload) is False
+	resp = client.post("/token/refresh", headers={"Authorization": f"Bearer {refresh_token}"})
+	assert resp.status_code == 401
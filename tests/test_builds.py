@@ -3,6 +3,8 @@
 import pytest
 from app import create_app
 import uuid
+import time
+import gzip
 
 @pytest.fixture
 def client():
@@ -10,6 +12,8 @@ def client():
 	app.config["TESTING"] = True
 	with app.test_client() as client:
 		yield client
+	# Les workers d'une app ne doivent pas réclamer les builds du test suivant
+	app.extensions["build_executor"].stop()
 
 def get_token(client):
 	resp = client.post("/login", json={"username": "admin", "password": "admin123"})
@@ -20,16 +24,318 @@ def create_project(client, token):
 	resp = client.post("/projects", json={"name": unique_name, "repo": "https://github.com/demo/build"}, headers={"Authorization": f"Bearer {token}"})
 	return resp.get_json()["id"]
 
+def wait_for_build(client, token, pid, bid, timeout=5.0):
+	deadline = time.monotonic() + timeout
+	while time.monotonic() < deadline:
+		data = client.get(f"/projects/{pid}/builds/{bid}", headers={"Authorization": f"Bearer {token}"}).get_json()
+		if data["status"] not in ("pending", "running"):
+			return data
+		time.sleep(0.02)
+	raise AssertionError(f"build {bid} still {data['status']}")
+
 def test_build_simulation_and_listing(client):
 	token = get_token(client)
 	pid = create_project(client, token)
-	# Simuler un build
-	resp = client.post(f"/projects/{pid}/build", headers={"Authorization": f"Bearer {token}"})
+	client.application.extensions["build_executor"].start()
+	# Déclencher un build : mis en file, exécuté en arrière-plan
+	resp = client.post(f"/projects/{pid}/builds", json={"branch": "main"}, headers={"Authorization": f"Bearer {token}"})
 	assert resp.status_code == 201
 	data = resp.get_json()
-	assert data["status"] in ("success", "fail")
+	assert data["status"] == "pending"
+	done = wait_for_build(client, token, pid, data["id"])
+	assert done["status"] in ("success", "fail")
+	assert done["started_at"] and done["finished_at"]
+	assert done["duration_s"] >= 0
 	# Lister les builds
 	resp = client.get(f"/projects/{pid}/builds", headers={"Authorization": f"Bearer {token}"})
 	assert resp.status_code == 200
 	items = resp.get_json()["items"]
 	assert len(items) >= 1
+
+def test_build_stays_pending_without_autostart(client):
+	# BUILD_EXECUTOR_AUTOSTART=0 (conftest) : un déclenchement ne démarre pas de workers
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	pid = create_project(client, token)
+	bid = client.post(f"/projects/{pid}/builds", headers=headers).get_json()["id"]
+	time.sleep(0.05)
+	assert client.application.extensions["build_executor"]._threads == []
+	assert client.get(f"/projects/{pid}/builds/{bid}", headers=headers).get_json()["status"] == "pending"
+
+def test_build_queue_full(client):
+	token = get_token(client)
+	pid = create_project(client, token)
+	executor = client.application.extensions["build_executor"]
+	executor.max_queue = 0
+	resp = client.post(f"/projects/{pid}/builds", headers={"Authorization": f"Bearer {token}"})
+	assert resp.status_code == 503
+	assert "Retry-After" in resp.headers
+
+def test_list_builds_cursor_pagination(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	pid = create_project(client, token)
+	ids = [client.post(f"/projects/{pid}/builds", headers=headers).get_json()["id"] for _ in range(3)]
+	seen = []
+	cursor = ""
+	while True:
+		data = client.get(f"/projects/{pid}/builds?per_page=2&cursor={cursor}", headers=headers).get_json()
+		seen += [b["id"] for b in data["items"]]
+		if not data["next_cursor"]:
+			break
+		cursor = data["next_cursor"]
+	assert seen == ids[::-1]
+	for args in ("per_page=abc", "page=abc"):
+		assert client.get(f"/projects/{pid}/builds?{args}", headers=headers).status_code == 400
+
+def test_build_logs_range_and_tail(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	pid = create_project(client, token)
+	app = client.application
+	app.extensions["build_logs"].chunk_size = 500
+	lines = [f"line {i}\n" for i in range(200)]
+	def runner(build, log):
+		for line in lines:
+			log.write(line)
+		return "success", "ok"
+	app.extensions["build_executor"].runner = runner
+	app.extensions["build_executor"].start()
+	bid = client.post(f"/projects/{pid}/builds", headers=headers).get_json()["id"]
+	wait_for_build(client, token, pid, bid)
+	full = "".join(lines).encode()
+	url = f"/projects/{pid}/builds/{bid}/logs"
+	# Log complet, décompressé côté serveur
+	resp = client.get(url, headers={"Accept-Encoding": "identity"})
+	assert resp.get_data() == full
+	# Log complet servi compressé tel quel
+	resp = client.get(url, headers={"Accept-Encoding": "gzip"})
+	assert resp.headers["Content-Encoding"] == "gzip"
+	assert gzip.decompress(resp.get_data()) == full
+	# Plage d'octets à cheval sur plusieurs segments
+	resp = client.get(url, headers={"Range": "bytes=490-1509"})
+	assert resp.status_code == 206
+	assert resp.get_data() == full[490:1510]
+	assert resp.headers["Content-Range"] == f"bytes 490-1509/{len(full)}"
+	resp = client.get(url, headers={"Range": f"bytes={len(full) + 10}-"})
+	assert resp.status_code == 416
+	# Dernières lignes
+	resp = client.get(f"{url}?tail=3")
+	assert resp.get_data(as_text=True) == "".join(lines[-3:])
+	for bad in ("abc", "-1"):
+		resp = client.get(f"{url}?tail={bad}")
+		assert resp.status_code == 400
+		assert resp.get_json()["error"] == "invalid_request"
+
+def test_project_stats_incremental(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	pid = create_project(client, token)
+	outcomes = iter(["success", "success", "fail", "success"])
+	client.application.extensions["build_executor"].runner = lambda build, log: (next(outcomes), "ok")
+	client.application.extensions["build_executor"].start()
+	for _ in range(4):
+		bid = client.post(f"/projects/{pid}/builds", headers=headers).get_json()["id"]
+		wait_for_build(client, token, pid, bid)
+	stats = client.get(f"/projects/{pid}/stats").get_json()
+	assert stats["total_builds"] == 4
+	assert (stats["success_count"], stats["failure_count"]) == (3, 1)
+	assert stats["success_rate"] == 0.75
+	assert (stats["current_streak"], stats["best_success_streak"]) == (1, 2)
+	durations = [b["duration_s"] for b in client.get(f"/projects/{pid}/builds", headers=headers).get_json()["items"]]
+	assert stats["duration_mean_s"] == pytest.approx(sum(durations) / 4)
+	# Même résultat en champ optionnel de la liste
+	items = client.get("/projects?with_stats=1&per_page=50", headers=headers).get_json()["items"]
+	assert next(p for p in items if p["id"] == pid)["stats"] == stats
+	# Recalcul complet depuis la table Build : mêmes valeurs
+	from app.stats import rebuild_stats, stats_to_dict
+	from app.models import ProjectStats
+	from app.db import db
+	with client.application.app_context():
+		rebuild_stats()
+		rebuilt = stats_to_dict(db.session.get(ProjectStats, pid))
+	assert rebuilt["duration_mean_s"] == pytest.approx(stats["duration_mean_s"])
+	assert rebuilt["duration_variance"] == pytest.approx(stats["duration_variance"])
+	assert {k: v for k, v in rebuilt.items() if "duration" not in k} == {k: v for k, v in stats.items() if "duration" not in k}
+
+def test_build_coalescing_and_queue_order(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	# Builds laissés en file : aucun worker ne les réclame
+	client.application.extensions["build_executor"].workers = 0
+	pa, pb = create_project(client, token), create_project(client, token)
+	trigger = lambda pid, branch: client.post(f"/projects/{pid}/builds", json={"branch": branch}, headers=headers).get_json()
+	first, second = trigger(pa, "feature/x"), trigger(pa, "feature/x")
+	third = trigger(pa, "feature/x")
+	assert third["superseded"] == [second["id"]]
+	assert second["superseded"] == [first["id"]]
+	assert client.get(f"/projects/{pa}/builds/{first['id']}", headers=headers).get_json()["status"] == "superseded"
+	main = trigger(pa, "main")
+	assert (main["priority"], third["priority"]) == (0, 1)
+	other = trigger(pb, "feature/y")
+	# Priorité : main d'abord ; puis, à classe égale, le projet sans build en cours
+	from app.db import db
+	from app.models import Build
+	from datetime import datetime
+	with client.application.app_context():
+		db.session.add(Build(project_id=pa, status="running", branch="feature/z", started_at=datetime.utcnow()))
+		db.session.commit()
+	queue = client.get("/builds/queue?limit=200", headers=headers).get_json()
+	order = [b["id"] for b in queue["next"] if b["project_id"] in (pa, pb)]
+	assert order == [main["id"], other["id"], third["id"]]
+	assert queue["pending_by_priority"]["high"] >= 1
+	assert {"project_id": pa, "pending": 2, "running": 1} in queue["projects"]
+
+def test_build_result_cache(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	client.application.extensions["build_executor"].runner = lambda build, log: ("success", "ok")
+	client.application.extensions["build_executor"].start()
+	pid = create_project(client, token)
+	payload = {"branch": "main", "commit": "9fceb02d0ae5", "config": {"python": "3.11", "os": "linux"}}
+	first = client.post(f"/projects/{pid}/builds", json=payload, headers=headers).get_json()
+	assert first["cache_hit"] is False
+	assert wait_for_build(client, token, pid, first["id"])["status"] == "success"
+	# Même clé (ordre des clés de config indifférent) : résultat réutilisé, rien en file
+	same = {**payload, "config": {"os": "linux", "python": "3.11"}}
+	hit = client.post(f"/projects/{pid}/builds", json=same, headers=headers)
+	assert hit.status_code == 201
+	hit = hit.get_json()
+	assert (hit["status"], hit["cache_hit"], hit["cached_from"]) == ("cached", True, first["id"])
+	detail = client.get(f"/projects/{pid}/builds/{hit['id']}", headers=headers).get_json()
+	assert detail["cached_from"] == first["id"] and detail["commit"] == "9fceb02d0ae5"
+	# Autre config, autre commit, ou no_cache : reconstruction
+	for other in ({**payload, "config": {"python": "3.12"}}, {**payload, "commit": "abc"}, {**payload, "no_cache": True}):
+		data = client.post(f"/projects/{pid}/builds", json=other, headers=headers).get_json()
+		assert data["cache_hit"] is False
+		wait_for_build(client, token, pid, data["id"])
+	assert client.post(f"/projects/{pid}/builds", json={"commit": 42}, headers=headers).status_code == 400
+	for branch in (["x"], "", "b" * 101):
+		assert client.post(f"/projects/{pid}/builds", json={"branch": branch}, headers=headers).status_code == 400
+	metrics = client.get("/metrics").get_data(as_text=True)
+	assert 'build_cache_requests_total{result="hit"} 1' in metrics
+	assert 'build_cache_requests_total{result="miss"} 3' in metrics
+	# Rétention : une entrée expirée est évincée au lieu d'être servie
+	client.application.config["BUILD_CACHE_TTL_S"] = 0
+	data = client.post(f"/projects/{pid}/builds", json=payload, headers=headers).get_json()
+	assert data["cache_hit"] is False
+	assert 'build_cache_evictions_total{reason="ttl"} 1' in client.get("/metrics").get_data(as_text=True)
+
+def test_list_builds_sparse_fields(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	client.application.extensions["build_executor"].workers = 0
+	pid = create_project(client, token)
+	for branch in ("a", "b", "c"):
+		client.post(f"/projects/{pid}/builds", json={"branch": branch}, headers=headers)
+	data = client.get(f"/projects/{pid}/builds?per_page=2&fields=branch,status", headers=headers).get_json()
+	assert data["items"] == [{"status": "pending", "branch": "c"}, {"status": "pending", "branch": "b"}]
+	rest = client.get(f"/projects/{pid}/builds?fields=branch&cursor={data['next_cursor']}", headers=headers).get_json()
+	assert rest["items"] == [{"branch": "a"}]
+	assert client.get(f"/projects/{pid}/builds?fields=nope", headers=headers).status_code == 400
+
+def test_build_transitions_write_behind(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	pid = create_project(client, token)
+	app = client.application
+	executor, buffer = app.extensions["build_executor"], app.extensions["build_transitions"]
+	# Fenêtre de regroupement plus longue que le test : rien n'est écrit sans flush()
+	buffer.interval = 60
+	executor.runner = lambda build, log: ("success", "ok")
+	executor.start()
+	bids = [
+		client.post(f"/projects/{pid}/builds", json={"branch": f"b{i}"}, headers=headers).get_json()["id"]
+		for i in range(3)
+	]
+	# D'autres builds pending de la base (tests précédents) peuvent être réclamés aussi
+	buffered = lambda: {t.build.id for t, _ in buffer._pending}
+	deadline = time.monotonic() + 5
+	while not set(bids) <= buffered() and time.monotonic() < deadline:
+		time.sleep(0.01)
+	assert set(bids) <= buffered()
+	# Fins non écrites : ni visibles, ni libérées de la file
+	assert client.get(f"/projects/{pid}/builds/{bids[0]}").get_json()["status"] == "running"
+	assert executor.depth >= 3
+	flushed = buffer.flush()
+	assert flushed >= 3
+	assert {client.get(f"/projects/{pid}/builds/{bid}").get_json()["status"] for bid in bids} == {"success"}
+	assert client.get(f"/projects/{pid}").get_json()["last_build_status"] == "success"
+	assert client.get(f"/projects/{pid}/stats").get_json()["success_count"] == 3
+	body = client.get("/metrics").get_data(as_text=True)
+	assert "build_transition_batches_total 1" in body
+	assert f"build_transitions_flushed_total {flushed}" in body
+	# Arrêt de l'exécuteur : le tampon est vidé
+	bid = client.post(f"/projects/{pid}/builds", headers=headers).get_json()["id"]
+	while bid not in buffered() and time.monotonic() < deadline:
+		time.sleep(0.01)
+	executor.stop()
+	assert buffer.depth == 0
+	assert client.get(f"/projects/{pid}/builds/{bid}").get_json()["status"] == "success"
+
+def test_build_queue_bound_shared_between_processes(tmp_path):
+	from app.utils import init_db
+	config = {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'queue.db'}", "BUILD_QUEUE_MAX": 3, "ADMISSION_RATE_PER_S": 0}
+	# Deux workers gunicorn sur la même base : A reçoit les déclenchements, B exécute les builds
+	a, b = create_app(config), create_app(config)
+	with a.app_context():
+		init_db()
+	a.extensions["build_executor"].workers = 0
+	b.extensions["build_executor"].runner = lambda build, log: ("success", "ok")
+	client = a.test_client()
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	pid = create_project(client, token)
+	for i in range(3):
+		assert client.post(f"/projects/{pid}/builds", json={"branch": f"b{i}"}, headers=headers).status_code == 201
+	assert client.post(f"/projects/{pid}/builds", json={"branch": "b3"}, headers=headers).status_code == 503
+	b.extensions["build_executor"].start()
+	deadline = time.monotonic() + 5
+	while time.monotonic() < deadline:
+		items = client.get(f"/projects/{pid}/builds", headers=headers).get_json()["items"]
+		if {i["status"] for i in items} == {"success"}:
+			break
+		time.sleep(0.02)
+	assert {i["status"] for i in items} == {"success"}
+	# La file s'est vidée dans B : A admet de nouveau
+	assert client.post(f"/projects/{pid}/builds", json={"branch": "b3"}, headers=headers).status_code == 201
+	a.extensions["build_executor"].stop()
+	b.extensions["build_executor"].stop()
+
+def test_write_behind_ignores_stale_completions(client):
+	from datetime import datetime
+	from sqlalchemy import select, update
+	from app.db import db
+	from app.models import Build, BuildEvent, ProjectStats
+	from app.purge import soft_delete_project
+	from app.writebehind import Transition
+	token = get_token(client)
+	pid, gone = create_project(client, token), create_project(client, token)
+	app = client.application
+	buffer = app.extensions["build_transitions"]
+	buffer.interval = 60
+	with app.app_context():
+		now = datetime.utcnow()
+		builds = [Build(project_id=pid, status="running", branch=f"s{i}", created_at=now, started_at=now) for i in range(3)]
+		builds.append(Build(project_id=gone, status="running", created_at=now, started_at=now))
+		db.session.add_all(builds)
+		db.session.commit()
+		for build in builds:
+			db.session.refresh(build)
+			db.session.expunge(build)
+			buffer.add(Transition(build, "success", datetime.utcnow(), 1.0, "ok"))
+		requeued, canceled, done, deleted = (b.id for b in builds)
+		# Avant le vidage : reprise (remise en file), annulation, suppression du projet
+		db.session.execute(update(Build).where(Build.id == requeued).values(status="pending", started_at=None))
+		db.session.execute(update(Build).where(Build.id == canceled).values(status="canceled"))
+		db.session.commit()
+		soft_delete_project(gone)
+	assert buffer.flush() == 4
+	with app.app_context():
+		status = dict(db.session.execute(select(Build.id, Build.status).where(Build.id.in_([b.id for b in builds]))).all())
+		assert status == {requeued: "pending", canceled: "canceled", done: "success", deleted: "success"}
+		events = db.session.execute(select(BuildEvent.build_id).where(BuildEvent.status == "success", BuildEvent.build_id.in_(status))).scalars().all()
+		assert events == [done]
+		assert db.session.get(ProjectStats, pid).success_count == 1
+		assert db.session.get(ProjectStats, gone) is None or db.session.get(ProjectStats, gone).success_count == 0
+	assert "build_transitions_skipped_total 3" in client.get("/metrics").get_data(as_text=True)
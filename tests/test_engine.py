@@ -0,0 +1,58 @@
+# Tests configuration du moteur DB (pool, pragmas SQLite)
+
+import pytest
+from app import create_app
+from app.db import db
+from sqlalchemy import text
+from concurrent.futures import ThreadPoolExecutor
+import uuid
+
+@pytest.fixture
+def app():
+	app = create_app()
+	app.config["TESTING"] = True
+	yield app
+	app.extensions["build_executor"].stop()
+
+def test_sqlite_pragmas(app):
+	with app.app_context():
+		assert db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+		assert db.session.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+		assert db.session.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+def test_engine_options():
+	from app.engine import engine_options
+	from app.config import Config
+	config = {k: getattr(Config, k) for k in dir(Config) if k.isupper()}
+	pg = engine_options(dict(config, SQLALCHEMY_DATABASE_URI="postgresql+psycopg2://u:p@db/usine", DB_POOL_SIZE=12))
+	assert pg["pool_size"] == 12 and "connect_args" not in pg
+	memory = engine_options(dict(config, SQLALCHEMY_DATABASE_URI="sqlite://"))
+	assert "pool_size" not in memory
+
+def test_concurrent_writes_without_lock_errors(app):
+	token = app.test_client().post("/login", json={"username": "admin", "password": "admin123"}).get_json()["access_token"]
+	headers = {"Authorization": f"Bearer {token}"}
+
+	def create(i):
+		client = app.test_client()
+		return [
+			client.post("/projects", json={"name": f"Concurrent_{uuid.uuid4()}", "repo": "https://github.com/demo/c"}, headers=headers).status_code
+			for _ in range(10)
+		]
+
+	with ThreadPoolExecutor(8) as pool:
+		codes = [c for batch in pool.map(create, range(8)) for c in batch]
+	assert codes == [201] * 80
+
+def test_init_db_on_empty_database(tmp_path):
+	# Exécuteur en démarrage automatique, comme en production : la commande ne doit pas toucher aux builds
+	app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'fresh.db'}", "BUILD_EXECUTOR_AUTOSTART": True})
+	result = app.test_cli_runner().invoke(args=["init-db"])
+	assert result.exit_code == 0, result.output
+	assert not app.extensions["build_executor"]._threads
+	with app.app_context():
+		assert db.session.execute(text("SELECT username FROM user")).scalar() == "admin"
+	# Première requête : les workers démarrent sur le schéma créé
+	assert app.test_client().get("/status").status_code == 200
+	assert app.extensions["build_executor"]._threads
+	app.extensions["build_executor"].stop()
@@ -0,0 +1,73 @@
+# Tests flux SSE des builds
+
+import pytest
+from app import create_app
+from datetime import datetime
+from types import SimpleNamespace
+import json
+import uuid
+
+@pytest.fixture
+def client():
+	app = create_app({"SSE_HEARTBEAT_S": 0.05, "SSE_POLL_INTERVAL_S": 0.05})
+	app.config["TESTING"] = True
+	with app.test_client() as client:
+		yield client
+	app.extensions["build_executor"].stop()
+
+def auth(client):
+	token = client.post("/login", json={"username": "admin", "password": "admin123"}).get_json()["access_token"]
+	return {"Authorization": f"Bearer {token}"}
+
+def read_events(resp, count, limit=400):
+	"""Les `count` premiers événements `build` du flux (id, data)."""
+	events, buf = [], ""
+	chunks = iter(resp.response)
+	for _ in range(limit):
+		buf += next(chunks).decode()
+		while "\n\n" in buf:
+			block, buf = buf.split("\n\n", 1)
+			fields = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line and not line.startswith(":"))
+			if fields.get("event") == "build":
+				events.append((int(fields["id"]), json.loads(fields["data"])))
+				if len(events) == count:
+					return events
+	raise AssertionError(f"{len(events)} événements reçus sur {count}")
+
+def test_project_stream_and_resume(client):
+	headers = auth(client)
+	pid = client.post("/projects", json={"name": f"Stream_{uuid.uuid4()}", "repo": "https://github.com/demo/s"}, headers=headers).get_json()["id"]
+	client.application.extensions["build_executor"].runner = lambda build, log: ("success", "ok")
+	client.application.extensions["build_executor"].start()
+	token = headers["Authorization"].split()[1]
+	resp = client.get(f"/projects/{pid}/builds/stream?jwt={token}", buffered=False)
+	assert resp.status_code == 200
+	assert resp.mimetype == "text/event-stream"
+	bid = client.post(f"/projects/{pid}/builds", headers=headers).get_json()["id"]
+	events = read_events(resp, 3)
+	resp.close()
+	assert [e["status"] for _, e in events] == ["pending", "running", "success"]
+	assert {e["build_id"] for _, e in events} == {bid}
+	# Reprise après le premier événement : les suivants sont rejoués
+	resp = client.get(f"/projects/{pid}/builds/stream", headers=dict(headers, **{"Last-Event-ID": str(events[0][0])}), buffered=False)
+	assert read_events(resp, 2) == events[1:]
+	resp.close()
+	assert client.get("/builds/stream", buffered=False).status_code == 401
+
+def test_fan_out_and_slow_consumer(client):
+	bus = client.application.extensions["event_bus"]
+	bus.buffer_size = 2
+	subs = [bus.subscribe(project_id=-1) for _ in range(1000)]
+	slow = bus.subscribe()
+	row = lambda i: SimpleNamespace(id=10**9 + i, build_id=1, project_id=-1, status="running", created_at=datetime.utcnow())
+	bus.publish([row(0), row(1)])
+	# Une trame formatée une seule fois, partagée par tous les abonnés
+	frames = [s.drain(0) for s in subs]
+	assert all(f == frames[0] for f in frames) and len(frames[0]) == 2
+	assert len({id(f[0][1]) for f in frames}) == 1
+	bus.publish([row(2)])
+	assert slow.dropped
+	assert not any(s.dropped for s in subs)
+	for s in subs:
+		bus.unsubscribe(s)
+	assert bus.subscribers == 0
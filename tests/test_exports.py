@@ -0,0 +1,84 @@
+# Tests exports
+
+import pytest
+from app import create_app
+import uuid
+import json
+import csv
+import io
+
+@pytest.fixture
+def client():
+	app = create_app()
+	app.config["TESTING"] = True
+	with app.test_client() as client:
+		yield client
+	# Les workers d'une app ne doivent pas réclamer les builds du test suivant
+	app.extensions["build_executor"].stop()
+
+def get_token(client):
+	resp = client.post("/login", json={"username": "admin", "password": "admin123"})
+	return resp.get_json()["access_token"]
+
+def test_export_requires_auth(client):
+	resp = client.get("/exports/projects")
+	assert resp.status_code == 401
+
+def test_export_projects_ndjson_since(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	name = f"ExportProj_{uuid.uuid4()}"
+	created = client.post("/projects", json={"name": name, "repo": "https://github.com/demo/export"}, headers=headers).get_json()
+	resp = client.get("/exports/projects", headers=headers)
+	assert resp.status_code == 200
+	assert resp.mimetype == "application/x-ndjson"
+	rows = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+	assert any(r["name"] == name for r in rows)
+	# Export incrémental : uniquement les projets créés depuis le dernier
+	resp = client.get(f"/exports/projects?since={created['created_at']}", headers=headers)
+	rows = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+	assert [r["name"] for r in rows] == [name]
+
+def test_export_builds_csv(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	pid = client.post("/projects", json={"name": f"ExportBuilds_{uuid.uuid4()}", "repo": "https://github.com/demo/export"}, headers=headers).get_json()["id"]
+	bid = client.post(f"/projects/{pid}/builds", headers=headers).get_json()["id"]
+	resp = client.get("/exports/builds?format=csv", headers=headers)
+	assert resp.status_code == 200
+	rows = list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+	assert any(int(r["id"]) == bid and int(r["project_id"]) == pid for r in rows)
+
+def test_export_invalid_format(client):
+	token = get_token(client)
+	resp = client.get("/exports/builds?format=xml", headers={"Authorization": f"Bearer {token}"})
+	assert resp.status_code == 400
+
+def test_export_builds_since_finished_and_deleted_projects(client):
+	from datetime import datetime, timedelta
+	from app.db import db
+	from app.models import Build
+	from app.purge import soft_delete_project
+	headers = {"Authorization": f"Bearer {get_token(client)}"}
+	pids = [client.post("/projects", json={"name": f"ExportSince_{uuid.uuid4()}", "repo": "https://github.com/demo/export"}, headers=headers).get_json()["id"] for _ in range(2)]
+	now = datetime.utcnow()
+	with client.application.app_context():
+		# Créé avant `since`, terminé après : réexporté avec son statut final
+		late = Build(project_id=pids[0], status="success", branch="main", created_at=now - timedelta(days=2), finished_at=now)
+		old = Build(project_id=pids[0], status="success", branch="main", created_at=now - timedelta(days=2), finished_at=now - timedelta(days=2))
+		hidden = Build(project_id=pids[1], status="success", branch="main", created_at=now, finished_at=now)
+		db.session.add_all([late, old, hidden])
+		db.session.commit()
+		ids = late.id, old.id, hidden.id
+		soft_delete_project(pids[1])
+	since = (now - timedelta(hours=1)).isoformat() + "Z"
+	rows = [json.loads(line) for line in client.get(f"/exports/builds?since={since}", headers=headers).get_data(as_text=True).splitlines()]
+	exported = {r["id"] for r in rows}
+	assert ids[0] in exported
+	assert ids[1] not in exported
+	assert ids[2] not in exported
+	# Même instant exprimé avec un décalage : même résultat
+	since = (now + timedelta(hours=1)).isoformat() + "%2B02:00"
+	rows = [json.loads(line) for line in client.get(f"/exports/builds?since={since}", headers=headers).get_data(as_text=True).splitlines()]
+	assert ids[0] in {r["id"] for r in rows}
+	assert ids[1] not in {r["id"] for r in rows}
@@ -10,6 +10,8 @@ def client():
 	app.config["TESTING"] = True
 	with app.test_client() as client:
 		yield client
+	# Les workers d'une app ne doivent pas réclamer les builds du test suivant
+	app.extensions["build_executor"].stop()
 
 def get_token(client):
 	resp = client.post("/login", json={"username": "admin", "password": "admin123"})
@@ -46,3 +48,248 @@ def test_create_project_conflict(client):
 	# Conflit
 	resp = client.post("/projects", json={"name": unique_name, "repo": "https://github.com/demo/other"}, headers={"Authorization": f"Bearer {token}"})
 	assert resp.status_code == 409
+
+def test_list_projects_cursor_pagination(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	names = [f"PageProj_{uuid.uuid4()}" for _ in range(3)]
+	for name in names:
+		client.post("/projects", json={"name": name, "repo": "https://github.com/demo/page"}, headers=headers)
+	# Les plus récents d'abord
+	resp = client.get("/projects?per_page=2&count=exact", headers=headers)
+	assert resp.status_code == 200
+	data = resp.get_json()
+	assert [p["name"] for p in data["items"]] == names[:0:-1]
+	assert data["total"] >= 3
+	assert data["next_cursor"]
+	resp = client.get(f"/projects?per_page=2&cursor={data['next_cursor']}", headers=headers)
+	assert resp.get_json()["items"][0]["name"] == names[0]
+	# Curseur invalide
+	resp = client.get("/projects?cursor=not-a-cursor", headers=headers)
+	assert resp.status_code == 400
+	# Paramètres de pagination non entiers
+	for args in ("per_page=abc", "page=abc"):
+		resp = client.get(f"/projects?{args}", headers=headers)
+		assert resp.status_code == 400
+		assert resp.get_json()["error"] == "invalid_request"
+
+def test_import_projects_json_array(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	existing = f"ImportProj_{uuid.uuid4()}"
+	client.post("/projects", json={"name": existing, "repo": "https://github.com/demo/a"}, headers=headers)
+	fresh = f"ImportProj_{uuid.uuid4()}"
+	records = [
+		{"name": fresh, "repo": "https://github.com/demo/b"},
+		{"name": existing, "repo": "https://github.com/demo/c"},
+		{"name": fresh, "repo": "https://github.com/demo/d"},
+		{"repo": "https://github.com/demo/e"},
+	]
+	resp = client.post("/projects/import", json=records, headers=headers)
+	assert resp.status_code == 200
+	data = resp.get_json()
+	assert (data["created"], data["conflict"], data["invalid"]) == (1, 2, 1)
+	assert [r["status"] for r in data["results"]] == ["created", "conflict", "conflict", "invalid"]
+	resp = client.get(f"/projects/{data['results'][0]['id']}", headers=headers)
+	assert resp.get_json()["name"] == fresh
+
+def test_import_projects_conflicts_after_retries(client, monkeypatch):
+	from sqlalchemy import false, select
+	from app import imports
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	existing = f"ImportRace_{uuid.uuid4()}"
+	client.post("/projects", json={"name": existing, "repo": "https://github.com/demo/a"}, headers=headers)
+	# La vérification préalable ne voit jamais l'homonyme : chaque insertion en lot échoue
+	monkeypatch.setattr(imports, "select", lambda *cols: select(*cols).where(false()))
+	fresh = f"ImportRace_{uuid.uuid4()}"
+	records = [{"name": existing, "repo": "https://github.com/demo/b"}, {"name": fresh, "repo": "https://github.com/demo/c"}]
+	resp = client.post("/projects/import", json=records, headers=headers)
+	assert resp.status_code == 200
+	data = resp.get_json()
+	assert [r["status"] for r in data["results"]] == ["conflict", "created"]
+	assert data["results"][1]["name"] == fresh
+
+def test_import_projects_ndjson(client):
+	token = get_token(client)
+	client.application.config["IMPORT_BATCH_SIZE"] = 2
+	names = [f"NdjsonProj_{uuid.uuid4()}" for _ in range(5)]
+	body = "\n".join(f'{{"name": "{n}", "repo": "https://github.com/demo/n"}}' for n in names) + "\n{not json}\n"
+	resp = client.post("/projects/import", data=body, content_type="application/x-ndjson", headers={"Authorization": f"Bearer {token}"})
+	assert resp.status_code == 200
+	data = resp.get_json()
+	assert data["created"] == 5
+	assert data["results"][-1]["status"] == "invalid"
+
+def test_get_project_etag_and_invalidation(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	pid = client.post("/projects", json={"name": f"CacheProj_{uuid.uuid4()}", "repo": "https://github.com/demo/cache"}, headers=headers).get_json()["id"]
+	resp = client.get(f"/projects/{pid}")
+	etag = resp.headers["ETag"]
+	assert resp.status_code == 200
+	# Inchangé : 304 sans corps
+	resp = client.get(f"/projects/{pid}", headers={"If-None-Match": etag})
+	assert resp.status_code == 304
+	assert resp.headers["ETag"] == etag
+	# Un build modifie last_build_status : le cache est invalidé
+	client.post(f"/projects/{pid}/builds", headers=headers)
+	resp = client.get(f"/projects/{pid}", headers={"If-None-Match": etag})
+	assert resp.status_code == 200
+	assert resp.headers["ETag"] != etag
+
+def test_delete_project_soft_delete_and_purge(client):
+	import os
+	import time
+	from datetime import datetime
+	from sqlalchemy import func, select
+	from app.db import db
+	from app.models import Artifact, Build, Project, ProjectStats
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	app = client.application
+	pid = client.post("/projects", json={"name": f"DelProj_{uuid.uuid4()}", "repo": "https://github.com/demo/del"}, headers=headers).get_json()["id"]
+	with app.app_context():
+		now = datetime.utcnow()
+		db.session.add_all([Build(project_id=pid, status="success", branch="main", created_at=now) for _ in range(25)])
+		db.session.commit()
+		first = db.session.execute(select(func.min(Build.id)).where(Build.project_id == pid)).scalar()
+		app.extensions["build_logs"].append(first, b"hello\n")
+	assert client.put(f"/projects/{pid}/builds/{first}/artifacts/out.txt", data=b"out", headers=headers).status_code == 201
+	# Builds déclenchés mais jamais réclamés : annulés par la suppression
+	app.extensions["build_executor"].workers = 0
+	pending = client.post(f"/projects/{pid}/builds", json={"branch": "dev"}, headers=headers).get_json()["id"]
+	app.extensions["project_purge"].batch_size = 10
+	assert client.delete(f"/projects/{pid}", headers=headers).status_code == 204
+	# Invisible immédiatement, purgé en arrière-plan par lots
+	assert client.get(f"/projects/{pid}", headers=headers).status_code == 404
+	assert client.post(f"/projects/{pid}/builds", headers=headers).status_code == 404
+	assert client.delete(f"/projects/{pid}", headers=headers).status_code == 404
+	deadline = time.monotonic() + 5
+	with app.app_context():
+		while db.session.get(Project, pid) is not None and time.monotonic() < deadline:
+			db.session.remove()
+			time.sleep(0.02)
+		assert db.session.get(Project, pid) is None
+		assert db.session.execute(select(func.count()).select_from(Build).where(Build.project_id == pid)).scalar() == 0
+		assert db.session.execute(select(func.count()).select_from(Artifact).where(Artifact.build_id.in_((first, pending)))).scalar() == 0
+		assert db.session.get(ProjectStats, pid) is None
+	assert not os.path.exists(app.extensions["build_logs"].path(first))
+
+def test_purge_removes_late_cache_entries(client):
+	from datetime import datetime
+	from app.db import db
+	from app.models import Build, BuildCacheEntry
+	from app.purge import soft_delete_project
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	app = client.application
+	pid = client.post("/projects", json={"name": f"PurgeCache_{uuid.uuid4()}", "repo": "https://github.com/demo/pc"}, headers=headers).get_json()["id"]
+	with app.app_context():
+		now = datetime.utcnow()
+		build = Build(project_id=pid, status="success", branch="main", created_at=now)
+		db.session.add(build)
+		db.session.commit()
+		soft_delete_project(pid)
+		# Entrée écrite par une fin de build concurrente de la suppression logique
+		db.session.add(BuildCacheEntry(
+			project_id=pid, branch="main", commit_sha="abc", config_hash="h", build_id=build.id,
+			created_at=now, last_used_at=now,
+		))
+		db.session.commit()
+		assert app.extensions["project_purge"].purge(pid)
+		assert db.session.query(BuildCacheEntry).filter_by(project_id=pid).count() == 0
+
+def test_interrupted_purge_resumes_on_startup(tmp_path):
+	import time
+	from datetime import datetime
+	from app.db import db
+	from app.models import Project
+	from app.utils import init_db
+	config = {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'purge.db'}", "BUILD_EXECUTOR_AUTOSTART": True}
+	app = create_app(config)
+	with app.app_context():
+		init_db()
+		# Supprimé avant un redémarrage, jamais purgé
+		db.session.add(Project(name="Interrupted", repo="https://github.com/demo/i", deleted_at=datetime.utcnow()))
+		db.session.commit()
+	app = create_app(config)
+	assert app.test_client().get("/status").status_code == 200
+	deadline = time.monotonic() + 5
+	with app.app_context():
+		while db.session.query(Project).count() and time.monotonic() < deadline:
+			db.session.remove()
+			time.sleep(0.02)
+		assert db.session.query(Project).count() == 0
+	app.extensions["build_executor"].stop()
+
+def test_projects_sparse_fields(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	pid = client.post("/projects", json={"name": f"FieldsProj_{uuid.uuid4()}", "repo": "https://github.com/demo/f"}, headers=headers).get_json()["id"]
+	data = client.get("/projects?per_page=2&fields=name,id&with_stats=1", headers=headers).get_json()
+	assert all(set(item) == {"id", "name", "stats"} for item in data["items"])
+	# Le curseur reste valide sans created_at dans les champs
+	nxt = client.get(f"/projects?per_page=2&fields=name&cursor={data['next_cursor']}", headers=headers).get_json()
+	assert [set(item) for item in nxt["items"]] == [{"name"}, {"name"}]
+	assert not {i["name"] for i in nxt["items"]} & {i["name"] for i in data["items"]}
+	assert client.get(f"/projects/{pid}?fields=created_at,last_build_status").get_json().keys() == {"created_at", "last_build_status"}
+	resp = client.get("/projects?fields=id,secret", headers=headers)
+	assert resp.status_code == 400 and "secret" in resp.get_json()["message"]
+
+def test_projects_include_recent_builds(client):
+	from datetime import datetime, timedelta
+	from sqlalchemy import event
+	from app.db import db
+	from app.models import Build
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	app = client.application
+	ids = [client.post("/projects", json={"name": f"RecentProj_{uuid.uuid4()}", "repo": "https://github.com/demo/r"}, headers=headers).get_json()["id"] for _ in range(2)]
+	start = datetime.utcnow()
+	with app.app_context():
+		db.session.add_all([Build(project_id=ids[0], status="success", branch=f"b{i}", created_at=start + timedelta(seconds=i)) for i in range(7)])
+		db.session.add_all([Build(project_id=ids[1], status="fail", branch=f"c{i}", created_at=start + timedelta(seconds=i)) for i in range(2)])
+		db.session.commit()
+		engine = db.engine
+	build_queries = []
+	listener = lambda conn, cursor, statement, *args: build_queries.append(statement) if "FROM build" in statement else None
+	event.listen(engine, "before_cursor_execute", listener)
+	try:
+		data = client.get("/projects?per_page=2&include=recent_builds&recent=3&fields=id", headers=headers).get_json()
+	finally:
+		event.remove(engine, "before_cursor_execute", listener)
+	# Une seule requête pour les builds de toute la page
+	assert len(build_queries) == 1
+	recent = {item["id"]: [b["branch"] for b in item["recent_builds"]] for item in data["items"]}
+	assert recent == {ids[0]: ["b6", "b5", "b4"], ids[1]: ["c1", "c0"]}
+	one = client.get(f"/projects/{ids[0]}?include=recent_builds").get_json()
+	assert [b["branch"] for b in one["recent_builds"]] == ["b6", "b5", "b4", "b3", "b2"]
+	assert client.get(f"/projects/{ids[0]}?include=owners").status_code == 400
+	assert client.get(f"/projects/{ids[0]}?include=recent_builds&recent=x").status_code == 400
+	assert client.get("/projects?include=recent_builds&recent=x", headers=headers).status_code == 400
+
+def test_search_projects(client):
+	token = get_token(client)
+	headers = {"Authorization": f"Bearer {token}"}
+	tag = uuid.uuid4().hex[:10]
+	specs = [
+		(f"lib-{tag}-core", "https://github.com/demo/core"),
+		(f"{tag}", "https://github.com/demo/exact"),
+		(f"{tag}-cli", "https://github.com/demo/cli"),
+		("Unrelated", f"https://github.com/demo/{tag.upper()}-mirror"),
+	]
+	specs[3] = (f"Unrelated_{uuid.uuid4()}", specs[3][1])
+	ids = [client.post("/projects", json={"name": n, "repo": r}, headers=headers).get_json()["id"] for n, r in specs]
+	# Exact, préfixe, sous-chaîne, puis dépôt seulement (insensible à la casse)
+	data = client.get(f"/projects?q={tag}&fields=id", headers=headers).get_json()
+	assert [i["id"] for i in data["items"]] == [ids[1], ids[2], ids[0], ids[3]]
+	first = client.get(f"/projects?q={tag}&per_page=3&fields=id", headers=headers).get_json()
+	rest = client.get(f"/projects?q={tag}&per_page=3&fields=id&cursor={first['next_cursor']}", headers=headers).get_json()
+	assert [i["id"] for i in first["items"] + rest["items"]] == [ids[1], ids[2], ids[0], ids[3]]
+	assert rest["next_cursor"] is None
+	assert [i["id"] for i in client.get(f"/projects?q={tag[4:]}-cli", headers=headers).get_json()["items"]] == [ids[2]]
+	# Projet supprimé : plus dans les résultats
+	client.delete(f"/projects/{ids[2]}", headers=headers)
+	assert ids[2] not in [i["id"] for i in client.get(f"/projects?q={tag}&fields=id", headers=headers).get_json()["items"]]
+	assert client.get("/projects?q=ab", headers=headers).status_code == 400
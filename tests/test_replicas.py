@@ -0,0 +1,62 @@
+# Tests routage lecture / écriture (primaire + réplica SQLite)
+
+import pytest
+from app import create_app
+import sqlite3
+import uuid
+
+def copy_primary(app, replica_path):
+	"""Réplication simulée : copie cohérente du fichier primaire."""
+	from app.db import db
+	with app.app_context():
+		primary_path = db.engine.url.database
+	src, dst = sqlite3.connect(primary_path), sqlite3.connect(replica_path)
+	src.backup(dst)
+	src.close()
+	dst.close()
+
+@pytest.fixture
+def app(tmp_path):
+	replica = tmp_path / "replica.db"
+	app = create_app({"DB_REPLICA_URLS": f"sqlite:///{replica}", "DB_REPLICA_CHECK_INTERVAL_S": 3600})
+	app.config["TESTING"] = True
+	app.extensions["replicas"].check()
+	copy_primary(app, replica)
+	yield app
+	app.extensions["build_executor"].stop()
+
+def test_reads_go_to_replica_writes_to_primary(app):
+	client = app.test_client()
+	router = app.extensions["replicas"]
+	assert router.healthy() == ["replica_0"]
+	token = client.post("/login", json={"username": "admin", "password": "admin123"}).get_json()["access_token"]
+	headers = {"Authorization": f"Bearer {token}"}
+	name = f"Replica_{uuid.uuid4()}"
+	resp = client.post("/projects", json={"name": name, "repo": "https://github.com/demo/r"}, headers=headers)
+	assert resp.status_code == 201
+	pid = resp.get_json()["id"]
+	# La liste est lue sur le réplica, qui ne connaît pas encore le projet
+	names = [p["name"] for p in client.get("/projects?per_page=500", headers=headers).get_json()["items"]]
+	assert name not in names
+	# Lecture d'un projet tout juste créé : repli sur le primaire
+	assert client.get(f"/projects/{pid}", headers=headers).get_json()["name"] == name
+	# Réplica trop en retard : tout revient au primaire
+	router.max_lag = 0.0
+	router.check()
+	assert router.healthy() == []
+	names = [p["name"] for p in client.get("/projects?per_page=499", headers=headers).get_json()["items"]]
+	assert name in names
+
+def test_write_in_read_request_sticks_to_primary(app):
+	from flask import g
+	from sqlalchemy import select, update
+	from app.db import db
+	from app.models import Project
+	with app.test_request_context("/projects", method="GET"):
+		app.preprocess_request()
+		assert g._db_replica == "replica_0"
+		assert db.session.get_bind(clause=select(Project)) is db.engines["replica_0"]
+		db.session.execute(update(Project).where(Project.id == -1).values(name="x"))
+		assert g._db_replica is None
+		assert db.session.get_bind(clause=select(Project)) is db.engine
+		db.session.rollback()
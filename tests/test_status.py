@@ -18,3 +18,127 @@ def test_status_ok(client):
 	assert "uptime_s" in data
 	assert "db_ok" in data
 	assert data["db_ok"] is True
+	assert "db_checked_at" in data
+	assert data["db_age_s"] >= 0
+
+def test_metrics_exposition(client):
+	client.get("/status")
+	client.get("/status")
+	resp = client.get("/metrics")
+	assert resp.status_code == 200
+	assert resp.mimetype == "text/plain"
+	body = resp.get_data(as_text=True)
+	assert 'http_requests_total{route="/status",method="GET",status="200"} 2' in body
+	assert 'http_request_duration_seconds_count{route="/status",method="GET"} 2' in body
+	assert "build_queue_pending " in body
+	assert "db_health_ok 1" in body
+
+def test_metrics_counts_cached_between_scrapes(client):
+	from sqlalchemy import event
+	from app.db import db
+	client.application.config["HEALTH_CHECK_INTERVAL_S"] = 60
+	client.get("/metrics")
+	with client.application.app_context():
+		engine = db.engine
+	counts = []
+	listener = lambda conn, cursor, statement, *args: counts.append(statement) if "count(" in statement.lower() else None
+	event.listen(engine, "before_cursor_execute", listener)
+	try:
+		assert "build_queue_pending " in client.get("/metrics").get_data(as_text=True)
+	finally:
+		event.remove(engine, "before_cursor_execute", listener)
+	assert counts == []
+
+def test_sql_instrumentation_disabled_by_default(client):
+	resp = client.get("/status")
+	assert "Server-Timing" not in resp.headers
+	assert client.get("/debug/sql").status_code == 404
+
+def test_sql_instrumentation_report():
+	from app.instrumentation import fingerprint
+	from app.db import db
+	from sqlalchemy import text
+	assert fingerprint("SELECT * FROM build WHERE id IN (?, ?, ?) LIMIT 10") == "SELECT * FROM build WHERE id IN (?) LIMIT ?"
+	app = create_app({"SQL_INSTRUMENTATION": True, "SQL_N_PLUS_ONE_THRESHOLD": 3})
+
+	@app.route("/n-plus-one")
+	def n_plus_one():
+		for i in range(3):
+			db.session.execute(text(f"SELECT {i}"))
+		return "ok"
+
+	with app.test_client() as client:
+		token = client.post("/login", json={"username": "admin", "password": "admin123"}).get_json()["access_token"]
+		headers = {"Authorization": f"Bearer {token}"}
+		client.get("/projects", headers=headers)
+		# Page + COUNT(*) (la liste de révocation est déjà synchronisée)
+		resp = client.get("/projects?count=exact", headers=headers)
+		assert resp.headers["Server-Timing"].startswith("db;dur=")
+		assert resp.headers["Server-Timing"].endswith('desc="2 queries"')
+		client.get("/n-plus-one")
+		report = client.get("/debug/sql", headers=headers).get_json()
+		assert report["endpoints"]["n_plus_one"]["n_plus_one"] == 1
+		assert report["recent"][-1]["n_plus_one"] == ["SELECT ?"]
+
+def test_apispec_disk_cache(tmp_path):
+	app = create_app({"SWAGGER_SPEC_CACHE_DIR": str(tmp_path)})
+	spec = app.test_client().get("/apispec_1.json").get_json()
+	assert "/projects" in spec["paths"]
+	files = list(tmp_path.iterdir())
+	assert len(files) == 1
+	# Un autre worker relit la spec sur disque au lieu de la reconstruire
+	files[0].write_text('{"swagger": "2.0", "paths": {"/cached": {}}}')
+	other = create_app({"SWAGGER_SPEC_CACHE_DIR": str(tmp_path)})
+	assert other.test_client().get("/apispec_1.json").get_json()["paths"] == {"/cached": {}}
+	assert app.test_client().get("/apidocs/").status_code == 200
+
+def test_admission_rate_limit_and_shedding():
+	from app.admission import Gate
+	app = create_app({"ADMISSION_RATE_PER_S": 0.01, "ADMISSION_BURST": 3, "ADMISSION_MAX_QUEUE": 0})
+	client = app.test_client()
+	token = client.post("/login", json={"username": "admin", "password": "admin123"}).get_json()["access_token"]
+	headers = {"Authorization": f"Bearer {token}"}
+	# Route coûteuse : le seau de l'identité est vidé en une requête
+	assert client.get("/projects", headers=headers).status_code == 200
+	resp = client.get("/projects", headers=headers)
+	assert resp.status_code == 429
+	assert int(resp.headers["Retry-After"]) >= 1
+	assert resp.get_json()["error"] == "too_many_requests"
+	# Autre identité (IP) : son propre seau ; /status n'est jamais limité
+	assert client.get("/projects/999999").status_code == 404
+	for _ in range(5):
+		assert client.get("/status").status_code == 200
+	# Slots de la classe coûteuse occupés, file nulle : délestage immédiat
+	other = create_app({"ADMISSION_CONCURRENCY": "expensive=1", "ADMISSION_MAX_QUEUE": 0})
+	gate = other.extensions["admission"].gates["expensive"]
+	assert gate.acquire() is None
+	client = other.test_client()
+	resp = client.get("/projects", headers=headers)
+	assert resp.status_code == 503
+	assert "Retry-After" in resp.headers
+	assert client.get("/status").status_code == 200
+	gate.release(0.01)
+	assert client.get("/projects", headers=headers).status_code == 200
+	body = client.get("/metrics").get_data(as_text=True)
+	assert 'admission_rejected_total{reason="queue_full",route_class="expensive"} 1' in body
+	assert "admission_in_flight 0" in body
+	other.extensions["build_executor"].stop()
+	# Exports en cours (slots "export" occupés) : les listes restent servies
+	other = create_app({"ADMISSION_CONCURRENCY": "expensive=1,export=1", "ADMISSION_MAX_QUEUE": 0, "ADMISSION_RATE_PER_S": 0})
+	gate = other.extensions["admission"].gates["export"]
+	assert gate.acquire() is None
+	client = other.test_client()
+	assert client.get("/exports/projects", headers=headers).status_code == 503
+	assert client.get("/projects", headers=headers).status_code == 200
+	gate.release(0.01)
+	other.extensions["build_executor"].stop()
+	app.extensions["build_executor"].stop()
+	# Attente prévisible au-delà de max_wait : refus sans attendre
+	gate = Gate(1, max_queue=8, max_wait=0.05)
+	gate.acquire()
+	gate.service_s = 1.0
+	assert gate.acquire() == ("latency", 1.0)
+	gate.service_s = 0.01
+	assert gate.acquire()[0] == "timeout"
+	gate.release(0.01)
+	assert gate.acquire() is None